@@ -0,0 +1 @@
+# Skrypty do pomiarów i porównań rekomendacji (uruchamiane z katalogu głównego: python -m benchmarks.<nazwa>).
@@ -0,0 +1,81 @@
+import argparse
+import pickle
+import random
+import time
+
+import streamlit as st
+
+from benchmarks.synthetic import synthetic_catalog
+from utils.scoring import KeywordIndex, expand_recommendations, recommendation_key
+
+
+# Szczegóły filmu w kształcie odpowiedzi TMDB (z obsadą, jak w pages/movie.py)
+def detailed(movie, rnd):
+    return {**movie,
+            "overview": " ".join(rnd.choice(["film", "historia", "bohater", "miasto", "wojna"]) for _ in range(60)),
+            "spoken_languages": [{"iso_639_1": "en", "name": "English"}],
+            "production_companies": [{"id": i, "name": f"Studio {i}", "origin_country": "US"} for i in range(4)],
+            "credits": {
+                "cast": [{"id": rnd.randrange(10**6), "name": f"Aktor {i}", "character": f"Postać {i}", "order": i}
+                         for i in range(60)],
+                "crew": [{"id": rnd.randrange(10**6), "name": f"Osoba {i}", "job": "Crew", "department": "Crew"}
+                         for i in range(80)],
+            }}
+
+
+# Porównanie: klucz z całych rekordów filmów vs krótki klucz z id (trafienia w pamięć podręczną)
+def run(candidates, repeats, seed=0):
+    rnd = random.Random(seed)
+    movies, keywords = synthetic_catalog(candidates + 1, seed=seed)
+    movies = [detailed(m, rnd) for m in movies]
+    movie, candidate_movies = movies[0], movies[1:]
+
+    def score(movie, candidate_movies, top_n):
+        index = KeywordIndex(candidate_movies, keywords)
+        return index.recommend(movie, keywords[movie['id']], top_n)
+
+    @st.cache_data
+    def by_records(movie, candidate_movies, top_n=51):
+        return score(movie, candidate_movies, top_n)
+
+    @st.cache_data
+    def by_key(key, _movie, _candidate_movies, top_n=51):
+        return [(s, m['id']) for s, m, _, _ in score(_movie, _candidate_movies, top_n)]
+
+    def with_key(movie, candidate_movies, top_n=51):
+        key = recommendation_key(movie['id'], [m['id'] for m in candidate_movies], "pl-PL", False)
+        ranked = by_key(key, movie, candidate_movies, top_n)
+        return expand_recommendations(ranked, {g['name'] for g in movie['genres']}, keywords[movie['id']],
+                                      candidate_movies, lambda m: keywords[m['id']])
+
+    start = time.perf_counter()
+    score(movie, candidate_movies, 51)
+    scoring = time.perf_counter() - start
+
+    key = recommendation_key(movie['id'], [m['id'] for m in candidate_movies], "pl-PL", False)
+    results = {}
+    for name, fn, stored in (("rekordy", by_records, lambda: by_records(movie, candidate_movies)),
+                             ("klucz id", with_key, lambda: by_key(key, movie, candidate_movies))):
+        fn(movie, candidate_movies)  # pierwsze wywołanie: zapis do pamięci podręcznej
+        start = time.perf_counter()
+        for _ in range(repeats):
+            value = fn(movie, candidate_movies)
+        hit = (time.perf_counter() - start) / repeats
+        results[name] = (hit, len(pickle.dumps(stored())), value)
+
+    assert [(s, m['id'], g, k) for s, m, g, k in results["rekordy"][2]] == \
+           [(s, m['id'], g, k) for s, m, g, k in results["klucz id"][2]], "różne wyniki"
+    return scoring, results
+
+
+# Uruchomienie: python -m benchmarks.cache_keys
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Koszt haszowania i serializacji argumentów custom_recommendations")
+    parser.add_argument("--candidates", type=int, default=71)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    scoring, results = run(args.candidates, args.repeats)
+    print(f"{args.candidates} kandydatów, sama punktacja: {scoring * 1000:.2f} ms")
+    for name, (hit, size, _) in results.items():
+        print(f"{name:>9}: trafienie {hit * 1000:7.2f} ms, zapisany wynik {size / 1024:8.1f} KB")
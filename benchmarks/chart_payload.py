@@ -0,0 +1,83 @@
+import argparse
+import json
+import random
+
+import altair as alt
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_catalog
+from utils.charts import genre_chart, popularity_chart, rating_chart, votes_chart
+from utils.dashboard import dashboard_summary, vote_comparison
+
+
+# Lista filmów w kształcie odpowiedzi /discover/movie z TMDB (ze wszystkimi polami, jak na stronie głównej)
+def tmdb_results(n, seed=0):
+    rnd = random.Random(seed)
+    movies, _ = synthetic_catalog(n, seed=seed)
+    return [{
+        "adult": False,
+        "backdrop_path": f"/{rnd.getrandbits(64):x}.jpg",
+        "genre_ids": [g["id"] for g in m["genres"]],
+        "id": m["id"],
+        "original_language": "en",
+        "original_title": m["title"],
+        "overview": " ".join(rnd.choice(["film", "historia", "bohater", "miasto", "wojna", "miłość"])
+                             for _ in range(rnd.randint(30, 90))),
+        "popularity": m["popularity"],
+        "poster_path": f"/{rnd.getrandbits(64):x}.jpg",
+        "release_date": f"{rnd.randint(1970, 2024)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "title": m["title"],
+        "video": False,
+        "vote_average": round(rnd.uniform(4, 9), 1),
+        "vote_count": rnd.randint(1000, 30000),
+    } for m in movies]
+
+
+def spec_size(chart):
+    return len(json.dumps(chart.to_dict(), separators=(",", ":"), default=str).encode("utf-8"))
+
+
+# Wykresy w dotychczasowej postaci: alt.Chart na pełnej ramce z odpowiedzi TMDB
+def raw_charts(movies, genre_names):
+    df = pd.DataFrame(movies)
+    df["release_year"] = pd.to_datetime(df["release_date"], errors="coerce").dt.year
+    rows = [{"Gatunek": genre_names.get(g, "Inne"), "Film": t} for t, ids in zip(df["title"], df["genre_ids"]) for g in ids]
+    genre_count = pd.DataFrame(rows).groupby("Gatunek").count().reset_index().rename(columns={"Film": "Liczba filmów"})
+    df_votes = pd.DataFrame(movies[:10] + [movies[-1]])
+    df_votes["highlight"] = df_votes["id"] == movies[-1]["id"]
+    return {
+        "Popularność": alt.Chart(df.sort_values("popularity", ascending=False).head(20)).mark_bar().encode(
+            x="popularity:Q", y=alt.Y("title:N", sort="-x")),
+        "Oceny": alt.Chart(df).mark_bar().encode(x=alt.X("vote_average:Q", bin=alt.Bin(maxbins=10)), y="count()"),
+        "Gatunki": alt.Chart(genre_count).mark_bar().encode(x="Liczba filmów:Q", y=alt.Y("Gatunek:N", sort="-x")),
+        "Głosy w gatunku": alt.Chart(df_votes).mark_bar().encode(x=alt.X("title:N", sort="-y"), y="vote_count:Q"),
+    }
+
+
+# Te same wykresy z warstwy utils/charts.py (dane przycięte i zagregowane na serwerze)
+def layer_charts(movies, genre_names):
+    summary = dashboard_summary(movies, genre_names)
+    return {
+        "Popularność": popularity_chart(summary["popularity_top"]),
+        "Oceny": rating_chart(summary["rating_bins"]),
+        "Gatunki": genre_chart(summary["genre_counts"]),
+        "Głosy w gatunku": votes_chart(vote_comparison(movies[:10], movies[-1])),
+    }
+
+
+# Uruchomienie: python -m benchmarks.chart_payload [--movies 20]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rozmiar specyfikacji wykresów Vega-Lite: pełne dane TMDB vs warstwa wykresów")
+    parser.add_argument("--movies", type=int, default=20)
+    args = parser.parse_args()
+
+    movies = tmdb_results(args.movies)
+    genre_names = {g["id"]: g["name"] for m in synthetic_catalog(args.movies)[0] for g in m["genres"]}
+    raw, layer = raw_charts(movies, genre_names), layer_charts(movies, genre_names)
+    total_raw = total_layer = 0
+    for name in raw:
+        before, after = spec_size(raw[name]), spec_size(layer[name])
+        total_raw, total_layer = total_raw + before, total_layer + after
+        print(f"{name:>16}: {before / 1024:8.1f} KB -> {after / 1024:6.1f} KB")
+    print(f"{'razem':>16}: {total_raw / 1024:8.1f} KB -> {total_layer / 1024:6.1f} KB "
+          f"({total_raw / total_layer:.1f}x mniej)")
@@ -0,0 +1,187 @@
+import argparse
+import json
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import requests
+
+from utils import scoring
+from utils.candidates import QUERY_KEYWORDS, candidate_tasks
+from utils.catalog import API_KEY, DATA_DIR, FETCH_WORKERS, load_catalog, stored_keywords
+from utils.minhash import MinHashIndex
+
+FIXTURES_PATH = DATA_DIR / "fixtures" / "tmdb_recommendations.json"
+
+# Warianty do porównania: rozmiar puli kandydatów (na źródło) i nadpisane stałe z utils/scoring.py
+CONFIGS = [
+    {"name": "pula 10", "pool": 10},
+    {"name": "pula 51", "pool": 51},
+    {"name": "pula 100", "pool": 100},
+    {"name": "pula 51, bez gat. obowiązkowych", "pool": 51, "MANDATORY_GENRES": set()},
+    {"name": "pula 51, słowa kluczowe x2", "pool": 51, "KEYWORD_WEIGHT": 2},
+]
+
+
+# Zapis list /movie/{id}/recommendations z TMDB dla filmów-wzorców (wzorzec "prawdy" do oceny offline)
+def record_fixtures(seed_ids, path=FIXTURES_PATH):
+    def fetch(movie_id):
+        r = requests.get(f"https://api.themoviedb.org/3/movie/{movie_id}/recommendations",
+                         params={"api_key": API_KEY, "language": "pl-PL", "page": 1}, timeout=10)
+        return [m["id"] for m in r.json().get("results", [])]
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        truth = dict(zip(map(str, seed_ids), pool.map(fetch, seed_ids)))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"recorded": time.strftime("%Y-%m-%d"), "recommendations": truth}))
+    return truth
+
+
+# Tymczasowa zmiana wag / gatunków obowiązkowych w utils.scoring
+@contextmanager
+def scoring_config(**overrides):
+    previous = {name: getattr(scoring, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(scoring, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(scoring, name, value)
+
+
+class OfflineRecommender:
+    """Ścieżka z pages/recommendations.py na lokalnym katalogu, bez zapytań do TMDB.
+
+    Źródła discover (gatunki, słowa kluczowe) są odtwarzane z katalogu: filmy posortowane po popularności.
+    Źródła /recommendations i /similar są pominięte - to z nich pochodzi "prawda" do oceny.
+    Katalog nie zapisuje języka oryginału, więc filtr with_original_language też jest pominięty.
+    """
+
+    def __init__(self, movies):
+        self.movies = sorted(movies, key=lambda m: m.get('popularity') or 0, reverse=True)
+        self.by_id = {m['id']: m for m in self.movies}
+        self.keywords = {m['id']: stored_keywords(m) for m in self.movies}
+        self.genres = [frozenset(g['name'] for g in m.get('genres', [])) for m in self.movies]
+        self.postings = {}  # słowo kluczowe -> pozycje filmów (rosnąco = malejąca popularność)
+        for i, m in enumerate(self.movies):
+            for k in set(self.keywords[m['id']]):
+                self.postings.setdefault(k, []).append(i)
+        self.minhash = MinHashIndex(self.movies, self.keywords)
+
+    def candidates(self, movie, pool):
+        seed_genres = frozenset(g['name'] for g in movie.get('genres', []))
+        seed_keywords = self.keywords[movie['id']]
+
+        by_keywords = sorted({i for k in seed_keywords[:QUERY_KEYWORDS] for i in self.postings.get(k, ())})[:pool]
+        by_genres = []
+        if seed_genres:
+            for i, genres in enumerate(self.genres):
+                if seed_genres <= genres:
+                    by_genres.append(i)
+                    if len(by_genres) >= pool:
+                        break
+
+        # kolejność jak w utils/candidates.py, potem sąsiedzi z MinHash (jak na stronie)
+        seen, result = {movie['id']}, []
+        for m in [self.movies[i] for i in by_keywords + by_genres]:
+            if m['id'] not in seen:
+                seen.add(m['id'])
+                result.append(m)
+        # kandydaci z discover po usunięciu duplikatów - rekordy list TMDB nie mają słów kluczowych
+        from_tmdb = len(result)
+        for _, m in self.minhash.query(seed_keywords, exclude_id=movie['id']):
+            if m['id'] not in seen:
+                seen.add(m['id'])
+                result.append(m)
+
+        # zapytania, które wysłałaby strona: odtwarzane źródła discover (bez pominiętych /recommendations
+        # i /similar), słowa kluczowe wzorca i po jednym na kandydata z discover (kandydaci z MinHash
+        # pochodzą z katalogu i mają słowa kluczowe zapisane)
+        genre_ids = tuple(g['id'] for g in movie.get('genres', []))
+        tasks = candidate_tasks(movie['id'], genre_ids, tuple(seed_keywords), None, pool)
+        calls = sum(1 for name, _ in tasks if name in ("keywords", "genres")) + 1 + from_tmdb
+        return result, calls
+
+    def recommend(self, movie, pool, k):
+        candidates, calls = self.candidates(movie, pool)
+        index = scoring.KeywordIndex(candidates, self.keywords)
+        return index.recommend(movie, self.keywords[movie['id']], k), calls
+
+
+# Ocena jednego wariantu: precision/recall@k, pokrycie katalogu, opóźnienie, zapytania TMDB, szczyt pamięci
+def evaluate(recommender, truth, config, k=10):
+    overrides = {name: value for name, value in config.items() if name.isupper()}
+    precisions, recalls, latencies, calls = [], [], [], []
+    recommended = set()
+    with scoring_config(**overrides):
+        for seed_id, expected in truth.items():
+            movie = recommender.by_id.get(int(seed_id))
+            # "prawda" ograniczona do filmów z katalogu - tylko te recommender może w ogóle zwrócić
+            expected = {i for i in expected if i in recommender.by_id}
+            if movie is None or not expected:
+                continue
+            start = time.perf_counter()
+            recs, n_calls = recommender.recommend(movie, config["pool"], k)
+            latencies.append(time.perf_counter() - start)
+            calls.append(n_calls)
+
+            found = [m['id'] for _, m, _, _ in recs]
+            hits = len(expected.intersection(found))
+            precisions.append(hits / k)
+            recalls.append(hits / len(expected))
+            recommended.update(found)
+
+        # szczyt pamięci w osobnym przebiegu (tracemalloc spowalnia, więc nie wlicza się do opóźnień)
+        tracemalloc.start()
+        for seed_id in truth:
+            movie = recommender.by_id.get(int(seed_id))
+            if movie is not None:
+                recommender.recommend(movie, config["pool"], k)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    if not latencies:
+        return None
+    return {
+        "wariant": config["name"],
+        "wzorce": len(latencies),
+        f"precision@{k}": float(np.mean(precisions)),
+        f"recall@{k}": float(np.mean(recalls)),
+        "pokrycie": len(recommended) / len(recommender.movies),
+        "p50 ms": 1000 * float(np.percentile(latencies, 50)),
+        "p95 ms": 1000 * float(np.percentile(latencies, 95)),
+        "zapytania TMDB": float(np.mean(calls)),
+        "pamięć MB": peak / 2**20,
+    }
+
+
+# Uruchomienie: python -m benchmarks.evaluate [--record --seeds 200]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ocena offline rekomendacji względem list TMDB /recommendations")
+    parser.add_argument("--record", action="store_true", help="pobierz listy TMDB dla wzorców (wymaga klucza API)")
+    parser.add_argument("--seeds", type=int, default=200, help="liczba wzorców (najwięcej głosów w katalogu)")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    catalog = load_catalog()
+    if args.record:
+        seeds = sorted(catalog, key=lambda m: m.get('vote_count') or 0, reverse=True)[:args.seeds]
+        record_fixtures([m['id'] for m in seeds])
+    if not FIXTURES_PATH.exists():
+        raise SystemExit(f"Brak {FIXTURES_PATH} - uruchom najpierw z --record")
+
+    truth = json.loads(FIXTURES_PATH.read_text())["recommendations"]
+    recommender = OfflineRecommender(catalog)
+    rows = [row for row in (evaluate(recommender, truth, config, args.k) for config in CONFIGS) if row]
+    if not rows:
+        raise SystemExit("Żaden wzorzec z nagrania nie ma rekomendacji TMDB w katalogu")
+
+    columns = list(rows[0])
+    width = max(len(row["wariant"]) for row in rows)
+    print(f"{'wariant':<{width}} | " + " | ".join(f"{c:>12}" for c in columns[1:]))
+    for row in rows:
+        print(f"{row['wariant']:<{width}} | " + " | ".join(
+            f"{row[c]:>12.3f}" if isinstance(row[c], float) else f"{row[c]:>12}" for c in columns[1:]))
@@ -0,0 +1,41 @@
+import argparse
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks.chart_payload import tmdb_results
+from utils import frames
+from utils.dashboard import COLUMNS
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+# Ramka w dotychczasowej postaci: wszystkie pola odpowiedzi TMDB jako obiekty Pythona
+def object_frame(movies):
+    return pd.DataFrame(movies)
+
+
+def arrow_frame(movies):
+    return frames.movies_frame(movies, COLUMNS)
+
+
+# Uruchomienie: python -m benchmarks.frames [--sizes 1000 10000 100000]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budowa ramek z list filmów TMDB: typy obiektowe vs Arrow")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'filmy':>8} {'ramka':>8} {'budowa ms':>10} {'pamięć MiB':>11} {'do Arrow ms':>12}")
+    for n in args.sizes:
+        movies = tmdb_results(n)
+        for name, build in (("obiekty", object_frame), ("arrow", arrow_frame)):
+            df, build_time = timed(build, movies)
+            # przekazanie ramki do st.dataframe / Altair i tak przechodzi przez tabelę Arrow
+            _, handoff_time = timed(pa.Table.from_pandas, df)
+            print(f"{n:>8} {name:>8} {build_time * 1000:>10.1f} {df.memory_usage(deep=True).sum() / 2**20:>11.1f} "
+                  f"{handoff_time * 1000:>12.1f}")
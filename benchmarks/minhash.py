@@ -0,0 +1,67 @@
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_catalog
+from utils.minhash import MinHashIndex
+from utils.sparse_scoring import incidence_matrix
+
+
+# Dokładne top-k wg Jaccarda (iloczyn macierzy rzadkiej przez wektor wzorca)
+def exact_top_k(matrix, sizes, row, k):
+    intersection = (matrix @ matrix[row].T).toarray().ravel()
+    union = sizes + sizes[row] - intersection
+    jaccard = np.divide(intersection, union, out=np.zeros(len(sizes)), where=union > 0)
+    jaccard[row] = 0
+    top = np.argsort(-jaccard, kind="stable")[:k]
+    return top[jaccard[top] > 0], jaccard
+
+
+# Czułość (recall@k) i czas zapytań indeksu LSH względem dokładnego Jaccarda
+def run(n, queries, k, strong=0.3, seed=0):
+    movies, keywords = synthetic_catalog(n, seed=seed)
+    start = time.perf_counter()
+    index = MinHashIndex(movies, keywords)
+    build_time = time.perf_counter() - start
+
+    matrix, _ = incidence_matrix(keywords[m['id']] for m in movies)
+    sizes = np.asarray(matrix.sum(axis=1)).ravel()
+
+    rnd = np.random.default_rng(seed)
+    rows = [int(r) for r in rnd.choice(np.flatnonzero(sizes >= 3), size=queries, replace=False)]
+    recalls, strong_recalls, lsh_times, exact_times = [], [], [], []
+    for row in rows:
+        movie = movies[row]
+        start = time.perf_counter()
+        found = index.query(keywords[movie['id']], k=k, exclude_id=movie['id'])
+        lsh_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        expected, jaccard = exact_top_k(matrix, sizes, row, k)
+        exact_times.append(time.perf_counter() - start)
+
+        found_ids = {m['id'] for _, m in found}
+        if len(expected):
+            recalls.append(len(found_ids & {movies[i]['id'] for i in expected}) / len(expected))
+        # osobno sąsiedzi wyraźnie podobni (Jaccard >= strong)
+        expected_strong = {movies[i]['id'] for i in expected if jaccard[i] >= strong}
+        if expected_strong:
+            strong_recalls.append(len(found_ids & expected_strong) / len(expected_strong))
+
+    ms = lambda values, q: 1000 * float(np.percentile(values, q))
+    print(f"katalog: {n} filmów, budowa indeksu: {build_time:.1f} s")
+    print(f"recall@{k}: {np.mean(recalls):.3f} (zapytania z sąsiadami: {len(recalls)}/{queries})")
+    if strong_recalls:
+        print(f"recall@{k} dla Jaccard >= {strong}: {np.mean(strong_recalls):.3f} ({len(strong_recalls)} zapytań)")
+    print(f"LSH:      p50 {ms(lsh_times, 50):.2f} ms, p95 {ms(lsh_times, 95):.2f} ms")
+    print(f"dokładny: p50 {ms(exact_times, 50):.2f} ms, p95 {ms(exact_times, 95):.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MinHash LSH vs dokładny Jaccard na katalogu syntetycznym")
+    parser.add_argument("--movies", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    args = parser.parse_args()
+    run(args.movies, args.queries, args.k)
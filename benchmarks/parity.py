@@ -0,0 +1,43 @@
+import argparse
+import random
+
+from benchmarks.synthetic import synthetic_catalog
+from utils.scoring import KeywordIndex, reference_recommendations
+from utils.sparse_scoring import SparseScorer
+
+
+# Wynik w postaci porównywalnej między implementacjami (id zamiast całych słowników)
+def comparable(recommendations):
+    return [(score, movie['id'], frozenset(genres), frozenset(keywords))
+            for score, movie, genres, keywords in recommendations]
+
+
+# Porównanie szybszych wersji punktacji z pierwotną pętlą na losowych katalogach
+def check_parity(rounds=200, seed=0):
+    rnd = random.Random(seed)
+    failures = []
+    for r in range(rounds):
+        movies, keywords = synthetic_catalog(rnd.randint(1, 400), n_keywords=rnd.choice([5, 30, 200]), seed=r)
+        # powtórzone id kandydatów też muszą dawać identyczny wynik
+        if rnd.random() < 0.3:
+            movies.append(dict(rnd.choice(movies)))
+        top_n = rnd.choice([1, 5, 10, 51, 1000])
+        seed_movie = rnd.choice(movies)
+        seed_keywords = keywords[seed_movie['id']]
+
+        expected = comparable(reference_recommendations(seed_movie, seed_keywords, movies, keywords, top_n))
+        for scorer in (KeywordIndex(movies, keywords), SparseScorer(movies, keywords)):
+            if comparable(scorer.recommend(seed_movie, seed_keywords, top_n)) != expected:
+                failures.append((r, type(scorer).__name__))
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zgodność szybkich wersji punktacji z pierwotną pętlą")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    failures = check_parity(args.rounds)
+    if failures:
+        raise SystemExit(f"Niezgodne wyniki: {failures[:10]}")
+    print(f"OK - {args.rounds} losowych katalogów, wyniki identyczne")
@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.parity import comparable
+from benchmarks.synthetic import synthetic_catalog
+from utils.scoring import KeywordIndex, reference_recommendations
+from utils.sparse_scoring import SparseScorer
+
+# Historia wyników (jedna linia JSON na katalog, implementację i commit) - w repozytorium, razem z kodem,
+# żeby porównanie obejmowało pomiary z poprzednich commitów także w nowym klonie
+RESULTS_PATH = Path(__file__).resolve().parent / "results" / "scoring.jsonl"
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+# Dopuszczalny wzrost czasu zapytania (p50) względem ostatniego innego commitu na tej samej maszynie:
+# względny i bezwzględny (oba muszą zostać przekroczone - przy krótkich zapytaniach szum to ułamki ms)
+TOLERANCE = 0.25
+MIN_DELTA_MS = 1.0
+# Ile razy mierzymy każde zapytanie (liczy się najkrótszy czas - najmniej zaburzony przez resztę systemu)
+REPEATS = 5
+# Wzorce przeliczane też pierwotną pętlą (przy 1M filmów jedno zapytanie pętli trwa kilka sekund)
+REFERENCE_QUERIES = 5
+
+
+# Pierwotna pętla z custom_recommendations jako "scorer" z tym samym interfejsem
+class ReferenceLoop:
+    def __init__(self, movies, keywords):
+        self.movies = movies
+        self.keywords = keywords
+
+    def recommend(self, movie, movie_keywords, top_n=51):
+        return reference_recommendations(movie, movie_keywords, self.movies, self.keywords, top_n)
+
+
+SCORERS = {"pętla": ReferenceLoop, "KeywordIndex": KeywordIndex, "SparseScorer": SparseScorer}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+# Znacznik maszyny: porównujemy tylko pomiary z tym samym procesorem, liczbą rdzeni i wersją Pythona
+def machine_tag():
+    cpu = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo") as f:
+            cpu = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), cpu)
+    except OSError:
+        pass
+    return f"{cpu} x{os.cpu_count()}, Python {platform.python_version()}"
+
+
+# Czas budowy (bez tracemalloc) i szczyt pamięci budowy (osobno, bo tracemalloc spowalnia)
+def build(scorer_class, movies, keywords):
+    start = time.perf_counter()
+    scorer = scorer_class(movies, keywords)
+    build_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    scorer_class(movies, keywords)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return scorer, build_time, peak
+
+
+# Pomiar jednej wielkości katalogu: czasy i pamięć każdej implementacji oraz zgodność z pętlą
+def run(n, queries, top_n=51, seed=0, repeats=REPEATS):
+    movies, keywords = synthetic_catalog(n, seed=seed)
+    rnd = np.random.default_rng(seed)
+    with_keywords = [m for m in movies if keywords[m['id']]]
+    seeds = [with_keywords[i] for i in rnd.choice(len(with_keywords), size=min(queries, len(with_keywords)),
+                                                  replace=False)]
+
+    rows, expected = [], {}
+    for name, scorer_class in SCORERS.items():
+        scorer, build_time, peak = build(scorer_class, movies, keywords)
+        sample = seeds[:REFERENCE_QUERIES] if scorer_class is ReferenceLoop else seeds
+        times, parity = [], True
+        for movie in sample:
+            best = None
+            # pętla na dużym katalogu liczy jedno zapytanie kilka sekund - tam szum jest pomijalny
+            for _ in range(1 if scorer_class is ReferenceLoop and n > 100_000 else repeats):
+                start = time.perf_counter()
+                result = scorer.recommend(movie, keywords[movie['id']], top_n)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times.append(best)
+
+            result = comparable(result)
+            if scorer_class is ReferenceLoop:
+                expected[movie['id']] = result
+            elif movie['id'] in expected and result != expected[movie['id']]:
+                parity = False
+        rows.append({
+            "size": n,
+            "scorer": name,
+            "queries": len(times),
+            "build s": build_time,
+            "p50 ms": 1000 * float(np.percentile(times, 50)),
+            "p95 ms": 1000 * float(np.percentile(times, 95)),
+            "memory MB": peak / 2**20,
+            "parity": parity,
+        })
+        del scorer
+    return rows
+
+
+def load_history(path=RESULTS_PATH):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+# Regresje: wolniejsze zapytania niż w ostatnim zapisanym pomiarze innego commitu na tej samej maszynie
+# (ta sama wielkość i implementacja); pomiary z niezatwierdzonych zmian nie są punktem odniesienia
+def regressions(rows, history, commit, machine, tolerance=TOLERANCE, min_delta_ms=MIN_DELTA_MS):
+    found = []
+    for row in rows:
+        previous = [h for h in history if h["size"] == row["size"] and h["scorer"] == row["scorer"]
+                    and h.get("machine") == machine and h["commit"] != commit
+                    and not h["commit"].endswith("-dirty")]
+        if not previous:
+            continue
+        last = previous[-1]
+        if row["p50 ms"] > last["p50 ms"] * (1 + tolerance) and row["p50 ms"] - last["p50 ms"] > min_delta_ms:
+            found.append((row, last))
+    return found
+
+
+# Uruchomienie: python -m benchmarks.scoring [--sizes 1000 10000 --queries 50 --no-save]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Czas, pamięć i zgodność implementacji punktacji rekomendacji")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="pomiary każdego zapytania (liczy się najkrótszy)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--min-delta", type=float, default=MIN_DELTA_MS, help="najmniejszy wzrost p50 (ms) uznany za regresję")
+    parser.add_argument("--no-save", action="store_true", help="nie dopisuj wyników do historii")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    machine = machine_tag()
+    history = load_history()
+    rows = []
+    print(f"{'filmy':>9} | {'implementacja':<13} | {'budowa s':>9} | {'p50 ms':>9} | {'p95 ms':>9} | "
+          f"{'pamięć MB':>9} | zgodność")
+    for n in args.sizes:
+        for row in run(n, args.queries, repeats=args.repeats):
+            rows.append(row)
+            print(f"{row['size']:>9} | {row['scorer']:<13} | {row['build s']:>9.2f} | {row['p50 ms']:>9.2f} | "
+                  f"{row['p95 ms']:>9.2f} | {row['memory MB']:>9.1f} | {'tak' if row['parity'] else 'NIE'}")
+
+    if args.no_save:
+        pass
+    elif commit == "unknown" or commit.endswith("-dirty"):
+        print(f"Nie zapisano wyników: pomiar z niezatwierdzonych zmian ({commit})")
+    else:
+        RESULTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        date = datetime.now().isoformat(timespec="seconds")
+        with RESULTS_PATH.open("a") as f:
+            for row in rows:
+                f.write(json.dumps({"commit": commit, "machine": machine, "date": date, **row},
+                                   ensure_ascii=False) + "\n")
+
+    problems = [f"{row['size']} filmów, {row['scorer']}: wynik różny od pętli" for row in rows if not row["parity"]]
+    for row, last in regressions(rows, history, commit, machine, args.tolerance, args.min_delta):
+        problems.append(f"{row['size']} filmów, {row['scorer']}: p50 {row['p50 ms']:.2f} ms "
+                        f"(było {last['p50 ms']:.2f} ms w {last['commit']})")
+    if problems:
+        raise SystemExit("Regresje:\n" + "\n".join(problems))
+    print(f"OK - commit {commit} ({machine}), brak regresji")
@@ -0,0 +1,34 @@
+import random
+
+# Gatunki TMDB (nazwy angielskie, żeby działały też gatunki obowiązkowe)
+GENRES = ["Action", "Adventure", "Animation", "Comedy", "Crime", "Documentary", "Drama",
+          "Family", "Fantasy", "History", "Horror", "Music", "Mystery", "Romance",
+          "Science Fiction", "TV Movie", "Thriller", "War", "Western"]
+# Udział gatunków w katalogu TMDB (w przybliżeniu)
+GENRE_WEIGHTS = [10, 5, 4, 14, 6, 5, 20, 4, 4, 2, 7, 2, 3, 8, 4, 2, 9, 1, 1]
+
+
+# Funkcja generująca syntetyczny katalog: gatunki z rozkładu TMDB, słowa kluczowe z rozkładu Zipfa
+def synthetic_catalog(n, n_keywords=None, seed=0):
+    rnd = random.Random(seed)
+    n_keywords = n_keywords or max(50, n // 5)
+    keyword_weights = [1 / (rank + 1) for rank in range(n_keywords)]
+    cumulative = []
+    total = 0.0
+    for w in keyword_weights:
+        total += w
+        cumulative.append(total)
+
+    movies, keywords = [], {}
+    for i in range(n):
+        movie_id = i + 1
+        genres = set(rnd.choices(GENRES, weights=GENRE_WEIGHTS, k=rnd.choice([1, 1, 2, 2, 2, 3, 3, 4])))
+        movies.append({
+            "id": movie_id,
+            "title": f"Film {movie_id}",
+            "popularity": rnd.paretovariate(1.5),
+            "genres": [{"id": GENRES.index(g), "name": g} for g in sorted(genres)]
+        })
+        count = min(int(rnd.expovariate(1 / 8)), 40)
+        keywords[movie_id] = [f"kw{k}" for k in rnd.choices(range(n_keywords), cum_weights=cumulative, k=count)]
+    return movies, keywords
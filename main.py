@@ -1,11 +1,14 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 import requests
 from streamlit_searchbox import st_searchbox
 from datetime import date
 import os
 
+from utils.autocomplete import DEBOUNCE_MS, autocomplete
+from utils.charts import genre_chart, payload_report, popularity_chart, rating_chart, show_chart
+from utils.dashboard import dashboard_summary, movies_key
+from utils.title_index import load_title_index, movie_label
+
 API_KEY = os.getenv("TMDB_API_KEY")
 
 # Aplikacja korzysta z danych TMDB API, ale nie jest oficjalnie powiązana z TMDB.
@@ -58,12 +61,12 @@ today = date.today().isoformat()
 
 ### Funkcje 
 
-# Funkcja do wyszukiwania filmów
-@st.cache_data(ttl=3600)
-def search_movies(query: str):
-    if not query or len(query) < 1:
-        return []
+# Liczba podpowiedzi w wyszukiwarce
+SEARCH_LIMIT = 20
 
+# Funkcja pobierająca podpowiedzi tytułów z TMDB (z pamięcią wspólną dla wszystkich sesji)
+@autocomplete(text=lambda m: f"{m.get('title', '')} {m.get('original_title', '')}")
+def tmdb_search_movies(query):
     r = requests.get(
         "https://api.themoviedb.org/3/search/movie",
         params={
@@ -72,24 +75,28 @@ def search_movies(query: str):
             "language": "pl-PL",
             "page": 1,
             "include_adult": False
-        }
+        },
+        timeout=10
     )
+    return r.json().get("results", [])
 
-    results = r.json().get("results", [])
-
-    # Sortowanie po popularności
-    results = sorted(results, key=lambda x: x.get("popularity", 0), reverse=True)
+# Funkcja do wyszukiwania filmów
+def search_movies(query: str):
+    if not query or len(query) < 1:
+        return []
 
-    titles = []
-    for movie in results[:20]:
-        title = movie["title"]
-        year = movie.get("release_date", "")[:4]
-        label = f"{title} ({year})" if year else title
+    # Lokalny indeks tytułów (działa bez polskich znaków i z literówkami)
+    results = load_title_index().search(query, k=SEARCH_LIMIT)
 
-        titles.append(label)
-        st.session_state.movie_title_to_id[label] = movie["id"]
+    # Uzupełnienie wynikami z TMDB, jeśli lokalny katalog nie wystarczył
+    if len(results) < SEARCH_LIMIT:
+        # Sortowanie po popularności
+        tmdb_results = sorted(tmdb_search_movies(query), key=lambda x: x.get("popularity", 0), reverse=True)
+        seen = {m["id"] for m in results}
+        results += [m for m in tmdb_results if m["id"] not in seen]
 
-    return titles
+    # tuple(label, id) - searchbox zwraca od razu id wybranego filmu
+    return [(movie_label(movie), movie["id"]) for movie in results[:SEARCH_LIMIT]]
 
 # Funkcja do odczytania czasu trwania filmu
 @st.cache_data(ttl=3600)
@@ -142,89 +149,103 @@ def fetch_genres():
 
 
 
-# Header
-st.subheader("Wyszukiwarka filmów", text_alignment="center",
-             help="Zacznij wpisywać tytuł filmu, aby pokazały się dostępne opcje.")
-
+# Strona składa się z fragmentów (st.fragment): kliknięcie w jednym z nich uruchamia ponownie tylko ten
+# fragment, a nie cały skrypt (wyszukiwarka, nawigacja, lista TOP i dashboard nie przeliczają się nawzajem)
 
 ## SEARCHBOX (wyszukiwarka filmów)
-
-# stan dla klucza szukanego filmu
-# 'licznik'
-if "movie_search_key" not in st.session_state:
-    st.session_state.movie_search_key = 0
-# mapowanie
-if "movie_title_to_id" not in st.session_state: 
-    st.session_state.movie_title_to_id = {}
-
-# Searchbox (wyszukiwarka filmów)
-selected_movie = st_searchbox(search_movies,
-                              key=f"movie_searchbox_{st.session_state.movie_search_key}",
-                              placeholder="Np. Shrek, Avatar, Zmierzch ...")
-
-# Sprawdzenie czy użytkownik wybrał film
-if selected_movie:
-    movie_id = st.session_state.movie_title_to_id.get(selected_movie)
-    # jeśli tak, zmieniana jest strona
-    if movie_id:
-        st.session_state.movie_search_key += 1  # reset 'searchbox'
-        st.switch_page("pages/movie.py", query_params={"id": movie_id})
+@st.fragment
+def movie_search():
+    # Header
+    st.subheader("Wyszukiwarka filmów", text_alignment="center",
+                 help="Zacznij wpisywać tytuł filmu, aby pokazały się dostępne opcje.")
+
+    # stan dla klucza szukanego filmu
+    # 'licznik'
+    if "movie_search_key" not in st.session_state:
+        st.session_state.movie_search_key = 0
+
+    # Searchbox (wyszukiwarka filmów); po każdym wyszukaniu komponent wywołuje st.rerun - tylko tego fragmentu
+    selected_movie = st_searchbox(search_movies, debounce=DEBOUNCE_MS,
+                                  key=f"movie_searchbox_{st.session_state.movie_search_key}",
+                                  placeholder="Np. Shrek, Avatar, Zmierzch ...",
+                                  rerun_scope="fragment")
+
+    # Sprawdzenie czy użytkownik wybrał film
+    if selected_movie:
+        movie_id = selected_movie
+        # jeśli tak, zmieniana jest strona
+        if movie_id:
+            st.session_state.movie_search_key += 1  # reset 'searchbox'
+            st.switch_page("pages/movie.py", query_params={"id": movie_id})
 
 
 # Przyciski 'co obejrzeć?', 'rekomendacje', 'analiza' - odnośniki
-col1, col2, col3 = st.columns(3)
-with col1:
-    if st.button("Co obejrzeć?", width = "stretch",
-                 help="Przejdź do strony, aby znaleźć film na podstawie filtrów."):
-        st.switch_page("pages/what2watch.py")
-with col2:
-    if st.button("Rekomendacje", width = "stretch",
-                 help="Przejdź do strony, aby znaleźć rekomendacje na podstawie filmu."):
-        st.switch_page("pages/recommendations.py")
-with col3:
-    if st.button("Analizy filmów", width = "stretch",
-              help="Przejdź do strony, aby znaleźć analizy filmów."):
-        st.switch_page("pages/analysis.py")
-
-st.divider()
-
-# Pobranie gatunków (słowniki)
-genres = fetch_genres()
-# Zamiana słownika w format name : id
-GENRE_NAME_TO_ID = {g["name"]: g["id"] for g in genres}
-
-
-# Wyświetlanie 'Top' filmów
-
-left, div, right = st.columns([10, 1, 10])
-
-with left:
-    st.subheader("TOP filmy", text_alignment="center", 
-             help="Wybierz kategorię i/lub gatunek, aby znaleźć filmy.")
-
-    # Wyświetlenie opcji do wyboru
-    selected_tab = st.pills(label="Kategoria", width="stretch",
-            options=["Najwyżej oceniane", "Popularne", "Nowości"],
-            key="top_movies_pills", default="Najwyżej oceniane")
-
-    selected_genre = st.pills("Gatunek", list(GENRE_NAME_TO_ID.keys()),
-                              help="Wybierz gatunek, aby filtrować filmy lub zostaw niezaznaczone, aby zobaczyć wszystkie.")
-    
-    # Ustawienie wartości "id gatunku"
-    genre_id = GENRE_NAME_TO_ID[selected_genre] if selected_genre else None
-
-    # Wyszukanie filmów na podstawie wybranych parametrów
-    movies = fetch_top_movies(category=selected_tab, genre_id=genre_id, min_votes=1000, limit=20)
-
-    st.subheader(f"Top 20 – {selected_tab}" + (f" / {selected_genre}" if selected_genre else ""),
-                 text_alignment="center")
-    
-    st.markdown(
-                "<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 20px;'>",
-                unsafe_allow_html=True
-            )
-
-    ## Wyświetlanie wyszukanych filmów:
+@st.fragment
+def navigation():
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Co obejrzeć?", width = "stretch",
+                     help="Przejdź do strony, aby znaleźć film na podstawie filtrów."):
+            st.switch_page("pages/what2watch.py")
+    with col2:
+        if st.button("Rekomendacje", width = "stretch",
+                     help="Przejdź do strony, aby znaleźć rekomendacje na podstawie filmu."):
+            st.switch_page("pages/recommendations.py")
+    with col3:
+        if st.button("Analizy filmów", width = "stretch",
+                  help="Przejdź do strony, aby znaleźć analizy filmów."):
+            st.switch_page("pages/analysis.py")
+
+
+# Wyświetlanie 'Top' filmów: wybór kategorii i gatunku, lista i dashboard tej samej listy filmów
+@st.fragment
+def top_movies(genres):
+    # Zamiana słownika w format name : id
+    GENRE_NAME_TO_ID = {g["name"]: g["id"] for g in genres}
+
+    left, div, right = st.columns([10, 1, 10])
+
+    with left:
+        st.subheader("TOP filmy", text_alignment="center",
+                 help="Wybierz kategorię i/lub gatunek, aby znaleźć filmy.")
+
+        # Wyświetlenie opcji do wyboru
+        selected_tab = st.pills(label="Kategoria", width="stretch",
+                options=["Najwyżej oceniane", "Popularne", "Nowości"],
+                key="top_movies_pills", default="Najwyżej oceniane")
+
+        selected_genre = st.pills("Gatunek", list(GENRE_NAME_TO_ID.keys()),
+                                  help="Wybierz gatunek, aby filtrować filmy lub zostaw niezaznaczone, aby zobaczyć wszystkie.")
+
+        # Ustawienie wartości "id gatunku"
+        genre_id = GENRE_NAME_TO_ID[selected_genre] if selected_genre else None
+
+        # Wyszukanie filmów na podstawie wybranych parametrów - jedna lista dla listy TOP i dashboardu
+        movies = fetch_top_movies(category=selected_tab, genre_id=genre_id, min_votes=1000, limit=20)
+
+        st.subheader(f"Top 20 – {selected_tab}" + (f" / {selected_genre}" if selected_genre else ""),
+                     text_alignment="center")
+
+        st.markdown(
+                    "<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 20px;'>",
+                    unsafe_allow_html=True
+                )
+
+        top_list(movies, genres)
+
+    with div:
+        st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
+                            unsafe_allow_html=True)
+
+    # Wyświetlenie dashboardów
+    with right:
+        dashboard(movies, genres)
+
+
+## Wyświetlanie wyszukanych filmów:
+@st.fragment
+def top_list(movies, genres):
+    genre_names = {g["id"]: g["name"] for g in genres}
     for movie in movies:
         col1, col2 = st.columns([1, 3], gap="small")
 
@@ -240,7 +261,7 @@ with left:
             st.markdown(f"### {movie.get('title', 'Brak tytułu')}")
 
             # Gatunki
-            movie_genres = [g['name'] for g in genres if g['id'] in movie.get('genre_ids', [])]
+            movie_genres = [genre_names[g] for g in movie.get('genre_ids', []) if g in genre_names]
             if movie_genres:
                 st.markdown("**Gatunki:** " + ", ".join(movie_genres))
 
@@ -260,34 +281,28 @@ with left:
 
         # Opis filmu
         overview = movie.get("overview", "Brak opisu")
-        st.markdown(f"<p style='text-align: justify; 'font-size:0.85rem'>{overview}</p>", unsafe_allow_html=True) 
+        st.markdown(f"<p style='text-align: justify; 'font-size:0.85rem'>{overview}</p>", unsafe_allow_html=True)
 
         if st.button("Pokaż szczegóły", width = "stretch", key=f"details_{movie['id']}"):
             st.session_state.movie_search_key += 1  # opcjonalny reset searchboxa
-            st.switch_page("pages/movie.py", query_params={"id": movie["id"]})   
+            st.switch_page("pages/movie.py", query_params={"id": movie["id"]})
 
         st.divider()
 
-with div:
-    st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
-                        unsafe_allow_html=True)    
 
-# Wyświetlenie dashboardów
-with right:
+@st.fragment
+def dashboard(movies, genres):
     st.subheader("Dashboard filmów")
-    
-    # Jeśli nie ma danych 
+
+    # Jeśli nie ma danych
     if not movies:
         st.info("Brak danych do wizualizacji")
-        st.stop()
+        return
+
+    # wszystkie analizy w jednym przebiegu, zapamiętane dla tej listy filmów
+    summary = dashboard_summary(movies, {g["id"]: g["name"] for g in genres})
+    chart_key = movies_key(movies)
 
-    # zmiana listy słowników na Dataframe
-    df = pd.DataFrame(movies)
-    
-    df["release_year"] = pd.to_datetime(
-        df["release_date"], errors="coerce" # zabezpieczenie przed pustymi datami
-    ).dt.year
-    
     # zakładki
     tab1, tab2, tab3 = st.tabs([
         "Popularność",
@@ -295,99 +310,65 @@ with right:
         "Gatunki"
     ])
 
-    
+
     with tab1:
         st.markdown("### Popularność filmów", help=("Popularność to dynamiczny wskaźnik TMDB oparty o aktywność i zainteresowanie użytkowników"))
 
-        # 20 najpopularniejszych filmów 
-        top_popular = df.sort_values(
-            "popularity", ascending=False
-        ).head(20)
+        # 20 najpopularniejszych filmów
+        top_popular = summary["popularity_top"]
 
         # wykres słupkowy
-        chart = alt.Chart(top_popular).mark_bar().encode(
-            x=alt.X("popularity:Q", title="Popularność"),
-            y=alt.Y("title:N", sort="-x", title="Film"),
-            tooltip=[
-        alt.Tooltip("title:N", title="Tytuł"),
-        alt.Tooltip("popularity:Q", title="Popularność")
-        ]
-        )
-
-        st.altair_chart(chart, use_container_width=True)
+        show_chart("Popularność", chart_key, popularity_chart, top_popular)
 
         col1, col2 = st.columns(2)
         col1.metric(
             "Średnia popularność",
-            f"{df['popularity'].mean():.1f}",
+            f"{summary['popularity_mean']:.1f}",
             help="Średnia popularność filmów w aktualnym zestawie"
         )
         col2.metric(
             "Najpopularniejszy film",
-            top_popular.iloc[0]["title"]
+            summary["most_popular"]
         )
 
 
     with tab2:
         st.markdown("### Rozkład ocen")
 
-        rating_hist = alt.Chart(df).mark_bar().encode(
-            x=alt.X(
-                "vote_average:Q",
-                bin=alt.Bin(maxbins=10), # ustalenie maksymalnej liczby przedziałów
-                title="Ocena"
-            ),
-            y=alt.Y("count()", title="Liczba filmów"),
-            tooltip=[alt.Tooltip("count():Q", title="Liczba filmów")]
-        )
-
-        st.altair_chart(rating_hist, use_container_width=True)
+        # przedziały policzone na serwerze (co 1 punkt oceny)
+        show_chart("Oceny", chart_key, rating_chart, summary["rating_bins"])
 
         col1, col2, col3 = st.columns(3)
-        col1.metric("Średnia ocena", f"{df['vote_average'].mean():.2f}")
-        col2.metric("Mediana", f"{df['vote_average'].median():.2f}")
+        col1.metric("Średnia ocena", f"{summary['rating_mean']:.2f}")
+        col2.metric("Mediana", f"{summary['rating_median']:.2f}")
         col3.metric(
             "Filmy > 7.5",
-            f"{len(df[df['vote_average'] > 7.5])}"
+            f"{summary['rating_high']}"
         )
 
 
     with tab3:
         st.markdown("### Dominujące gatunki")
 
-        # mapowanie Id gatunków z ich nazwami
-        genre_map = {g["id"]: g["name"] for g in genres}
-
-        # gatunki w filmie
-        genre_rows = []
-        for _, row in df.iterrows():
-            for gid in row.get("genre_ids", []):
-                genre_rows.append({
-                    "Gatunek": genre_map.get(gid, "Inne"),
-                    "Film": row["title"]
-                })
-
-        genre_df = pd.DataFrame(genre_rows)
-
-        genre_count = (
-            genre_df
-            .groupby("Gatunek")
-            .count()
-            .reset_index()
-            .rename(columns={"Film": "Liczba filmów"})
-            .sort_values("Liczba filmów", ascending=False)
-        )
+        genre_count = summary["genre_counts"]
 
-        chart = alt.Chart(genre_count).mark_bar().encode(
-            x=alt.X("Liczba filmów:Q"),
-            y=alt.Y("Gatunek:N", sort="-x"),
-            tooltip=["Gatunek", "Liczba filmów"]
-        )
-
-        st.altair_chart(chart, use_container_width=True)
+        show_chart("Gatunki", chart_key, genre_chart, genre_count)
 
         top_genre = genre_count.iloc[0]
         st.metric(
             "Dominujący gatunek",
             f"{top_genre['Gatunek']} ({top_genre['Liczba filmów']})"
         )
+
+    payload_report()
+
+
+movie_search()
+navigation()
+
+st.divider()
+
+# Pobranie gatunków (słowniki) - raz na pełne uruchomienie strony, fragmenty dostają je jako argument
+genres = fetch_genres()
+
+top_movies(genres)
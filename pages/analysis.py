@@ -1,10 +1,29 @@
 import streamlit as st
 import requests
 import pandas as pd
+import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.catalog import file_version, shared_catalog
+from utils.charts import budget_revenue_chart, payload_report, roi_distribution_chart, show_chart
+from utils.dashboard import ids_key
+from utils.frames import financial_frame
+from utils.grid import data_grid
+from utils.roi import load_roi_aggregates, release_year
 
 API_KEY = os.getenv("TMDB_API_KEY")
 
+# Wspólna pula wątków dla zapytań strony (listy gatunków i szczegóły finansowe) - jedna na proces,
+# a nie na każdy przebieg skryptu strony
+FETCH_WORKERS = 8
+
+
+@st.cache_resource
+def fetch_executor():
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="analysis")
+
+
 st.set_page_config(
     page_title="Analiza biznesowa",
     layout="wide"
@@ -22,14 +41,6 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 st.title("Analiza biznesowa filmów")
 
-# ===================== INICJALIZACJA ST STATE =====================
-if "movies" not in st.session_state:
-    st.session_state["movies"] = []
-
-if "loading_movies" not in st.session_state:
-    st.session_state["loading_movies"] = False
-
-
 # ================== POBIERANIE GATUNKÓW =============
 @st.cache_data
 def fetch_genres():
@@ -46,6 +57,7 @@ GENRE_NAME_TO_ID = {
 }
 
 # ================== POBIERANIE FILMÓW =====================
+@st.cache_data(ttl=3600)
 def fetch_movies(genre_id=None):
     """Pobiera topowe filmy lub filmy dla wybranego gatunku"""
     params = {
@@ -58,10 +70,19 @@ def fetch_movies(genre_id=None):
     if genre_id:
         params["with_genres"] = str(genre_id)
 
-    r = requests.get("https://api.themoviedb.org/3/discover/movie", params=params)
+    r = requests.get("https://api.themoviedb.org/3/discover/movie", params=params, timeout=10)
     return r.json().get("results", [])
 
 
+@st.cache_data(ttl=3600)
+def fetch_movies_for_genres(genre_ids):
+    """Filmy kilku gatunków naraz: zapytania równolegle, każdy film tylko raz, od najpopularniejszych"""
+    movies = {}
+    for results in fetch_executor().map(fetch_movies, genre_ids):
+        for m in results:
+            movies.setdefault(m["id"], m)
+    return sorted(movies.values(), key=lambda m: m.get("popularity") or 0, reverse=True)
+
 
 # ===================== WIDOK WYBORU GATUNKU =====================
 selected_genres = st.multiselect(
@@ -73,83 +94,206 @@ selected_genres = st.multiselect(
 
 
 
-# ===================== POBIERANIE DANYCH DO ANALIZY =====================
-# jeśli wybrano gatunek, pobieramy filmy dla tego gatunku
-if selected_genres:
-    movies_for_analysis = []
-    for g_name in selected_genres:
-        g_id = GENRE_NAME_TO_ID[g_name]
-        movies_for_analysis.extend(fetch_movies(g_id))
-    st.session_state["movies"] = movies_for_analysis
-    # jeśli brak wyboru gatunku, używamy domyślnej listy popularnych filmów
-if not st.session_state["movies"]:
-    st.session_state["movies"] = fetch_movies()
-
-movies = st.session_state["movies"]
-
-if not movies:
-    st.warning("Brak filmów do analizy.")
-    st.stop()
-
 # ===================== FINANSE =====================
 @st.cache_data(ttl=3600)
 def fetch_movie_financials(movie_id):
     r = requests.get(f"https://api.themoviedb.org/3/movie/{movie_id}",
-                     params={"api_key": API_KEY})
+                     params={"api_key": API_KEY}, timeout=10)
     data = r.json()
     return data.get("budget", 0), data.get("revenue", 0)
 
-analysis_data = []
 MAX_MOVIES = 20
+# Kolumny wierszy pobieranych na bieżąco (bez katalogu nie ma id ani roku w tabeli)
+LIVE_COLUMNS = ("Tytuł", "Budżet", "Przychody", "ROI")
+
+
+def financial_record(movie, budget, revenue):
+    """Wiersz analizy albo None, jeśli film nie ma budżetu lub przychodów"""
+    if not budget or not revenue or budget <= 0 or revenue <= 0:
+        return None
+    return {
+        "Tytuł": movie["title"],
+        "Budżet": budget,
+        "Przychody": revenue,
+        "ROI": (revenue - budget) / budget
+    }
+
 
-with st.spinner("Pobieranie danych finansowych..."):
-    for m in movies:
-        budget, revenue = fetch_movie_financials(m["id"])
-        if budget <= 0 or revenue <= 0:
+def first_records(financials, n_movies):
+    """Pierwsze MAX_MOVIES wierszy w kolejności listy filmów i informacja, czy ten wynik jest już ostateczny"""
+    records, complete = [], True
+    for i in range(n_movies):
+        if i not in financials:
+            complete = False
             continue
-        roi = (revenue - budget) / budget
-        analysis_data.append({
-            "Tytuł": m["title"],
-            "Budżet": budget,
-            "Przychody": revenue,
-            "ROI": roi
-        })
-        if len(analysis_data) == MAX_MOVIES:
-            break
-
-df = pd.DataFrame(analysis_data)
-
-if df.empty:
-    st.warning("Brak danych finansowych.")
-    st.stop()
-
-# ===================== METRYKI =====================
-col1, col2, col3 = st.columns(3)
-col1.metric("Średni budżet", f"${df['Budżet'].mean():,.0f}")
-col2.metric("Średnie przychody", f"${df['Przychody'].mean():,.0f}")
-col3.metric("Filmy dochodowe", f"{len(df[df['ROI'] > 0])} / {len(df)}",
-            help="Liczba filmów, których przychody były wyższe niż budżet (ROI > 0)")
+        if financials[i] is not None:
+            records.append(financials[i])
+            if len(records) == MAX_MOVIES:
+                break
+    return records, complete
+
+
+# Formatowanie liczb w tabelach (po stronie przeglądarki, bez Styler)
+COLUMN_CONFIG = {
+    "Budżet": st.column_config.NumberColumn(format="dollar"),
+    "Przychody": st.column_config.NumberColumn(format="dollar"),
+    "ROI": st.column_config.NumberColumn(format="%.2f"),
+    "Rok": st.column_config.NumberColumn(format="%d"),
+    "Średni budżet": st.column_config.NumberColumn(format="dollar"),
+    "Średnie przychody": st.column_config.NumberColumn(format="dollar"),
+    "Mediana ROI": st.column_config.NumberColumn(format="%.2f"),
+    "Dochodowe %": st.column_config.NumberColumn(format="%.0f%%"),
+}
 
-st.divider()
 
-# ===================== WYKRESY =====================
-st.subheader("Budżet vs Przychody")
-st.bar_chart(df.set_index("Tytuł")[["Budżet", "Przychody"]])
-
-st.subheader("ROI")
-st.bar_chart(df.set_index("Tytuł")["ROI"])
-
-st.subheader("Dane szczegółowe")
-st.dataframe(
-    df.style.format({
-        "Budżet": "${:,.0f}",
-        "Przychody": "${:,.0f}",
-        "ROI": "{:.2f}"
-    }),
-    use_container_width=True
-)
+def show_analysis(df, details=None, interactive=True):
+    """Metryki dla `df`; wykresy i tabela szczegółowa dla `details` (domyślnie `df`).
+    Bez `interactive` tabela jest rysowana bez kontrolek (np. w trakcie pobierania danych)."""
+    details = df if details is None else details
+    # ===================== METRYKI =====================
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Średni budżet", f"${df['Budżet'].mean():,.0f}")
+    col2.metric("Średnie przychody", f"${df['Przychody'].mean():,.0f}")
+    col3.metric("Filmy dochodowe", f"{len(df[df['ROI'] > 0])} / {len(df)}",
+                help="Liczba filmów, których przychody były wyższe niż budżet (ROI > 0)")
+
+    st.divider()
+
+    # ===================== WYKRESY =====================
+    # dane zagregowane po stronie serwera - rozmiar wykresu nie zależy od liczby filmów
+    st.subheader("Budżet vs Przychody")
+    st.caption(f"Filmy: {len(details):,} · kolor: liczba filmów w przedziale · punkty: skrajne ROI · "
+               "linia: przychody równe budżetowi")
+    # odcisk zawartości ramki (wiersze z indeksem) - klucz zapamiętanych specyfikacji wykresów
+    chart_key = ids_key(pd.util.hash_pandas_object(details).to_numpy().view(np.int64))
+    show_chart("Budżet vs Przychody", chart_key, budget_revenue_chart, details)
+
+    st.subheader("ROI")
+    st.caption("Rozkład stosunku przychodów do budżetu · pasmo: środkowe 50% filmów · linia: mediana")
+    show_chart("ROI", chart_key, roi_distribution_chart, details)
+
+    st.subheader("Dane szczegółowe")
+    if interactive:
+        data_grid(details, key="details", column_config=COLUMN_CONFIG, query_column="Tytuł",
+                  sort_columns=[c for c in ("ROI", "Budżet", "Przychody", "Rok") if c in details])
+    else:
+        st.dataframe(details, column_config=COLUMN_CONFIG, use_container_width=True, hide_index=True)
+
+
+# ===================== KATALOG =====================
+def catalog_financials():
+    """Filmy katalogu z budżetem i przychodami (indeks: id filmu), od najpopularniejszych -
+    tylko do odczytu, wspólne dla sesji i liczone od nowa po zmianie pliku katalogu"""
+    return _catalog_financials(*file_version())
+
+
+@st.cache_resource(max_entries=1)
+def _catalog_financials(path, version):
+    movies = sorted(shared_catalog(path), key=lambda m: m.get("popularity") or 0, reverse=True)
+    records = [{"id": m["id"], **financial_record(m, m.get("budget"), m.get("revenue")), "Rok": release_year(m)}
+               for m in movies if financial_record(m, m.get("budget"), m.get("revenue"))]
+    return financial_frame(records).set_index("id")
+
+
+def show_catalog_summary(roi, genre_ids, years):
+    """Miary całego wycinka katalogu - z agregatów (zestaw gatunków x rok), bez przeglądania filmów"""
+    summary = roi.summary(genre_ids, years)
+    if not summary["films"]:
+        st.warning("Brak filmów z danymi finansowymi dla tego wyboru.")
+        return False
+
+    st.subheader("Cały katalog")
+    roi_q1, roi_median, roi_q3 = summary["roi_quantiles"]
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Filmy", f"{summary['films']:,}", help="Filmy z katalogu, które mają budżet i przychody")
+    col2.metric("Średni budżet", f"${summary['budget_mean']:,.0f}")
+    col3.metric("Średnie przychody", f"${summary['revenue_mean']:,.0f}")
+    col4.metric("Mediana ROI", f"{roi_median:.2f}",
+                help=f"Połowa filmów ma ROI między {roi_q1:.2f} a {roi_q3:.2f} (wartości przybliżone)")
+    col5.metric("Filmy dochodowe", f"{100 * summary['profitable'] / summary['films']:.0f}%",
+                help="Odsetek filmów, których przychody były wyższe niż budżet (ROI > 0)")
+
+    by_year = roi.by_year(genre_ids, years)
+    if len(by_year) > 1:
+        st.subheader("ROI w kolejnych latach")
+        st.line_chart(by_year.set_index("Rok")[["Mediana ROI"]])
+
+    st.subheader("Gatunki")
+    st.dataframe(roi.by_genre({g["id"]: g["name"] for g in genres}, genre_ids, years),
+                 column_config=COLUMN_CONFIG, use_container_width=True, hide_index=True)
+    st.divider()
+    return True
+
+
+# ===================== POBIERANIE DANYCH DO ANALIZY =====================
+selected_ids = tuple(sorted(GENRE_NAME_TO_ID[g] for g in selected_genres))
+roi = load_roi_aggregates()
+
+# lokalny katalog z budżetami: analiza całego katalogu z agregatów, szczegóły dla najpopularniejszych filmów
+if len(roi):
+    year_range = roi.year_range()
+    years = None
+    if year_range and year_range[0] < year_range[1]:
+        years = st.slider("📅 Rok premiery", *year_range, value=year_range)
+
+    if not show_catalog_summary(roi, selected_ids, years):
+        st.stop()
+
+    # wszystkie filmy wycinka, od najpopularniejszych - do tabeli szczegółowej
+    # (agregaty zwracają id w kolejności dodania, więc kolejność bierzemy z ramki katalogu)
+    financials = catalog_financials()
+    details = financials[financials.index.isin(roi.film_ids(selected_ids, years))]
+    st.subheader(f"Najpopularniejsze filmy ({min(len(details), MAX_MOVIES)})")
+    show_analysis(details.head(MAX_MOVIES), details)
+
+# bez katalogu: najpopularniejsze filmy z TMDB i ich dane finansowe pobierane na bieżąco
+else:
+    # jeśli wybrano gatunki, pobieramy filmy dla tych gatunków (kolejność wyboru nie zmienia wyniku)
+    if selected_genres:
+        movies = fetch_movies_for_genres(selected_ids)
+    # jeśli brak wyboru gatunku, używamy domyślnej listy popularnych filmów
+    else:
+        movies = fetch_movies()
+
+    if not movies:
+        st.warning("Brak filmów do analizy.")
+        st.stop()
+
+    # Dane finansowe pobierane równolegle; tabela i wykresy odświeżają się w miarę napływu wyników
+    report = st.empty()
+    financials = {}  # pozycja filmu na liście -> wiersz analizy (None = brak danych)
+    executor = fetch_executor()
+    futures = {executor.submit(fetch_movie_financials, m["id"]): i for i, m in enumerate(movies)}
+    analysis_data, shown = [], []
+
+    with st.spinner("Pobieranie danych finansowych..."):
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                financials[i] = financial_record(movies[i], *future.result())
+            except (requests.RequestException, ValueError):
+                financials[i] = None
+
+            analysis_data, complete = first_records(financials, len(movies))
+            if analysis_data != shown:
+                shown = analysis_data
+                with report.container():
+                    show_analysis(financial_frame(analysis_data, LIVE_COLUMNS), interactive=False)
+            if complete:
+                # pierwsze MAX_MOVIES filmów z danymi jest już znane - reszty nie trzeba pobierać
+                for f in futures:
+                    f.cancel()
+                break
+
+    if not analysis_data:
+        report.warning("Brak danych finansowych.")
+        st.stop()
+    # ostateczny wynik: tabela z kontrolkami (rysowana raz - klucze kontrolek muszą być unikalne)
+    with report.container():
+        show_analysis(financial_frame(analysis_data, LIVE_COLUMNS))
 
 st.divider()
+payload_report()
 
 
 # ============ Powrót ================
@@ -1,9 +1,17 @@
 import streamlit as st
 import requests
 import pandas as pd
-import altair as alt # biblioteka wykresów
 import os
 
+from utils.catalog import key_people
+from utils.charts import finance_chart, payload_report, show_chart, votes_chart
+from utils.dashboard import dashboard_summary, movies_key, vote_comparison
+from utils.overview_index import load_overview_index
+from utils.person_graph import ROLE_LABELS, load_person_graph
+from utils.precompute import catalog_recommendations
+from utils.recommend import (custom_recommendations, get_genre_ids, get_movie_keywords, poster_path,
+                             recommendation_candidates, show_candidate_sources)
+
 API_KEY = os.getenv("TMDB_API_KEY")
 
 # Aplikacja korzysta z danych TMDB API, ale nie jest oficjalnie powiązana z TMDB.
@@ -56,26 +64,6 @@ def fetch_similar_genre_movies(genre_ids):
     )
     return r.json().get("results", [])
 
-# Funkcja pobierająca ID filmów
-@st.cache_data(ttl=3600)
-def get_genre_ids():
-    r = requests.get(
-        "https://api.themoviedb.org/3/genre/movie/list",
-        params={"api_key": API_KEY, "language": "pl-PL"}
-    )
-    genres = r.json().get("genres", [])
-    # zamiana nazwa -> id
-    return {g['name']: g['id'] for g in genres}
-
-# Funkcja znajdująca słowa kluczowe dla filmu
-@st.cache_data(ttl=3600)
-def get_movie_keywords(movie_id):
-    r = requests.get(
-        f"https://api.themoviedb.org/3/movie/{movie_id}/keywords",
-        params={"api_key": API_KEY}
-    )
-    return r.json().get("keywords", [])
-
 # Funkcja do odczytania gatunków
 @st.cache_data(ttl=3600)
 def fetch_genres():
@@ -94,76 +82,6 @@ def get_runtime(movie_id):
     )
     return r.json().get("runtime", 0)
 
-# Funkcja pobierająca filmy po gatunkach
-@st.cache_data(ttl=3600)
-def get_movies_by_genres(genre_ids, language=None, n=51):
-    movies = []
-    page = 1
-    while len(movies) < n:
-        params = {
-            "api_key": API_KEY,
-            "with_genres": ",".join(map(str, genre_ids)),
-            "language": "pl-PL",
-            "sort_by": "popularity.desc",
-            "page": page,
-            "include_adult": False
-        }
-        if language:
-            params["with_original_language"] = language
-        r = requests.get("https://api.themoviedb.org/3/discover/movie", params=params)
-        results = r.json().get("results", [])
-        for m in results:
-            details = fetch_movie_details(m['id'])
-            movies.append(details)
-            if len(movies) >= n:
-                break
-        page += 1
-    return movies[:n]
-
-# Słownik gatunków obowiązkowych, dla których rekomendacja musi zgadzać się z wyszukiwanym filmem
-MANDATORY_GENRES = {"Animation", "Horror", "Documentary", "Fantasy", "Western",
-                    "Document", "Historical", "Musical", "Sci-Fi", "War"}
-
-# Funkcja do tworzenia rekomendacji
-@st.cache_data(ttl=3600)
-def custom_recommendations(movie, candidate_movies, top_n=51):
-    movie_genres = {g['name'] for g in movie.get('genres', [])}
-    movie_keywords = {k['name'] for k in get_movie_keywords(movie['id'])}
-    mandatory_in_movie = MANDATORY_GENRES.intersection(movie_genres)
-    
-    candidate_keywords = {m['id']: {k['name'] for k in get_movie_keywords(m['id'])} 
-                          for m in candidate_movies}
-
-    scored_movies = []
-    for m in candidate_movies:
-        if m['id'] == movie['id']:
-            continue
-        m_genres = {g['name'] for g in m.get('genres', [])}
-
-        # Filtrowanie po gatunkach obowiązkowych
-        if mandatory_in_movie and not mandatory_in_movie.issubset(m_genres):
-            continue  # odrzucamy film jeśli nie ma wymaganego gatunku
-        
-        score = 0   # waga (wynik filmu)
-
-        # Liczba wspólnych gatunków
-        common_genres = movie_genres.intersection(m_genres)
-        score += len(common_genres) * 2
-        if len(common_genres) >= 2:
-            score += 3  # zwiększenie wagi (wyniku filmu)
-
-        m_keywords = candidate_keywords[m['id']]
-        common_keywords = movie_keywords.intersection(m_keywords)
-        score += len(common_keywords)
-
-        if len(common_keywords) >= 3:
-            score += 4  # zwiększenie wagi (wyniku filmu)
-
-        scored_movies.append((score, m, common_genres, common_keywords))
-
-    scored_movies.sort(key=lambda x: x[0], reverse=True)
-    return scored_movies[:top_n]
-
 # Pobranie szczegółów filmu
 movie = fetch_movie_details(movie_id)
 # Stworzenie słownika gatunek: ID
@@ -239,7 +157,7 @@ with col_right:
 st.divider()
 
 # Przycisk do wyboru rekomendacji lub analizy
-selected_tab = st.pills(options=["Rekomendacje na podstawie filmu", "Analiza"], 
+selected_tab = st.pills(options=["Rekomendacje na podstawie filmu", "Ci sami twórcy", "Analiza"], 
          label="Wybierz opcję:", default="Rekomendacje na podstawie filmu",
          width="stretch")
 
@@ -251,18 +169,33 @@ st.divider()
 
 # Wyświetlenie 10 rekomendowanych filmów
 if selected_tab == "Rekomendacje na podstawie filmu":
-    language_code = movie.get('spoken_languages', [{}])[0].get('iso_639_1')
-    candidate_movies = get_movies_by_genres(movie_genre_ids, language=language_code, n=10)
-
-    recommendations = custom_recommendations(movie, candidate_movies, top_n=10)
+    # Opcjonalny sygnał: filmy o podobnym opisie fabuły (wymaga zbudowanego indeksu opisów)
+    overview_index = load_overview_index()
+    use_overview = st.toggle("Uwzględnij podobieństwo opisu", disabled=overview_index is None,
+                             help="Dodaje filmy o podobnym opisie fabuły i premiuje je w wyniku.")
+
+    # Gotowa lista dla filmu z katalogu: z tabeli policzonej wsadowo (python -m utils.precompute),
+    # a bez niej z macierzy rzadkich całego katalogu
+    recommendations = None
+    if not use_overview:
+        recommendations = catalog_recommendations(movie['id'], top_n=10)
+
+    if recommendations is None:
+        # Kandydaci: źródła TMDB, filmy z katalogu o podobnych słowach kluczowych (MinHash LSH)
+        # i opcjonalnie o podobnym opisie
+        candidate_movies, candidate_origins, source_metrics, overview_scores = recommendation_candidates(
+            movie, movie_genre_ids, keywords, n=10, overview_index=overview_index if use_overview else None)
+        recommendations = custom_recommendations(movie, candidate_movies, top_n=10, overview_scores=overview_scores)
+        show_candidate_sources(recommendations, candidate_origins, source_metrics)
 
     for score, rec, common_genres, common_keywords in recommendations:
         col1, div, col2 = st.columns([1, 0.2, 4])
         st.markdown("<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 30px;'>",
                     unsafe_allow_html=True)
         with col1:
-            if rec.get('poster_path'):
-                st.image(f"https://image.tmdb.org/t/p/w200{rec['poster_path']}")
+            poster = poster_path(rec)
+            if poster:
+                st.image(f"https://image.tmdb.org/t/p/w200{poster}")
         with div:
             st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>", unsafe_allow_html=True) 
         with col2:
@@ -277,6 +210,32 @@ if selected_tab == "Rekomendacje na podstawie filmu":
         
                 
 
+# Filmy tych samych twórców (reżyseria, scenariusz, muzyka, główna obsada) z lokalnego katalogu
+if selected_tab == "Ci sami twórcy":
+    people = key_people(movie.get("credits", {}))
+    person_recommendations = load_person_graph().recommend(movie["id"], people)
+
+    if not person_recommendations:
+        st.info("Brak filmów tych samych twórców w lokalnym katalogu.")
+
+    for score, rec, shared in person_recommendations:
+        col1, div, col2 = st.columns([1, 0.2, 4])
+        st.markdown("<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 30px;'>",
+                    unsafe_allow_html=True)
+        with col1:
+            poster = poster_path(rec)
+            if poster:
+                st.image(f"https://image.tmdb.org/t/p/w200{poster}")
+        with div:
+            st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>", unsafe_allow_html=True)
+        with col2:
+            st.markdown(f"<h3>{rec['title']} ({(rec.get('release_date') or '')[:4]})</h3>", unsafe_allow_html=True)
+            st.write(f"*Ocena:* {rec.get('vote_average', '–')} ({rec.get('vote_count', '–')} głosów)")
+            st.write("*Wspólni twórcy:* " + (", ".join(f"{ROLE_LABELS[role]}: {name}" for role, name in shared) or "–"))
+            if st.button("Zobacz szczegóły", key=f"people_{rec['id']}"):
+                st.switch_page("pages/movie.py", query_params={"id": rec["id"]})
+
+
 # Analizy 
 if selected_tab == "Analiza":
 
@@ -285,10 +244,8 @@ if selected_tab == "Analiza":
     genre_ids = [g["id"] for g in movie["genres"]]
     similar_movies = fetch_similar_genre_movies(genre_ids)
 
-    df_similar = pd.DataFrame(similar_movies)
-
-    if not df_similar.empty:
-        avg_popularity = df_similar["popularity"].mean()
+    if similar_movies:
+        avg_popularity = dashboard_summary(similar_movies, {g["id"]: g["name"] for g in movie["genres"]})["popularity_mean"]
 
         col1, col2 = st.columns(2)
         col1.metric(
@@ -326,28 +283,11 @@ if selected_tab == "Analiza":
 
     top_genre_votes = fetch_genre_top_votes(genre_ids)
 
-    # Dodajemy nasz film, jeśli nie jest w top
-    if movie not in top_genre_votes:
-        top_genre_votes.append(movie)
-
-    df_votes = pd.DataFrame(top_genre_votes)
-    df_votes["highlight"] = df_votes["id"] == movie["id"]  # podświetlenie wybranego filmu
+    # Dodajemy nasz film, jeśli nie jest w top; highlight - podświetlenie wybranego filmu
+    df_votes = vote_comparison(top_genre_votes, movie)
 
     # Wykres słupkowy z kolorami
-    import altair as alt
-
-    chart_votes = alt.Chart(df_votes).mark_bar().encode(
-        x=alt.X("title:N", sort="-y", title="Film"),
-        y=alt.Y("vote_count:Q", title="Liczba głosów"),
-        color=alt.condition(
-            alt.datum.highlight,
-            alt.value("#5d2266"),  # ciemnofioletowy
-            alt.value("#9b6dc6")   # jasnofioletowy
-        ),
-        tooltip=["title", "vote_count", "vote_average"]
-    )
-
-    st.altair_chart(chart_votes, use_container_width=True)
+    show_chart("Głosy w gatunku", movies_key(top_genre_votes, movie["id"]), votes_chart, df_votes)
 
     # Dodatkowa metryka
     highlight_votes = movie.get("vote_count", 0)
@@ -369,21 +309,7 @@ if selected_tab == "Analiza":
         {"Kategoria": "Przychody", "Kwota": revenue}
     ])
 
-    # Ustawienie kolorów według kategorii
-    color_scale = alt.Scale(
-        domain=["Budżet", "Przychody"],
-        range=["#5d2266", "#9b6dc6"]
-    )
-
-    chart_fin = alt.Chart(df_fin).mark_bar(color="#1f77b4").encode(
-        x=alt.X("Kategoria:N", title=""),
-        y=alt.Y("Kwota:Q", title="Kwota ($)"),
-        tooltip=["Kategoria", "Kwota"],
-        color=alt.Color("Kategoria:N", scale=color_scale, legend=None)
-    )
-
-
-    st.altair_chart(chart_fin, use_container_width=True)
+    show_chart("Budżet vs Przychody", (movie["id"], budget, revenue), finance_chart, df_fin)
 
     if roi is not None:
         st.metric(
@@ -392,6 +318,8 @@ if selected_tab == "Analiza":
             help="ROI = (Przychody - Budżet) / Budżet"
         )
 
+    payload_report()
+
 
 
 # Przycisk powrotu do menu 
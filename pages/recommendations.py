@@ -1,8 +1,20 @@
 import streamlit as st
 import requests
-import pandas as pd
 from streamlit_searchbox import st_searchbox
 import os
+from collections import Counter
+
+from utils.autocomplete import DEBOUNCE_MS, autocomplete
+from utils.catalog import key_people
+from utils.minhash import load_minhash_index
+from utils.overview_index import load_overview_index
+from utils.person_graph import ROLE_LABELS, load_person_graph
+from utils.precompute import catalog_recommendations
+from utils.recommend import (candidate_keywords, custom_recommendations, get_genre_ids, get_movie_details,
+                             get_movie_keywords, poster_path, recommendation_candidates, show_candidate_sources)
+from utils.registry import load_label_registry
+from utils.scoring import KeywordIndex, expand_recommendations, recommendation_key
+from utils.title_index import load_title_index, movie_label
 
 API_KEY = os.getenv("TMDB_API_KEY")
 
@@ -26,24 +38,12 @@ st.caption("Wyszukaj film, aby znaleźć rekomendacje na jego podstawie.", text_
 if "movie_search_key" not in st.session_state:
     st.session_state.movie_search_key = 0
 
-if "movie_title_to_id" not in st.session_state: 
-    st.session_state.movie_title_to_id = {}
-
-# Funkcja znajdująca słowa kluczowe dla filmu
-@st.cache_data(ttl=3600)
-def get_movie_keywords(movie_id):
-    r = requests.get(
-        f"https://api.themoviedb.org/3/movie/{movie_id}/keywords",
-        params={"api_key": API_KEY}
-    )
-    return r.json().get("keywords", [])
-
-# Funkcja wyszukiwania filmów
-@st.cache_data(ttl=3600)
-def search_movies(query: str):
-    if not query:
-        return []
+# Liczba podpowiedzi w wyszukiwarce
+SEARCH_LIMIT = 20
 
+# Funkcja pobierająca podpowiedzi tytułów z TMDB (z pamięcią wspólną dla wszystkich sesji)
+@autocomplete(text=lambda m: f"{m.get('title', '')} {m.get('original_title', '')}")
+def tmdb_search_movies(query):
     r = requests.get(
         "https://api.themoviedb.org/3/search/movie",
         params={
@@ -52,21 +52,25 @@ def search_movies(query: str):
             "language": "pl-PL",
             "page": 1,
             "include_adult": False
-        }
+        },
+        timeout=10
     )
-    results = r.json().get("results", [])
-    results = sorted(results, key=lambda x: x.get("popularity", 0), reverse=True)
+    return r.json().get("results", [])
 
-    return [(f"{m['title']} ({m.get('release_date','')[:4]})", m['id']) for m in results[:20]] # tuple(label, id)
+# Funkcja wyszukiwania filmów
+def search_movies(query: str):
+    if not query:
+        return []
 
-# Funkcja pobierająca szczegóły filmu
-@st.cache_data(ttl=3600)
-def get_movie_details(movie_id):
-    r = requests.get(
-        f"https://api.themoviedb.org/3/movie/{movie_id}",
-        params={"api_key": API_KEY, "language": "pl-PL"}
-    )
-    return r.json()
+    # Lokalny indeks tytułów, uzupełniany wynikami z TMDB
+    results = load_title_index().search(query, k=SEARCH_LIMIT)
+    if len(results) < SEARCH_LIMIT:
+        tmdb_results = sorted(tmdb_search_movies(query), key=lambda x: x.get("popularity", 0), reverse=True)
+        seen = {m["id"] for m in results}
+        results += [m for m in tmdb_results if m["id"] not in seen]
+
+    # tuple(label, id); etykiety trafiają też do rejestru (lista filmów-wzorców)
+    return load_label_registry().register("movie", [(movie_label(m), m['id']) for m in results[:SEARCH_LIMIT]])
 
 # Funkcja pobierająca pełną obsadę (aktorzy i obsada techniczna)
 @st.cache_data(ttl=3600)
@@ -77,17 +81,6 @@ def get_movie_credits(movie_id):
         )
         return r.json()
 
-# Funkcja pobierająca ID filmów
-@st.cache_data(ttl=3600)
-def get_genre_ids():
-    r = requests.get(
-        "https://api.themoviedb.org/3/genre/movie/list",
-        params={"api_key": API_KEY, "language": "pl-PL"}
-    )
-    genres = r.json().get("genres", [])
-    # zamiana nazwa -> id
-    return {g['name']: g['id'] for g in genres}
-
 # Funkcja pobierająca filmy po gatunkach
 @st.cache_data(ttl=3600)
 def get_movies_by_genres(genre_ids, language=None, n=51):
@@ -114,56 +107,116 @@ def get_movies_by_genres(genre_ids, language=None, n=51):
         page += 1
     return movies[:n]
 
-# Słownik gatunków obowiązkowych, dla których rekomendacja musi zgadzać się z wyszukiwanym filmem
-MANDATORY_GENRES = {"Animation", "Horror", "Documentary", "Fantasy", "Western",
-                    "Document", "Historical", "Musical", "Sci-Fi", "War"}
-
-# Funkcja do tworzenia rekomendacji
+# Rekomendacje dla kilku filmów naraz: jedna lista, jedno przejście punktacji (w pamięci tylko (wynik, id))
 @st.cache_data(ttl=3600)
-def custom_recommendations(movie, candidate_movies, top_n=51):
-    movie_genres = {g['name'] for g in movie.get('genres', [])}
-    movie_keywords = {k['name'] for k in get_movie_keywords(movie['id'])}
-    mandatory_in_movie = MANDATORY_GENRES.intersection(movie_genres)
-    
-    candidate_keywords = {m['id']: {k['name'] for k in get_movie_keywords(m['id'])} 
-                          for m in candidate_movies}
-
-    scored_movies = []
-    for m in candidate_movies:
-        if m['id'] == movie['id']:
-            continue
-        m_genres = {g['name'] for g in m.get('genres', [])}
-
-        # Filtrowanie po gatunkach obowiązkowych
-        if mandatory_in_movie and not mandatory_in_movie.issubset(m_genres):
-            continue  # odrzucamy film jeśli nie ma wymaganego gatunku
-        
-        score = 0   # waga (wynik filmu)
-
-        # Liczba wspólnych gatunków
-        common_genres = movie_genres.intersection(m_genres)
-        score += len(common_genres) * 2
-        if len(common_genres) >= 2:
-            score += 3  # zwiększenie wagi (wyniku filmu)
-
-        m_keywords = candidate_keywords[m['id']]
-        common_keywords = movie_keywords.intersection(m_keywords)
-        score += len(common_keywords)
-
-        if len(common_keywords) >= 3:
-            score += 4  # zwiększenie wagi (wyniku filmu)
-
-        scored_movies.append((score, m, common_genres, common_keywords))
-
-    scored_movies.sort(key=lambda x: x[0], reverse=True)
-    return scored_movies[:top_n]
+def ranked_blend(key, _seed_movies, _candidate_movies, top_n=51):
+    seeds = [(m, [k['name'] for k in get_movie_keywords(m['id'])]) for m in _seed_movies]
+    # słowa kluczowe kandydatów pobierane raz, nawet jeśli film pasuje do kilku wzorców
+    index = KeywordIndex(_candidate_movies, {m['id']: candidate_keywords(m) for m in _candidate_movies})
+    return [(score, m['id']) for score, m, _, _ in index.recommend_blend(seeds, top_n)]
+
+def blended_recommendations(seed_movies, candidate_movies, top_n=51):
+    seed_ids = ",".join(str(i) for i in sorted(m['id'] for m in seed_movies))  # kolejność wzorców bez znaczenia
+    key = recommendation_key(seed_ids, [m['id'] for m in candidate_movies], "pl-PL")
+    ranked = ranked_blend(key, seed_movies, candidate_movies, top_n)
+    seed_genres = {g['name'] for m in seed_movies for g in m.get('genres', [])}
+    seed_keywords = {k['name'] for m in seed_movies for k in get_movie_keywords(m['id'])}
+    return expand_recommendations(ranked, seed_genres, seed_keywords, candidate_movies, candidate_keywords)
+
+# Kandydaci wspólni dla wszystkich wzorców: jedno zapytanie o gatunki, jedno zapytanie LSH
+def blended_candidates(seed_movies, n=51):
+    # gatunki obecne w co najmniej połowie wzorców (albo najczęstszy gatunek)
+    genre_votes = Counter(g['name'] for m in seed_movies for g in m.get('genres', []) if g['name'] in genre_name_to_id)
+    genre_ids = [genre_name_to_id[name] for name, votes in genre_votes.most_common() if 2 * votes >= len(seed_movies)]
+    genre_ids = genre_ids or [genre_name_to_id[name] for name, _ in genre_votes.most_common(1)]
+    languages = {(m.get('spoken_languages') or [{}])[0].get('iso_639_1') for m in seed_movies}
+    candidate_movies = get_movies_by_genres(genre_ids, language=languages.pop() if len(languages) == 1 else None, n=n)
+
+    seed_ids = {m['id'] for m in seed_movies}
+    seen = {m['id'] for m in candidate_movies} | seed_ids
+    keyword_union = sorted({k['name'] for m in seed_movies for k in get_movie_keywords(m['id'])})
+    extra = [m for _, m in load_minhash_index().query(keyword_union)]
+
+    # gotowe listy każdego wzorca z katalogu (tabela top-K albo macierze rzadkie)
+    for m in seed_movies:
+        extra += [rec for _, rec, _, _ in catalog_recommendations(m['id'], top_n=n) or []]
+
+    for m in extra:
+        if m['id'] not in seen:
+            seen.add(m['id'])
+            candidate_movies = candidate_movies + [m]
+    return candidate_movies
+
+# Lista rekomendacji (plakat, tytuł, wspólne gatunki i słowa kluczowe)
+def show_recommendations(recommendations, key_prefix="details"):
+    for score, rec, common_genres, common_keywords in recommendations:
+        col1, div, col2 = st.columns([1, 0.2, 4])
+        with col1:
+            poster = poster_path(rec)
+            if poster:
+                st.image(f"https://image.tmdb.org/t/p/w200{poster}")
+
+        with div:
+            st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
+                unsafe_allow_html=True)
+
+        with col2:
+            st.markdown(f"<h3>{rec['title']} ({(rec.get('release_date') or '')[:4]})</h3>", unsafe_allow_html=True)
+
+            st.markdown(
+                "<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 20px;'>",
+                unsafe_allow_html=True
+            )
+
+            st.write(f"*Ocena:* {rec.get('vote_average', '–')} ({rec.get('vote_count', '–')} głosów)")
+            st.write(f"*Wspólne gatunki:* {', '.join(common_genres) or '–'}")
+            st.write(f"*Wspólne słowa kluczowe:* {', '.join(list(common_keywords)[:5]) or '–'}")
+            if st.button("Zobacz szczegóły", key=f"{key_prefix}_{rec['id']}"):
+                st.switch_page("pages/movie.py", query_params={"id": rec["id"]})
+
+        st.divider()
 
 # Słownik id: gatunek
 genre_name_to_id = get_genre_ids()
-
-# Searchbox
-selected_movie = st_searchbox(search_movies, key="movie_searchbox",
-                              placeholder="Np. Shrek, Avatar, Zmierzch ...")
+labels = load_label_registry()
+
+# Lista filmów-wzorców w trybie "kilka filmów"
+if "seed_movies" not in st.session_state:
+    st.session_state.seed_movies = []
+
+multi_seed = st.toggle("Kilka filmów naraz", key="multi_seed",
+                       help="Wybierz kilka filmów, aby dostać jedną wspólną listę rekomendacji.")
+
+if multi_seed:
+    selected_movie = None
+    new_seed = st_searchbox(search_movies, key=f"seed_search_{st.session_state.movie_search_key}",
+                            debounce=DEBOUNCE_MS, placeholder="Dodaj film, np. Shrek, Avatar, Zmierzch ...")
+    if new_seed and new_seed not in st.session_state.seed_movies:
+        st.session_state.seed_movies.append(new_seed)
+        st.session_state.movie_search_key += 1
+        st.rerun()
+
+    if st.session_state.seed_movies:
+        seed_to_remove = st.pills(label="Wybrane filmy:", options=st.session_state.seed_movies,
+                                  format_func=lambda mid: labels.label("movie", mid),
+                                  key="seed_movies_pills", help="Kliknij film, aby go usunąć")
+        if seed_to_remove:
+            st.session_state.seed_movies.remove(seed_to_remove)
+            st.rerun()
+else:
+    # Searchbox
+    selected_movie = st_searchbox(search_movies, key="movie_searchbox", debounce=DEBOUNCE_MS,
+                                  placeholder="Np. Shrek, Avatar, Zmierzch ...")
+
+# Wspólna lista dla kilku filmów
+if multi_seed and st.session_state.seed_movies:
+    seed_movies = [get_movie_details(mid) for mid in st.session_state.seed_movies]
+    recommendations = blended_recommendations(seed_movies, blended_candidates(seed_movies), top_n=51)
+
+    st.markdown(f"<h3 style='text-align:center;'>Wspólne rekomendacje ({len(recommendations)})</h3>",
+                unsafe_allow_html=True)
+    st.divider()
+    show_recommendations(recommendations, key_prefix="blend")
 
 # Wyświetlanie wybranego filmu
 if selected_movie:
@@ -234,40 +287,60 @@ if selected_movie:
             )
 
 
-        action = st.pills(label="", options=["Szukaj rekomendacji"], selection_mode="single", width="content")
+        action = st.pills(label="", options=["Szukaj rekomendacji", "Ci sami twórcy"], selection_mode="single", width="content")
 
-        if action == "Szukaj rekomendacji":
-            language_code = movie.get('spoken_languages', [{}])[0].get('iso_639_1')
-            candidate_movies = get_movies_by_genres(movie_genre_ids, language=language_code, n=51)
+        # Opcjonalny sygnał: filmy o podobnym opisie fabuły (wymaga zbudowanego indeksu opisów)
+        overview_index = load_overview_index()
+        use_overview = st.toggle("Uwzględnij podobieństwo opisu", disabled=overview_index is None,
+                                 help="Dodaje filmy o podobnym opisie fabuły i premiuje je w wyniku.")
 
-            recommendations = custom_recommendations(movie, candidate_movies, top_n=51)
+        if action == "Szukaj rekomendacji":
+            # Gotowa lista dla filmu z katalogu: z tabeli policzonej wsadowo (python -m utils.precompute),
+            # a bez niej z macierzy rzadkich całego katalogu
+            recommendations = None
+            if not use_overview:
+                recommendations = catalog_recommendations(movie['id'], top_n=51)
+
+            if recommendations is None:
+                # Kandydaci: źródła TMDB, filmy z katalogu o podobnych słowach kluczowych (MinHash LSH)
+                # i opcjonalnie o podobnym opisie
+                candidate_movies, candidate_origins, source_metrics, overview_scores = recommendation_candidates(
+                    movie, movie_genre_ids, keywords, n=51, overview_index=overview_index if use_overview else None)
+                recommendations = custom_recommendations(movie, candidate_movies, top_n=51,
+                                                         overview_scores=overview_scores)
+                show_candidate_sources(recommendations, candidate_origins, source_metrics)
 
             st.markdown(f"<h3 style='text-align:center;'>Znalezione rekomendacje ({len(recommendations)})</h3>",
                         unsafe_allow_html=True)
             st.divider()
 
-            for score, rec, common_genres, common_keywords in recommendations:
+            show_recommendations(recommendations)
+
+        # Filmy tych samych twórców z lokalnego katalogu (graf osoba - film)
+        if action == "Ci sami twórcy":
+            people = key_people(get_movie_credits(movie_id))
+            person_recommendations = load_person_graph().recommend(movie_id, people)
+
+            st.markdown(f"<h3 style='text-align:center;'>Filmy tych samych twórców ({len(person_recommendations)})</h3>",
+                        unsafe_allow_html=True)
+            st.divider()
+
+            for score, rec, shared in person_recommendations:
                 col1, div, col2 = st.columns([1, 0.2, 4])
                 with col1:
-                    if rec.get('poster_path'):
-                        st.image(f"https://image.tmdb.org/t/p/w200{rec['poster_path']}")
+                    poster = poster_path(rec)
+                    if poster:
+                        st.image(f"https://image.tmdb.org/t/p/w200{poster}")
 
                 with div:
                     st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
-                        unsafe_allow_html=True)  
+                        unsafe_allow_html=True)
 
                 with col2:
-                    st.markdown(f"<h3>{rec['title']} ({rec.get('release_date','')[:4]})</h3>", unsafe_allow_html=True)
-
-                    st.markdown(
-                        "<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 20px;'>",
-                        unsafe_allow_html=True
-                    )
-
-                    st.write(f"*Ocena:* {rec.get('vote_average', '–')} ({movie.get('vote_count', '–')} głosów)")
-                    st.write(f"*Wspólne gatunki:* {', '.join(common_genres) or '–'}")
-                    st.write(f"*Wspólne słowa kluczowe:* {', '.join(list(common_keywords)[:5]) or '–'}")
-                    if st.button("Zobacz szczegóły", key=f"details_{rec['id']}"):
+                    st.markdown(f"<h3>{rec['title']} ({(rec.get('release_date') or '')[:4]})</h3>", unsafe_allow_html=True)
+                    st.write(f"*Ocena:* {rec.get('vote_average', '–')} ({rec.get('vote_count', '–')} głosów)")
+                    st.write("*Wspólni twórcy:* " + (", ".join(f"{ROLE_LABELS[role]}: {name}" for role, name in shared) or "–"))
+                    if st.button("Zobacz szczegóły", key=f"people_{rec['id']}"):
                         st.switch_page("pages/movie.py", query_params={"id": rec["id"]})
 
                 st.divider()
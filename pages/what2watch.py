@@ -3,9 +3,20 @@ from streamlit_searchbox import st_searchbox
 import requests
 from datetime import datetime
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from utils.autocomplete import DEBOUNCE_MS, autocomplete
+from utils.registry import load_label_registry
 
 API_KEY = os.getenv("TMDB_API_KEY")
 
+# TMDB udostępnia najwyżej 500 stron wyników
+MAX_PAGES = 500
+# Limit czasu zapytań TMDB (s) i czekania na stronę pobieraną w tle, zanim zostanie pobrana od nowa
+REQUEST_TIMEOUT = 10
+PREFETCH_WAIT = 5
+
 # Aplikacja korzysta z danych TMDB API, ale nie jest oficjalnie powiązana z TMDB.
 
 # Ustawienia strony
@@ -26,12 +37,23 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 ### Funkcje
 
+# Pule wątków wspólne dla procesu (skrypt strony wykonuje się przy każdym przebiegu, pule tworzone są raz):
+# strony wyników pobierane w tle (kolejna strona, zanim użytkownik o nią poprosi) i szczegóły ich filmów
+@st.cache_resource
+def page_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="what2watch_pages")
+
+@st.cache_resource
+def detail_executor():
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="what2watch_details")
+
 # Funkcja do odczytania gatunków
 @st.cache_data(ttl=3600)
 def fetch_genres():
     r = requests.get(
         "https://api.themoviedb.org/3/genre/movie/list",
-        params = {"api_key": API_KEY, "language": "pl-PL"}
+        params = {"api_key": API_KEY, "language": "pl-PL"},
+        timeout=REQUEST_TIMEOUT
     )
     return r.json()["genres"]
 
@@ -40,16 +62,14 @@ def fetch_genres():
 def get_runtime(movie_id):
     r = requests.get(
         f"https://api.themoviedb.org/3/movie/{movie_id}",
-        params={"api_key": API_KEY}
+        params={"api_key": API_KEY},
+        timeout=REQUEST_TIMEOUT
     )
     return r.json().get("runtime", 0)
 
-# Funkcja do wyszukania aktorów
-@st.cache_data(ttl=3600)
-def search_actors(query):
-    if not query or len(query) < 1:
-        return []
-
+# Funkcja pobierająca osoby z TMDB (wspólna dla aktorów i obsady technicznej)
+@autocomplete(text=lambda p: p.get("name", ""))
+def tmdb_search_people(query):
     r = requests.get(
         "https://api.themoviedb.org/3/search/person",
         params={
@@ -57,10 +77,31 @@ def search_actors(query):
             "query": query,
             "language": "pl-PL",
             "page": 1
-        }
+        },
+        timeout=REQUEST_TIMEOUT
+    )
+    return r.json().get("results", [])
+
+# Funkcja pobierająca słowa kluczowe z TMDB
+@autocomplete(text=lambda k: k.get("name", ""))
+def tmdb_search_keywords(query):
+    r = requests.get(
+        "https://api.themoviedb.org/3/search/keyword",
+        params={
+            "api_key": API_KEY,
+            "query": query,
+            "page": 1
+        },
+        timeout=REQUEST_TIMEOUT
     )
+    return r.json().get("results", [])
 
-    results = r.json().get("results", [])
+# Funkcja do wyszukania aktorów
+def search_actors(query):
+    if not query or len(query) < 1:
+        return []
+
+    results = tmdb_search_people(query)
 
     # sortuj po popularności
     results = sorted(
@@ -69,31 +110,15 @@ def search_actors(query):
         reverse=True
     )
 
-    names = []
-    for a in results[:50]:
-        name = a["name"]
-        names.append(name)
-        st.session_state.actor_name_to_id[name] = a["id"]
-    
-    return names
+    # tuple(name, id) - searchbox zwraca id, a nazwa trafia do wspólnego rejestru
+    return load_label_registry().register("person", [(a["name"], a["id"]) for a in results[:50]])
 
 # Funkcja do wyszukania obsady technicznej
-@st.cache_data(ttl=3600)
 def search_crew(query):
     if not query or len(query) < 1:
         return []
 
-    r = requests.get(
-        "https://api.themoviedb.org/3/search/person",
-        params={
-            "api_key": API_KEY,
-            "query": query,
-            "language": "pl-PL",
-            "page": 1
-        }
-    )
-
-    results = r.json().get("results", [])
+    results = tmdb_search_people(query)
 
     # tylko osoby z OBSADY TECHNICZNEJ
     results = [
@@ -103,41 +128,19 @@ def search_crew(query):
 
     results = sorted(results, key=lambda x: x.get("popularity", 0), reverse=True)
 
-    names = []
-    for p in results[:50]:
-        name = p["name"]
-        names.append(name)
-        st.session_state.crew_name_to_id[name] = p["id"]
-
-    return names
+    return load_label_registry().register("person", [(p["name"], p["id"]) for p in results[:50]])
 
 # Funkcja do wyszukania słów kluczowych
-@st.cache_data(ttl=3600)
 def search_keywords(query):
     if not query or len(query) < 1:
         return []  # albo top 50 najpopularniejszych keywords jeśli masz listę
 
-    r = requests.get(
-        "https://api.themoviedb.org/3/search/keyword",
-        params={
-            "api_key": API_KEY,
-            "query": query,
-            "page": 1
-        }
-    )
-
-    results = r.json().get("results", [])
+    results = tmdb_search_keywords(query)
     results = sorted(results, key=lambda x: x.get("movie_count", 0), reverse=True)  # sortuj po popularności w filmach
 
-    names = []
-    for k in results[:50]:
-        name = k["name"]
-        names.append(name)
-        st.session_state.keyword_name_to_id[name] = k["id"]
-
-    return names
+    return load_label_registry().register("keyword", [(k["name"], k["id"]) for k in results[:50]])
 
-# Funkcja do wyszukania filmów na podstawie filtrów
+# Funkcja do wyszukania filmów na podstawie filtrów - strona wyników i liczba wszystkich stron
 @st.cache_data(ttl=600)
 def search_movies(genre_ids, year_from, year_to, runtime, min_rating, min_vote_count, language,
                   actors, crew, keywords, excluded_keywords, popular_only, adult_only, trending, 
@@ -203,69 +206,39 @@ def search_movies(genre_ids, year_from, year_to, runtime, min_rating, min_vote_c
 
     params["page"] = page
 
-    r = requests.get(url, params=params)
-    return r.json().get("results", [])[:20]
+    r = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    data = r.json()
+    return data.get("results", [])[:20], min(data.get("total_pages", 1), MAX_PAGES)
+
+
+def fetch_page(filters, page, cancelled=None, fresh=False):
+    """Strona wyników razem z czasami trwania jej filmów (pobranymi równolegle do pamięci get_runtime).
+    Ustawione `cancelled` (threading.Event) pomija pobieranie szczegółów nieaktualnej już strony.
+    `fresh` omija pamięć search_movies - jej wpis może właśnie liczyć zawieszone zapytanie z tła."""
+    search = search_movies.__wrapped__ if fresh else search_movies
+    results, total_pages = search(**filters, page=page)
+    if cancelled is None or not cancelled.is_set():
+        list(detail_executor().map(get_runtime, [m["id"] for m in results if m.get("id")]))
+    return results, total_pages
 
 
 # Pobranie gatunków (słowniki)
 genres = fetch_genres()
 # Zamiana słownika w format name : id
 GENRE_NAME_TO_ID = {g["name"]: g["id"] for g in genres}
+# Wspólny rejestr nazw osób i słów kluczowych (id -> nazwa)
+labels = load_label_registry()
 
 
 ## Ustawienie stanów:
 
-# Aktorzy
-if "selected_actors" not in st.session_state:
-    st.session_state.selected_actors = []
-
-if "actor_name_to_id" not in st.session_state:
-    st.session_state.actor_name_to_id = {}
-
-if "actor_search_key" not in st.session_state:
-    st.session_state.actor_search_key = 0
-
-
-# Obsada techniczna
-if "selected_crew" not in st.session_state:
-    st.session_state.selected_crew = []
-
-if "crew_name_to_id" not in st.session_state:
-    st.session_state.crew_name_to_id = {}
-
-if "crew_search_key" not in st.session_state:
-    st.session_state.crew_search_key = 0
-
-
-# Słowa kluczowe
-if "selected_keywords" not in st.session_state:
-    st.session_state.selected_keywords = []
-
-if "keyword_name_to_id" not in st.session_state:
-    st.session_state.keyword_name_to_id = {}
-
-if "keyword_search_key" not in st.session_state:
-    st.session_state.keyword_search_key = 0
-
-
-# Słowa wykluczone
-if "excluded_keywords" not in st.session_state:
-    st.session_state.excluded_keywords = []
-
-if "excluded_keyword_name_to_id" not in st.session_state:
-    st.session_state.excluded_keyword_name_to_id = {}
-
-if "excluded_keyword_search_key" not in st.session_state:
-    st.session_state.excluded_keyword_search_key = 0
-
-
-# Minimalna liczba głosów
-if "min_vote_count" not in st.session_state:
-    st.session_state.min_vote_count = 0
-
-# Przycisk dla nowości
-if "new_releases_toggle" not in st.session_state:
-    st.session_state.new_releases_toggle = False
+# Wybrane osoby i słowa kluczowe (listy id)
+# oraz numer searchboxa danej listy (zmieniany po wyborze - nowy klucz daje pusty searchbox)
+for state_key in ("selected_actors", "selected_crew", "selected_keywords", "excluded_keywords"):
+    if state_key not in st.session_state:
+        st.session_state[state_key] = []
+    if f"{state_key}_search_key" not in st.session_state:
+        st.session_state[f"{state_key}_search_key"] = 0
 
 # Wyszukiwanie
 if "search_results" not in st.session_state:
@@ -277,6 +250,16 @@ if "search_clicked" not in st.session_state:
 if "search_page" not in st.session_state:
     st.session_state.search_page = 1
 
+if "search_total_pages" not in st.session_state:
+    st.session_state.search_total_pages = 1
+
+# filtry ostatniego wyszukiwania i pobierana w tle kolejna strona: (numer strony, future, threading.Event)
+if "search_filters" not in st.session_state:
+    st.session_state.search_filters = None
+
+if "search_prefetch" not in st.session_state:
+    st.session_state.search_prefetch = None
+
 
 # Słownik języków
 LANG_PL_TO_CODE = {
@@ -332,275 +315,335 @@ LANG_PL_TO_CODE = {
 }
 
 
+# Zamiana wartości dla 'time_window'
+TIME_WINDOWS = {"Dzisiaj": "day", "W tym tygodniu": "week"}
+
+
 ### Wyświetlanie filtrów
+# Filtry, lista osób/słów kluczowych i wyniki są osobnymi fragmentami (st.fragment): zmiana filtra przelicza
+# tylko swój fragment, a stan (wartości kontrolek, wybrane id, wyniki) jest w st.session_state
+
+# Wybór osób / słów kluczowych: searchbox dodaje id do listy w stanie sesji, kliknięcie w pigułkę je usuwa.
+# Zmiany obsługują funkcje zwrotne, bez dodatkowego st.rerun() całej strony.
+def _add_selected(state_key, item_id):
+    if item_id not in st.session_state[state_key]:
+        st.session_state[state_key].append(item_id)
+        drop_stale_prefetch()
+    # reset searchboxa: po przeładowaniu fragmentu (clear_on_submit) powstaje nowy pod nowym kluczem - stary
+    # pamiętałby wybraną pozycję i nie dałoby się jej wybrać ponownie po usunięciu z listy
+    st.session_state[f"{state_key}_search_key"] += 1
+
+
+def _remove_selected(state_key, pills_key):
+    item_id = st.session_state[pills_key]
+    if item_id in st.session_state[state_key]:
+        st.session_state[state_key].remove(item_id)
+        drop_stale_prefetch()
+    st.session_state[pills_key] = None
+
+
+def selection_filter(state_key, search_function, kind, placeholder, pills_label, pills_help):
+    """Searchbox i pigułki wybranych pozycji listy `state_key` (wywoływane wewnątrz fragmentu)."""
+    search_number = st.session_state[f"{state_key}_search_key"]
+    search_key, pills_key = f"{state_key}_search_{search_number}", f"{state_key}_pills"
+    st.session_state.pop(f"{state_key}_search_{search_number - 1}", None)  # stan poprzedniego searchboxa
+    # wyszukiwanie i wybór przeładowują tylko fragment, a nie całą stronę
+    st_searchbox(search_function, placeholder=placeholder, key=search_key, debounce=DEBOUNCE_MS,
+                 clear_on_submit=True, rerun_scope="fragment",
+                 submit_function=lambda item_id: _add_selected(state_key, item_id))
+
+    if st.session_state[state_key]:
+        st.pills(pills_label, st.session_state[state_key], format_func=lambda item_id: labels.label(kind, item_id),
+                 key=pills_key, help=pills_help, on_change=_remove_selected, args=(state_key, pills_key))
+
+
+@st.fragment
+def cast_filters():
+    st.markdown("<h5 style='text-align: center;'>Obsada</h5>",
+                unsafe_allow_html=True)
+
+    col11, col12 = st.columns(2)
+
+    with col11:
+        st.markdown("Aktor", text_alignment="center")
+        selection_filter("selected_actors", search_actors, "person",
+                         placeholder="Wpisz imię lub nazwisko aktora...",
+                         pills_label="Wybrani aktorzy:", pills_help="Kliknij aktora, aby go usunąć")
+
+    with col12:
+        st.markdown("Obsada techniczna", text_alignment="center")
+        selection_filter("selected_crew", search_crew, "person",
+                         placeholder="Wpisz imię lub nazwisko (reżyser, scenarzysta, producent...)",
+                         pills_label="Wybrana obsada techniczna", pills_help="Kliknij nazwisko, aby je usunąć")
+
+        if len(st.session_state.selected_crew) > 1:
+            st.warning("Wybranie kilku osób z obsady technicznej może znacząco ograniczyć liczbę wyników.")
+
+
+@st.fragment
+def keyword_filters():
+    st.markdown("<h5 style='text-align: center;'>Słowa kluczowe</h5>",
+                unsafe_allow_html=True)
+
+    col13, col14 = st.columns(2)
+
+    with col13:
+        st.markdown("Uwzględnij słowa:", text_alignment="center")
+        selection_filter("selected_keywords", search_keywords, "keyword",
+                         placeholder="Np. ogre, time travel...",
+                         pills_label="Wybrane słowa kluczowe:", pills_help="Kliknij, aby usunąć")
+
+    with col14:
+        st.markdown("Nie względniaj słów:", text_alignment="center")
+        selection_filter("excluded_keywords", search_keywords, "keyword",
+                         placeholder="Np. sequel, remake, superhero...",
+                         pills_label="Wykluczone słowa:", pills_help="Kliknij, aby usunąć")
+
+    conflicting_keywords = set(st.session_state.selected_keywords) & set(st.session_state.excluded_keywords)
+
+    if conflicting_keywords:
+        st.warning("Te same słowa kluczowe są jednocześnie wybrane i wykluczone: "
+                   + ", ".join(labels.label("keyword", kid) for kid in conflicting_keywords))
+
+
+@st.fragment
+def filters():
+    col1, div1, col2, div2, col3 = st.columns([4, 0.5, 4,0.5, 4])
+    with col1:
+        st.multiselect("Gatunek", list(GENRE_NAME_TO_ID.keys()), key="genre_names",
+                       help="Wybierz jeden lub kilka gatunków, aby filtrować filmy",
+                       placeholder = "Gatunek")
+
+    with div1:
+            st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
+                            unsafe_allow_html=True)
+
+    with col2:
+        st.slider("Rok wydania", min_value=1940, max_value=2026, value=(2016, 2026), step=1, key="year_range",
+                  help="Wybierz zakres lat wydania filmu",
+                  disabled=st.session_state.get("new_releases_toggle", False)) # wyłączone, jeśli wybrano opcję "nowości'
+
+    with div2:
+        st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
+                        unsafe_allow_html=True)
+
+    with col3:
+        st.slider("Minimalna ocena", min_value=0.0, max_value=10.0,
+                  value=6.5, step=0.5, key="min_rating")
 
-col1, div1, col2, div2, col3 = st.columns([4, 0.5, 4,0.5, 4])
-with col1:
-    genre_names = st.multiselect("Gatunek", list(GENRE_NAME_TO_ID.keys()),
-                                 help="Wybierz jeden lub kilka gatunków, aby filtrować filmy",
-                                 placeholder = "Gatunek")
 
-with div1:
+    col4, div3, col5, div4, col6 = st.columns([4, 0.5, 4,0.5, 4])
+    with col4:
+        st.selectbox("Język", options=list(LANG_PL_TO_CODE.keys()), key="language_label",
+                     help="Wybierz język oryginalny filmu (możesz wrócić do wszystkich)")
+
+    with div3:
         st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
-                        unsafe_allow_html=True)    
-        
-with col2:
-    year_from, year_to = st.slider("Rok wydania", min_value=1940, max_value=2026, value=(2016, 2026), step=1,
-                                   help="Wybierz zakres lat wydania filmu",
-                                   disabled=st.session_state.new_releases_toggle) # wyłączone, jeśli wybrano opcję "nowości'
-
-with div2:
-    st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
-                    unsafe_allow_html=True) 
-
-with col3:
-    min_rating = st.slider("Minimalna ocena", min_value=0.0, max_value=10.0, 
-                           value=6.5, step=0.5)
-    
+                        unsafe_allow_html=True)
+
+    with col5:
+        st.slider("Czas trwania filmu", 0, 400, (60, 240), key="runtime",
+                  help="Dostosuj minimalny i maksymalny czas trwania filmu.")
 
-col4, div3, col5, div4, col6 = st.columns([4, 0.5, 4,0.5, 4])
-with col4:
-    selected_lang_label = st.selectbox("Język", options=list(LANG_PL_TO_CODE.keys()),
-                                       help="Wybierz język oryginalny filmu (możesz wrócić do wszystkich)")
-    selected_language_code = LANG_PL_TO_CODE[selected_lang_label] # Zamiana kodu na nazwę języka
-
-with div3:
-    st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
-                    unsafe_allow_html=True)    
-
-with col5:
-    runtime = st.slider("Czas trwania filmu", 0, 400, (60, 240),
-                        help="Dostosuj minimalny i maksymalny czas trwania filmu.")
-
-with div4:
-    st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
-                    unsafe_allow_html=True)       
-
-with col6:
-    st.session_state.min_vote_count = st.slider("Minimalna liczba głosów", min_value=0, max_value=5000,
-                                                value=1000, step=50,
-                                                help="Filmy z mniejszą liczbą ocen mogą być mniej wiarygodne")
-         
-with st.expander("Filtry dodatkowe"):
-
-    col7, col8, col9, col10 = st.columns(4)
-
-    with col7:
-        popular_only = st.toggle("Tylko popularne filmy", help="Filmy oznaczane jako popularne oceniane są na podstawie aktywności użytkowników")
-        
-    with col8:
-        adult_only = st.toggle("Tylko filmy z ograniczeniem wiekowym (18+)")
-        
-    with col9:
-        trending = st.toggle("Tylko trending", help="'Trending' odnosi się do popularności dziennej lub tygodniowej")
-
-        if trending:
-            time_window = st.radio("Wybierz okres:", ["Dzisiaj", "W tym tygodniu"], horizontal=True)
-        else:
-            time_window = None
-
-    with col10:
-        new_releases = st.toggle("Tylko nowości", key="new_releases_toggle",
-                                 help="Jeśli włączone, pokażą się tylko filmy premierowe w ostatnich 30 dniach") 
-        
-    st.divider()
-
-    col_left, col_divider, col_right = st.columns([4, 0.5, 4])
-
-    with col_left:
-        st.markdown("<h5 style='text-align: center;'>Obsada</h5>",
-                    unsafe_allow_html=True)
-        
-        col11, col12 = st.columns(2)
-
-        with col11:
-            st.markdown("Aktor", text_alignment="center")
-
-            new_actor = st_searchbox(search_actors, placeholder= "Wpisz imię lub nazwisko aktora...",
-                                     key=f"actor_search_{st.session_state.actor_search_key}")
-
-            if new_actor and new_actor not in st.session_state.selected_actors:
-                st.session_state.selected_actors.append(new_actor)
-                st.session_state.actor_search_key += 1
-                st.rerun()
-
-            if st.session_state.selected_actors:
-                actor_to_remove = st.pills(label="Wybrani aktorzy:", options=st.session_state.selected_actors,
-                                           key="selected_actors_pills", help="Kliknij aktora, aby go usunąć")
-                if actor_to_remove:
-                    st.session_state.selected_actors.remove(actor_to_remove)
-                    st.rerun()
-
-        with col12:
-            st.markdown("Obsada techniczna", text_alignment="center")
-
-            new_crew = st_searchbox(search_crew,
-                                    placeholder="Wpisz imię lub nazwisko (reżyser, scenarzysta, producent...)",
-                                    key=f"crew_search_{st.session_state.crew_search_key}")
-
-            if new_crew and new_crew not in st.session_state.selected_crew:
-                st.session_state.selected_crew.append(new_crew)
-                st.session_state.crew_search_key += 1
-                st.rerun()
-
-            if st.session_state.selected_crew:
-                selected_to_remove = st.pills("Wybrana obsada techniczna", st.session_state.selected_crew,
-                                              help="Kliknij nazwisko, aby je usunąć", key="selected_crew_pills")
-                if selected_to_remove:
-                    st.session_state.selected_crew.remove(selected_to_remove)
-                    st.rerun()
-
-            if len(st.session_state.selected_crew) > 1:
-                st.warning("Wybranie kilku osób z obsady technicznej może znacząco ograniczyć liczbę wyników.")
-
-    with col_divider:
+    with div4:
         st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
-                    unsafe_allow_html=True)
-
-    with col_right:
-        st.markdown("<h5 style='text-align: center;'>Słowa kluczowe</h5>",
-                    unsafe_allow_html=True)
-        
-        col13, col14 = st.columns(2)
-
-        with col13:
-            st.markdown("Uwzględnij słowa:", text_alignment="center")
-            new_keyword = st_searchbox(search_keywords,
-                                       placeholder="Np. ogre, time travel...",
-                                       key=f"keyword_search_{st.session_state.keyword_search_key}")
-
-            if new_keyword and new_keyword not in st.session_state.selected_keywords:
-                st.session_state.selected_keywords.append(new_keyword)
-                st.session_state.keyword_search_key += 1
-                st.rerun()
-
-            if st.session_state.selected_keywords:
-                to_remove = st.pills("Wybrane słowa kluczowe:", st.session_state.selected_keywords,
-                                     help="Kliknij, aby usunąć", key="selected_keywords_pills")
-                if to_remove:
-                    st.session_state.selected_keywords.remove(to_remove)
-                    st.rerun()
-        
-        with col14:
-            st.markdown("Nie względniaj słów:", text_alignment="center")
-            exclude_keyword = st_searchbox(search_keywords, placeholder="Np. sequel, remake, superhero...",
-                                           key=f"exclude_keyword_search_{st.session_state.excluded_keyword_search_key}")
-
-            if exclude_keyword and exclude_keyword not in st.session_state.excluded_keywords:
-                st.session_state.excluded_keywords.append(exclude_keyword)
-                st.session_state.excluded_keyword_search_key += 1
-                st.rerun()
-
-            if st.session_state.excluded_keywords:
-                to_remove = st.pills("Wykluczone słowa:", st.session_state.excluded_keywords,
-                                     help="Kliknij, aby usunąć", key="excluded_keywords_pills")
-                if to_remove:
-                    st.session_state.excluded_keywords.remove(to_remove)
-                    st.rerun()
- 
-        conflicting_keywords = set(st.session_state.selected_keywords) & set(st.session_state.excluded_keywords)
-
-        if conflicting_keywords:
-            st.warning("Te same słowa kluczowe są jednocześnie wybrane i wykluczone: " + ", ".join(conflicting_keywords))
-
-
-genre_ids = [GENRE_NAME_TO_ID[g] for g in genre_names]
-        
-selected_actor_ids = [
-    st.session_state.actor_name_to_id[name]
-    for name in st.session_state.selected_actors
-    if name in st.session_state.actor_name_to_id
-]
-
-selected_keyword_ids = [
-    st.session_state.keyword_name_to_id[name]
-    for name in st.session_state.selected_keywords
-    if name in st.session_state.keyword_name_to_id
-]
-
-excluded_keyword_ids = [
-    st.session_state.excluded_keyword_name_to_id[name]
-    for name in st.session_state.excluded_keywords
-    if name in st.session_state.excluded_keyword_name_to_id
-]
+                        unsafe_allow_html=True)
 
-# Zamiana wartości dla 'time_window'
-time_window_dict = {"Dzisiaj": "day", "W tym tygodniu": "week"}
-time_window_new = time_window_dict.get(time_window) if time_window else "day"
+    with col6:
+        st.slider("Minimalna liczba głosów", min_value=0, max_value=5000,
+                  value=1000, step=50, key="min_vote_count",
+                  help="Filmy z mniejszą liczbą ocen mogą być mniej wiarygodne")
 
-if st.button("Szukaj", use_container_width=True):
-    st.session_state.search_page = 1
-    st.session_state.search_results = search_movies(
-        genre_ids=genre_ids,
+    with st.expander("Filtry dodatkowe"):
+
+        col7, col8, col9, col10 = st.columns(4)
+
+        with col7:
+            st.toggle("Tylko popularne filmy", key="popular_only",
+                      help="Filmy oznaczane jako popularne oceniane są na podstawie aktywności użytkowników")
+
+        with col8:
+            st.toggle("Tylko filmy z ograniczeniem wiekowym (18+)", key="adult_only")
+
+        with col9:
+            if st.toggle("Tylko trending", key="trending",
+                         help="'Trending' odnosi się do popularności dziennej lub tygodniowej"):
+                st.radio("Wybierz okres:", list(TIME_WINDOWS), horizontal=True, key="time_window")
+
+        with col10:
+            st.toggle("Tylko nowości", key="new_releases_toggle",
+                      help="Jeśli włączone, pokażą się tylko filmy premierowe w ostatnich 30 dniach")
+
+        st.divider()
+
+        col_left, col_divider, col_right = st.columns([4, 0.5, 4])
+
+        with col_left:
+            cast_filters()
+
+        with col_divider:
+            st.markdown("<div style='border-left:1px solid #ddd; height:100%;'></div>",
+                        unsafe_allow_html=True)
+
+        with col_right:
+            keyword_filters()
+
+    drop_stale_prefetch()
+
+
+def current_filters():
+    """Argumenty search_movies z bieżącego stanu kontrolek filtrów (bez numeru strony)."""
+    state = st.session_state
+    trending = state.trending
+    year_from, year_to = state.year_range
+    return dict(
+        genre_ids=[GENRE_NAME_TO_ID[g] for g in state.genre_names],
         year_from=year_from,
         year_to=year_to,
-        runtime=runtime,
-        min_rating=min_rating,
-        min_vote_count=st.session_state.min_vote_count,
-        language=selected_language_code,
-        actors=selected_actor_ids,
-        crew=[st.session_state.crew_name_to_id[n] for n in st.session_state.selected_crew],
-        keywords=selected_keyword_ids,
-        excluded_keywords=excluded_keyword_ids,
-        popular_only=popular_only,
-        adult_only=adult_only,
+        runtime=state.runtime,
+        min_rating=state.min_rating,
+        min_vote_count=state.min_vote_count,
+        language=LANG_PL_TO_CODE[state.language_label],
+        # Wybrane listy przechowują już id (searchbox zwraca id)
+        actors=list(state.selected_actors),
+        crew=list(state.selected_crew),
+        keywords=list(state.selected_keywords),
+        excluded_keywords=list(state.excluded_keywords),
+        popular_only=state.popular_only,
+        adult_only=state.adult_only,
         trending=trending,
-        time_window=time_window_new,
-        new_releases=st.session_state.new_releases_toggle,
-        page=st.session_state.search_page
+        time_window=TIME_WINDOWS.get(state.get("time_window")) if trending else "day",
+        new_releases=state.new_releases_toggle,
     )
 
-    st.session_state.search_clicked = True
-
 
-if st.session_state.search_clicked:
-    if st.session_state.search_results:
-        st.subheader("Wyniki wyszukiwania", text_alignment="center")
+def cancel_prefetch():
+    prefetch = st.session_state.search_prefetch
+    if prefetch:
+        _, future, cancelled = prefetch
+        cancelled.set()
+        future.cancel()
+    st.session_state.search_prefetch = None
 
-        st.markdown(
-                "<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 20px;'>",
-                unsafe_allow_html=True
-            )
 
-        for movie in st.session_state.search_results:
-            col1, col2 = st.columns([1, 4])
-            with col1:
-                if movie.get("poster_path"):
-                    st.image(f"https://image.tmdb.org/t/p/w200{movie['poster_path']}")
-            with col2:
-                # Tytuł
-                st.markdown(f"### {movie.get('title', 'Brak tytułu')}")
+def drop_stale_prefetch():
+    # filtry zmieniły się od ostatniego wyszukiwania - kolejna strona starych wyników nie będzie potrzebna
+    if st.session_state.search_prefetch and current_filters() != st.session_state.search_filters:
+        cancel_prefetch()
 
-                # Gatunki
-                movie_genres = [g['name'] for g in genres if g['id'] in movie.get('genre_ids', [])]
-                if movie_genres:
-                    st.markdown("**Gatunki:** " + ", ".join(movie_genres))
 
-                # Ocena i liczba głosów
-                vote_avg = movie.get("vote_average", 0)
-                vote_count = movie.get("vote_count", 0)
-                st.markdown(f"**Ocena:** {vote_avg} ({vote_count} głosów)")
+def prefetch_next_page():
+    page = st.session_state.search_page + 1
+    if page > st.session_state.search_total_pages:
+        return
+    cancelled = threading.Event()
+    future = page_executor().submit(fetch_page, st.session_state.search_filters, page, cancelled)
+    st.session_state.search_prefetch = (page, future, cancelled)
 
-                # Data wydania
-                release_date = movie.get("release_date", "Brak")
-                st.markdown(f"**Data wydania:** {release_date}")
 
-                # Czas trwania
-                runtime = get_runtime(movie['id']) if movie.get('id') else 0
-                if runtime:
-                    st.markdown(f"**Czas trwania:** {runtime} min")
+def show_page(page, results, total_pages):
+    # strony się dokładają; film, który przesunął się między stronami, jest pokazany tylko raz
+    seen = {m["id"] for m in st.session_state.search_results}
+    st.session_state.search_results += [m for m in results if m["id"] not in seen]
+    st.session_state.search_page = page
+    st.session_state.search_total_pages = total_pages
+    prefetch_next_page()
 
-                # Opis filmu
-                overview = movie.get("overview", "Brak opisu")
-                st.markdown(f"<p style='text-align: justify; font-size:0.85rem;'>{overview}</p>", unsafe_allow_html=True)
 
-            if st.button("Zobacz szczegóły", width="stretch", key=f"movie_{movie['id']}"):
-                        st.switch_page("pages/movie.py", query_params={"id": movie["id"]})
+def run_search():
+    cancel_prefetch()
+    st.session_state.search_filters = current_filters()
+    st.session_state.search_results = []
+    show_page(1, *fetch_page(st.session_state.search_filters, 1))
+    st.session_state.search_clicked = True
 
-            st.divider()
 
-    else:
+def load_more():
+    page = st.session_state.search_page + 1
+    prefetch = st.session_state.search_prefetch
+    st.session_state.search_prefetch = None
+    # strona zwykle jest już pobrana w tle; inaczej (błąd albo pobieranie trwa dłużej niż PREFETCH_WAIT)
+    # pobieramy ją teraz
+    page_data, hung = None, False
+    if prefetch and prefetch[0] == page:
+        _, future, cancelled = prefetch
+        try:
+            page_data = future.result(timeout=PREFETCH_WAIT)
+        except TimeoutError:
+            cancelled.set()
+            future.cancel()
+            hung = True
+        except (requests.RequestException, ValueError):
+            pass
+    show_page(page, *(page_data or fetch_page(st.session_state.search_filters, page, fresh=hung)))
+
+
+# Wyniki rysowane z zapisanej listy - zmiana filtrów nie pobiera ich ponownie, dopiero "Szukaj"
+@st.fragment
+def results():
+    st.button("Szukaj", use_container_width=True, on_click=run_search)
+
+    if not st.session_state.search_clicked:
+        return
+
+    if not st.session_state.search_results:
         st.warning("Nie znaleziono filmów dla wybranych filtrów.")
+        return
+
+    st.subheader("Wyniki wyszukiwania", text_alignment="center")
+
+    st.markdown(
+            "<hr style='border: 0.5px solid #ddd; margin-top: 4px; margin-bottom: 20px;'>",
+            unsafe_allow_html=True
+        )
+
+    genre_names = {g["id"]: g["name"] for g in genres}
+    for movie in st.session_state.search_results:
+        col1, col2 = st.columns([1, 4])
+        with col1:
+            if movie.get("poster_path"):
+                st.image(f"https://image.tmdb.org/t/p/w200{movie['poster_path']}")
+        with col2:
+            # Tytuł
+            st.markdown(f"### {movie.get('title', 'Brak tytułu')}")
+
+            # Gatunki
+            movie_genres = [genre_names[g] for g in movie.get('genre_ids', []) if g in genre_names]
+            if movie_genres:
+                st.markdown("**Gatunki:** " + ", ".join(movie_genres))
+
+            # Ocena i liczba głosów
+            vote_avg = movie.get("vote_average", 0)
+            vote_count = movie.get("vote_count", 0)
+            st.markdown(f"**Ocena:** {vote_avg} ({vote_count} głosów)")
+
+            # Data wydania
+            release_date = movie.get("release_date", "Brak")
+            st.markdown(f"**Data wydania:** {release_date}")
+
+            # Czas trwania
+            runtime = get_runtime(movie['id']) if movie.get('id') else 0
+            if runtime:
+                st.markdown(f"**Czas trwania:** {runtime} min")
+
+            # Opis filmu
+            overview = movie.get("overview", "Brak opisu")
+            st.markdown(f"<p style='text-align: justify; font-size:0.85rem;'>{overview}</p>", unsafe_allow_html=True)
+
+        if st.button("Zobacz szczegóły", width="stretch", key=f"movie_{movie['id']}"):
+                    st.switch_page("pages/movie.py", query_params={"id": movie["id"]})
+
+        st.divider()
+
+    # kolejna strona jest pobierana w tle od chwili pokazania bieżącej
+    if st.session_state.search_page < st.session_state.search_total_pages:
+        st.button("Pokaż więcej", use_container_width=True, on_click=load_more)
+    st.caption(f"Strona {st.session_state.search_page} z {st.session_state.search_total_pages} · "
+               f"filmów: {len(st.session_state.search_results)}", text_alignment="center")
+
+
+filters()
+results()
 
 
 
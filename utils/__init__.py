@@ -0,0 +1 @@
+# Moduły pomocnicze współdzielone przez stronę główną i podstrony aplikacji.
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from utils.title_index import fold
+
+# Opóźnienie (ms) wysyłania zapytania po ostatnim naciśnięciu klawisza - dla st_searchbox
+DEBOUNCE_MS = 300
+# Rozmiar strony wyników TMDB - mniej wyników oznacza pełną listę
+PAGE_SIZE = 20
+# Maksymalna liczba zapamiętanych zapytań na jedną wyszukiwarkę
+CACHE_SIZE = 1024
+CACHE_TTL = 3600
+
+# Instancje współdzielone przez wszystkie sesje (klucz: plik + nazwa funkcji)
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+class Autocomplete:
+    """Podpowiedzi z pamięcią LRU wspólną dla sesji i ponownym użyciem wyników dla prefiksu.
+
+    Zapytań nie anulujemy: nieaktualne zapytanie kończy się i jego wynik trafia do pamięci. Streamlit nie
+    udostępnia publicznie informacji o czekającym nowym przebiegu, a licznik w session_state nie zmieni się
+    w trakcie zapytania (następny przebieg sesji startuje dopiero po zakończeniu bieżącego). Liczbę zapytań
+    ogranicza opóźnienie w przeglądarce (DEBOUNCE_MS); wynik przebiegu przerwanego przez nowe wpisanie
+    Streamlit odrzuca, a w pamięci jest to poprawna odpowiedź TMDB dla tamtego zapytania.
+    """
+
+    def __init__(self, fetch, text, page_size=PAGE_SIZE, cache_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.fetch = fetch          # zapytanie -> lista wyników (jedna strona TMDB)
+        self.text = text            # wynik -> tekst do lokalnego filtrowania
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.stats = Counter()      # hit / prefix / remote
+        self._cache = OrderedDict() # znormalizowane zapytanie -> (czas, wyniki, pełna lista?)
+        self._lock = threading.Lock()
+
+    def _lookup(self, q):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(q)
+            if entry and now - entry[0] < self.ttl:
+                self._cache.move_to_end(q)
+                self.stats["hit"] += 1
+                return entry[1]
+
+            # "Shre" po "Shr" (jeden dopisany znak): filtrujemy lokalnie pełną listę krótszego zapytania,
+            # ale tylko jeśli nasze dopasowanie odtwarza ją w całości - TMDB dopasowuje też tytuły
+            # tłumaczone, których nie widać w wynikach, i wtedy lokalny filtr mógłby dać inną odpowiedź
+            parent = q[:-1].rstrip()
+            entry = self._cache.get(parent)
+            if (parent and entry and entry[2] and now - entry[0] < self.ttl
+                    and all(self._matches(parent, it) for it in entry[1])):
+                items = [it for it in entry[1] if self._matches(q, it)]
+                self._store(q, items, True, entry[0])
+                self.stats["prefix"] += 1
+                return items
+        return None
+
+    def _matches(self, q, item):
+        # jak w wyszukiwarce TMDB: każde słowo zapytania jest początkiem któregoś słowa w tytułach wyniku
+        words = fold(self.text(item)).split()
+        return all(any(w.startswith(token) for w in words) for token in q.split())
+
+    def _store(self, q, items, complete, stamp=None):
+        self._cache[q] = (stamp or time.monotonic(), items, complete)
+        self._cache.move_to_end(q)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def __call__(self, query):
+        q = fold(query)
+        if not q:
+            return []
+
+        items = self._lookup(q)
+        if items is not None:
+            return items
+
+        items = self.fetch(query)
+        self.stats["remote"] += 1
+        with self._lock:
+            self._store(q, items, len(items) < self.page_size)
+        return items
+
+
+# Dekorator zamieniający funkcję pobierającą wyniki z TMDB we współdzieloną warstwę podpowiedzi
+def autocomplete(text, page_size=PAGE_SIZE):
+    def decorator(fetch):
+        key = (fetch.__code__.co_filename, fetch.__qualname__)
+        with _instances_lock:
+            instance = _instances.get(key)
+            if instance is None:
+                instance = _instances[key] = Autocomplete(fetch, text, page_size)
+            else:
+                instance.fetch, instance.text = fetch, text  # funkcja definiowana ponownie przy każdym przebiegu strony
+        return instance
+    return decorator
@@ -0,0 +1,136 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import requests
+
+from utils.catalog import API_KEY
+
+TMDB_URL = "https://api.themoviedb.org/3"
+
+# Źródła kandydatów w kolejności łączenia (przy remisie w punktacji wygrywa wcześniejszy kandydat)
+# i czas (s) od startu, po którym wynik źródła jest pomijany
+SOURCE_DEADLINES = {
+    "recommendations": 2.0,  # /movie/{id}/recommendations
+    "similar": 2.0,          # /movie/{id}/similar
+    "keywords": 2.5,         # /discover/movie po słowach kluczowych wzorca
+    "genres": 3.0,           # /discover/movie po gatunkach wzorca (dotychczasowe jedyne źródło)
+}
+# Termin pobierania słów kluczowych kandydatów (brakujące pobierze później punktacja)
+KEYWORDS_DEADLINE = 2.0
+# Ile słów kluczowych wzorca trafia do zapytania discover (łączone przez "lub")
+QUERY_KEYWORDS = 10
+PAGE_SIZE = 20
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="candidates")
+
+
+def _tmdb_results(path, params, timeout):
+    r = requests.get(f"{TMDB_URL}{path}", params={"api_key": API_KEY, "language": "pl-PL", **params},
+                     timeout=timeout)
+    r.raise_for_status()
+    return r.json().get("results", [])
+
+
+def _tmdb_keywords(movie_id, timeout):
+    r = requests.get(f"{TMDB_URL}/movie/{movie_id}/keywords", params={"api_key": API_KEY}, timeout=timeout)
+    r.raise_for_status()
+    return r.json().get("keywords", [])
+
+
+# Wynik zadania razem z czasem jego zakończenia (od startu zbierania)
+def _timed(fetch, start):
+    return fetch(), time.perf_counter() - start
+
+
+# Rekord kandydata z wyniku listy TMDB: gatunki zamiast genre_ids (bez osobnego pytania o szczegóły)
+def list_record(result, genre_names):
+    return {**result, "genres": [{"id": g, "name": genre_names[g]} for g in result.get("genre_ids", [])
+                                 if g in genre_names]}
+
+
+# Zadania (źródło, funkcja) dla filmu-wzorca; strony jednego źródła pobierane równolegle
+def candidate_tasks(movie_id, genre_ids, keyword_ids, language=None, n=51):
+    pages = range(1, math.ceil(n / PAGE_SIZE) + 1)
+    tasks = []
+    for name in ("recommendations", "similar"):
+        tasks.append((name, lambda name=name: _tmdb_results(
+            f"/movie/{movie_id}/{name}", {"page": 1}, SOURCE_DEADLINES[name])))
+    if keyword_ids:
+        query = {"with_keywords": "|".join(map(str, keyword_ids[:QUERY_KEYWORDS])),
+                 "sort_by": "popularity.desc", "include_adult": False}
+        for page in pages:
+            tasks.append(("keywords", lambda p=page, q=query: _tmdb_results(
+                "/discover/movie", {**q, "page": p}, SOURCE_DEADLINES["keywords"])))
+    if genre_ids:
+        query = {"with_genres": ",".join(map(str, genre_ids)), "sort_by": "popularity.desc", "include_adult": False}
+        if language:
+            query["with_original_language"] = language
+        for page in pages:
+            tasks.append(("genres", lambda p=page, q=query: _tmdb_results(
+                "/discover/movie", {**q, "page": p}, SOURCE_DEADLINES["genres"])))
+    return tasks
+
+
+def gather_candidates(movie_id, tasks, genre_names, n=51):
+    """Równoległe pobranie wszystkich źródeł; każde ma własny termin.
+
+    Zwraca (kandydaci bez duplikatów i bez wzorca, źródło każdego kandydata, metryki źródeł).
+    Metryki: liczba wyników, liczba nowych kandydatów, czas (ms) i stan ("ok", "timeout", "error").
+    """
+    start = time.perf_counter()
+    futures = [(name, _executor.submit(_timed, fetch, start)) for name, fetch in tasks]
+
+    results = {name: [] for name in SOURCE_DEADLINES}
+    states = {name: set() for name in SOURCE_DEADLINES}
+    metrics = {name: {"wyniki": 0, "nowe": 0, "ms": 0.0} for name in SOURCE_DEADLINES}
+    for name, future in futures:
+        remaining = start + SOURCE_DEADLINES[name] - time.perf_counter()
+        try:
+            page, elapsed = future.result(timeout=max(remaining, 0))
+        except TimeoutError:
+            future.cancel()
+            states[name].add("timeout")
+            continue
+        except (requests.RequestException, ValueError):
+            states[name].add("error")
+            continue
+        states[name].add("ok")
+        results[name].extend(page)
+        metrics[name]["wyniki"] += len(page)
+        metrics[name]["ms"] = max(metrics[name]["ms"], elapsed * 1000)
+
+    for name, metric in metrics.items():
+        # stan źródła: "ok", jeśli przyszła choć jedna strona
+        metric["stan"] = next((s for s in ("ok", "timeout", "error") if s in states[name]), "pominięte")
+        if metric["stan"] == "timeout":
+            metric["ms"] = SOURCE_DEADLINES[name] * 1000
+
+    # scalenie w kolejności źródeł, bez duplikatów; z każdego źródła co najwyżej n filmów
+    candidates, origins = [], {}
+    seen = {int(movie_id)}
+    for name in SOURCE_DEADLINES:
+        for result in results[name][:n]:
+            if result["id"] in seen:
+                continue
+            seen.add(result["id"])
+            candidates.append(list_record(result, genre_names))
+            origins[result["id"]] = name
+            metrics[name]["nowe"] += 1
+    return candidates, origins, metrics
+
+
+# Dopisanie słów kluczowych do rekordów kandydatów (równolegle, z jednym terminem dla całej puli)
+def attach_keywords(candidates, deadline=KEYWORDS_DEADLINE):
+    start = time.perf_counter()
+    futures = [(m, _executor.submit(_tmdb_keywords, m["id"], deadline)) for m in candidates if "keywords" not in m]
+    fetched = 0
+    for m, future in futures:
+        try:
+            m["keywords"] = future.result(timeout=max(start + deadline - time.perf_counter(), 0))
+            fetched += 1
+        except TimeoutError:
+            future.cancel()
+        except (requests.RequestException, ValueError):
+            pass
+    return fetched
@@ -0,0 +1,211 @@
+import argparse
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+import streamlit as st
+
+API_KEY = os.getenv("TMDB_API_KEY")
+
+# Lokalny katalog filmów (JSON Lines, jeden film w linii)
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+CATALOG_PATH = Path(os.getenv("CINEMATE_CATALOG", DATA_DIR / "catalog.jsonl"))
+
+# Pola zapisywane dla każdego filmu (oprócz nich: genres, keywords, overview_original, people, budget i revenue);
+# poster_path - plakaty na listach rekomendacji z katalogu
+CATALOG_FIELDS = ("id", "title", "original_title", "popularity", "release_date",
+                  "genre_ids", "vote_average", "vote_count", "overview", "poster_path")
+
+# Liczba równoległych zapytań przy pobieraniu szczegółów
+FETCH_WORKERS = 8
+
+# Twórcy zapisywani w katalogu: pierwsi aktorzy z obsady i kluczowe funkcje ekipy
+CAST_TOP = 5
+KEY_JOBS = {"Director": "director", "Screenplay": "writer", "Writer": "writer",
+            "Original Music Composer": "composer"}
+
+
+# Nazwy słów kluczowych zapisanych w rekordzie filmu
+# (katalog: lista, TMDB z append_to_response=keywords: {"keywords": [...]})
+def stored_keywords(movie):
+    keywords = movie.get("keywords") or []
+    if isinstance(keywords, dict):
+        keywords = keywords.get("keywords", [])
+    return [k["name"] for k in keywords]
+
+
+# Kluczowi twórcy filmu z odpowiedzi /credits: [{"id", "name", "role"}]
+def key_people(credits, cast_top=CAST_TOP):
+    people = [{"id": p["id"], "name": p["name"], "role": "cast"}
+              for p in sorted(credits.get("cast", []), key=lambda p: p.get("order", 0))[:cast_top]]
+    seen = set()
+    for p in credits.get("crew", []):
+        role = KEY_JOBS.get(p.get("job"))
+        if role and (p["id"], role) not in seen:
+            seen.add((p["id"], role))
+            people.append({"id": p["id"], "name": p["name"], "role": role})
+    return people
+
+
+# Funkcja wczytująca katalog z dysku (pusty, jeśli plik nie istnieje)
+def load_catalog(path=CATALOG_PATH):
+    path = Path(path)
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# Katalog wspólny dla wszystkich indeksów i sesji procesu (tylko do odczytu) - jedna kopia rekordów,
+# wczytywana ponownie dopiero po zmianie pliku
+def shared_catalog(path=CATALOG_PATH):
+    return _shared_catalog(*file_version(path))
+
+
+# Ten sam katalog jako słownik id -> rekord (rekordy wspólne z shared_catalog)
+def shared_catalog_by_id(path=CATALOG_PATH):
+    return _shared_catalog_by_id(*file_version(path))
+
+
+# Wersja pliku katalogu (ścieżka oraz czas modyfikacji i rozmiar; None, jeśli plik nie istnieje)
+def file_version(path=CATALOG_PATH):
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return str(path), None
+    return str(path), (stat.st_mtime_ns, stat.st_size)
+
+
+@st.cache_resource(max_entries=1)
+def _shared_catalog(path, version):
+    return load_catalog(path)
+
+
+@st.cache_resource(max_entries=1)
+def _shared_catalog_by_id(path, version):
+    return {m['id']: m for m in _shared_catalog(path, version)}
+
+
+# Katalog wczytany razem z układem pliku: wersją (czas modyfikacji i rozmiar z otwartego pliku) i przesunięciami
+# (w bajtach) początków niepustych linii oraz końca pliku - rekord i to fragment [offsets[i], offsets[i + 1])
+def load_catalog_layout(path=CATALOG_PATH):
+    path = Path(path)
+    if not path.exists():
+        return [], None
+    with path.open("rb") as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    movies, offsets, position = [], [], 0
+    for line in data.splitlines(keepends=True):
+        if line.strip():
+            offsets.append(position)
+            movies.append(json.loads(line))
+        position += len(line)
+    offsets.append(position)
+    return movies, ((stat.st_mtime_ns, stat.st_size), offsets)
+
+
+class CatalogRecords:
+    """Rekordy katalogu czytane z pliku na żądanie (mmap + przesunięcia linii z paczki cech).
+
+    Zachowuje się jak lista rekordów, ale parsuje tylko te linie, o które ktoś poprosi - proces
+    nie wczytuje całego katalogu, żeby zwrócić kilkadziesiąt rekomendacji.
+    """
+
+    def __init__(self, path, offsets):
+        self.offsets = offsets
+        self.data = b""
+        if len(offsets) > 1:
+            with Path(path).open("rb") as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        i %= len(self)
+        return json.loads(self.data[self.offsets[i]:self.offsets[i + 1]])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+# Funkcja zapisująca katalog na dysk
+def save_catalog(movies, path=CATALOG_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        for m in movies:
+            f.write(json.dumps(m, ensure_ascii=False) + "\n")
+    os.replace(tmp, path)  # podmiana pliku w jednym kroku
+
+
+# Funkcja pobierająca kolejne strony najpopularniejszych filmów z TMDB
+def fetch_catalog_pages(pages, api_key=API_KEY):
+    movies = {}
+    for page in range(1, pages + 1):
+        r = requests.get(
+            "https://api.themoviedb.org/3/discover/movie",
+            params={
+                "api_key": api_key,
+                "language": "pl-PL",
+                "sort_by": "popularity.desc",
+                "include_adult": False,
+                "page": page
+            }
+        )
+        results = r.json().get("results", [])
+        if not results:
+            break
+        for m in results:
+            movies[m["id"]] = {f: m.get(f) for f in CATALOG_FIELDS}
+    return list(movies.values())
+
+
+# Funkcja pobierająca angielskie szczegóły filmu razem ze słowami kluczowymi i obsadą (jedno zapytanie)
+def fetch_original_details(movie_id, api_key=API_KEY):
+    r = requests.get(
+        f"https://api.themoviedb.org/3/movie/{movie_id}",
+        params={"api_key": api_key, "language": "en-US", "append_to_response": "keywords,credits"}
+    )
+    return r.json()
+
+
+# Funkcja uzupełniająca filmy o nazwy gatunków, słowa kluczowe, opis oryginalny i twórców (do rekomendacji)
+# oraz budżet i przychody (do analizy biznesowej)
+def add_details(movies, api_key=API_KEY):
+    r = requests.get(
+        "https://api.themoviedb.org/3/genre/movie/list",
+        params={"api_key": api_key, "language": "pl-PL"}
+    )
+    genre_names = {g["id"]: g["name"] for g in r.json().get("genres", [])}
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        details = pool.map(lambda m: fetch_original_details(m["id"], api_key), movies)
+        for m, d in zip(movies, details):
+            m["genres"] = [{"id": g, "name": genre_names[g]} for g in m.get("genre_ids") or [] if g in genre_names]
+            m["keywords"] = d.get("keywords", {}).get("keywords", [])
+            m["overview_original"] = d.get("overview", "")
+            m["people"] = key_people(d.get("credits", {}))
+            m["budget"] = d.get("budget") or 0
+            m["revenue"] = d.get("revenue") or 0
+    return movies
+
+
+# Budowa katalogu z linii poleceń: python -m utils.catalog --pages 100
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budowa lokalnego katalogu filmów z TMDB")
+    parser.add_argument("--pages", type=int, default=100, help="Liczba stron /discover/movie (po 20 filmów)")
+    parser.add_argument("--output", default=str(CATALOG_PATH))
+    args = parser.parse_args()
+
+    catalog = add_details(fetch_catalog_pages(args.pages))
+    save_catalog(catalog, args.output)
+    print(f"Zapisano {len(catalog)} filmów do {args.output}")
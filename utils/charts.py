@@ -0,0 +1,206 @@
+import json
+
+import altair as alt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Siatka wykresu budżet vs przychody (BINS x BINS przedziałów logarytmicznych) i liczba tytułów w podpowiedzi
+BINS = 30
+TOOLTIP_TITLES = 5
+# Filmy wyróżnione na wykresie: najwyższy i najniższy ROI
+OUTLIERS = 10
+# Przedziały rozkładu ROI (logarytm stosunku przychodów do budżetu)
+ROI_BINS = 40
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _log_bins(values, bins):
+    # przedziały równej szerokości w skali log10, zakres z danych (jeden przedział, gdy wszystkie wartości są równe)
+    logs = np.log10(values)
+    lo, hi = float(logs.min()), float(logs.max())
+    if hi - lo < 1e-9:
+        lo, hi = lo - 0.5, hi + 0.5
+    edges = np.linspace(lo, hi, bins + 1)
+    return np.clip(((logs - lo) / (hi - lo) * bins).astype(np.int64), 0, bins - 1), 10 ** edges
+
+
+def budget_revenue_bins(df, bins=BINS, titles=TOOLTIP_TITLES):
+    """Gęstość filmów na siatce budżet x przychody (skala log): jeden wiersz na niepusty przedział,
+    z liczbą filmów, medianą ROI i pierwszymi tytułami (w kolejności `df`)."""
+    x, x_edges = _log_bins(df["Budżet"].to_numpy(dtype=np.float64), bins)
+    y, y_edges = _log_bins(df["Przychody"].to_numpy(dtype=np.float64), bins)
+    cell = x * bins + y
+
+    # grupy przedziałów z zachowaniem kolejności filmów w grupie (stabilne sortowanie)
+    order = np.argsort(cell, kind="stable")
+    cells, first, counts = np.unique(cell[order], return_index=True, return_counts=True)
+    rank = np.arange(len(order)) - np.repeat(first, counts)
+    names = df["Tytuł"].to_numpy()[order]
+    roi = df["ROI"].to_numpy()[order]
+    shown = {}
+    for c, name in zip(cell[order][rank < titles], names[rank < titles]):
+        shown.setdefault(c, []).append(name)
+
+    # granice w pełnych dolarach i zaokrąglone mediany - mniej znaków w specyfikacji wykresu
+    x_edges, y_edges = np.round(x_edges).astype(np.int64), np.round(y_edges).astype(np.int64)
+    bx, by = cells // bins, cells % bins
+    return pd.DataFrame({
+        "Budżet od": x_edges[bx], "Budżet do": x_edges[bx + 1],
+        "Przychody od": y_edges[by], "Przychody do": y_edges[by + 1],
+        "Filmy": counts,
+        "Mediana ROI": [round(float(np.median(roi[s:s + n])), 3) for s, n in zip(first, counts)],
+        "Tytuły": [", ".join(map(str, shown[c])) + (f" (+{n - titles})" if n > titles else "")
+                   for c, n in zip(cells, counts)],
+    })
+
+
+def roi_outliers(df, n=OUTLIERS):
+    """Filmy o najwyższym i najniższym ROI (do wyróżnienia na wykresie gęstości)."""
+    top = df.nlargest(n, "ROI").assign(Grupa="najwyższy ROI")
+    bottom = df.drop(top.index, errors="ignore").nsmallest(n, "ROI").assign(Grupa="najniższy ROI")
+    return pd.concat([top, bottom])[["Tytuł", "Budżet", "Przychody", "ROI", "Grupa"]]
+
+
+def roi_distribution(df, bins=ROI_BINS):
+    """Histogram ROI (przedziały log10 stosunku przychody/budżet) i kwantyle ROI liczone z danych."""
+    ratio = (df["Przychody"] / df["Budżet"]).to_numpy(dtype=np.float64)
+    idx, edges = _log_bins(ratio, bins)
+    counts = np.bincount(idx, minlength=bins)
+    nonzero = np.flatnonzero(counts)
+    edges = np.round(edges, 4)
+    hist = pd.DataFrame({"ROI od": edges[nonzero] - 1, "ROI do": edges[nonzero + 1] - 1,
+                         "Stosunek od": edges[nonzero], "Stosunek do": edges[nonzero + 1],
+                         "Filmy": counts[nonzero]})
+    quantiles = {q: float(np.quantile(ratio, q)) for q in QUANTILES}
+    return hist, quantiles
+
+
+def budget_revenue_chart(df):
+    bins = budget_revenue_bins(df)
+    density = alt.Chart(bins).mark_rect(opacity=0.85).encode(
+        x=alt.X("Budżet od:Q", title="Budżet ($)", scale=alt.Scale(type="log")), x2="Budżet do",
+        y=alt.Y("Przychody od:Q", title="Przychody ($)", scale=alt.Scale(type="log")), y2="Przychody do",
+        color=alt.Color("Filmy:Q", scale=alt.Scale(type="log", scheme="purples"), title="Filmy"),
+        tooltip=[alt.Tooltip("Filmy:Q"), alt.Tooltip("Mediana ROI:Q", format=".2f"),
+                 alt.Tooltip("Budżet od:Q", format="$,.0f"), alt.Tooltip("Budżet do:Q", format="$,.0f"),
+                 alt.Tooltip("Przychody od:Q", format="$,.0f"), alt.Tooltip("Przychody do:Q", format="$,.0f"),
+                 alt.Tooltip("Tytuły:N")]
+    )
+    # próg opłacalności: przychody = budżet
+    low = float(min(bins["Budżet od"].min(), bins["Przychody od"].min()))
+    high = float(max(bins["Budżet do"].max(), bins["Przychody do"].max()))
+    break_even = alt.Chart(pd.DataFrame({"Budżet": [low, high], "Przychody": [low, high]})).mark_line(
+        color="gray", strokeDash=[4, 4]).encode(x="Budżet:Q", y="Przychody:Q")
+    outliers = alt.Chart(roi_outliers(df)).mark_point(filled=True, size=50).encode(
+        x="Budżet:Q", y="Przychody:Q",
+        color=alt.Color("Grupa:N", scale=alt.Scale(domain=["najwyższy ROI", "najniższy ROI"],
+                                                   range=["#2ca02c", "#d62728"]), title=""),
+        tooltip=[alt.Tooltip("Tytuł:N"), alt.Tooltip("Budżet:Q", format="$,.0f"),
+                 alt.Tooltip("Przychody:Q", format="$,.0f"), alt.Tooltip("ROI:Q", format=".2f")]
+    )
+    return alt.layer(density, break_even, outliers).resolve_scale(color="independent")
+
+
+def roi_distribution_chart(df):
+    hist, quantiles = roi_distribution(df)
+    bars = alt.Chart(hist).mark_bar(color="#9b6dc6").encode(
+        x=alt.X("Stosunek od:Q", title="Przychody / budżet", scale=alt.Scale(type="log")), x2="Stosunek do",
+        y=alt.Y("Filmy:Q", title="Liczba filmów"),
+        tooltip=[alt.Tooltip("Filmy:Q"), alt.Tooltip("ROI od:Q", format=".2f"), alt.Tooltip("ROI do:Q", format=".2f")]
+    )
+    # pasmo między kwartylami i mediana
+    band = alt.Chart(pd.DataFrame({"od": [quantiles[0.25]], "do": [quantiles[0.75]]})).mark_rect(
+        color="gray", opacity=0.15).encode(x="od:Q", x2="do:Q")
+    median = alt.Chart(pd.DataFrame({"Mediana": [quantiles[0.5]], "ROI": [quantiles[0.5] - 1]})).mark_rule(
+        color="#5d2266", strokeWidth=2).encode(x="Mediana:Q", tooltip=[alt.Tooltip("ROI:Q", title="Mediana ROI",
+                                                                                   format=".2f")])
+    return alt.layer(band, bars, median)
+
+
+
+# ===================== STRONA GŁÓWNA I STRONA FILMU =====================
+# Wykresy dostają tylko kolumny, których używają (bez opisów, plakatów i list gatunków z TMDB)
+def popularity_chart(top_popular):
+    return alt.Chart(top_popular[["title", "popularity"]]).mark_bar().encode(
+        x=alt.X("popularity:Q", title="Popularność"),
+        y=alt.Y("title:N", sort="-x", title="Film"),
+        tooltip=[
+            alt.Tooltip("title:N", title="Tytuł"),
+            alt.Tooltip("popularity:Q", title="Popularność")
+        ]
+    )
+
+
+def rating_chart(rating_bins):
+    # przedziały policzone na serwerze (dashboard.RATING_EDGES)
+    return alt.Chart(rating_bins).mark_bar().encode(
+        x=alt.X("Od:Q", bin="binned", title="Ocena"),
+        x2="Do:Q",
+        y=alt.Y("Liczba filmów:Q", title="Liczba filmów"),
+        tooltip=[alt.Tooltip("Liczba filmów:Q", title="Liczba filmów")]
+    )
+
+
+def genre_chart(genre_count):
+    return alt.Chart(genre_count).mark_bar().encode(
+        x=alt.X("Liczba filmów:Q"),
+        y=alt.Y("Gatunek:N", sort="-x"),
+        tooltip=["Gatunek", "Liczba filmów"]
+    )
+
+
+def votes_chart(df_votes):
+    return alt.Chart(df_votes[["title", "vote_count", "vote_average", "highlight"]]).mark_bar().encode(
+        x=alt.X("title:N", sort="-y", title="Film"),
+        y=alt.Y("vote_count:Q", title="Liczba głosów"),
+        color=alt.condition(
+            alt.datum.highlight,
+            alt.value("#5d2266"),  # ciemnofioletowy
+            alt.value("#9b6dc6")   # jasnofioletowy
+        ),
+        tooltip=["title", "vote_count", "vote_average"]
+    )
+
+
+def finance_chart(df_fin):
+    # Ustawienie kolorów według kategorii
+    color_scale = alt.Scale(
+        domain=["Budżet", "Przychody"],
+        range=["#5d2266", "#9b6dc6"]
+    )
+    return alt.Chart(df_fin).mark_bar(color="#1f77b4").encode(
+        x=alt.X("Kategoria:N", title=""),
+        y=alt.Y("Kwota:Q", title="Kwota ($)"),
+        tooltip=["Kategoria", "Kwota"],
+        color=alt.Color("Kategoria:N", scale=color_scale, legend=None)
+    )
+
+@st.cache_data(ttl=3600, max_entries=256)
+def _chart_spec(name, key, _build, _args):
+    spec = _build(*_args).to_dict()
+    return spec, len(json.dumps(spec, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def show_chart(name, key, build, *args):
+    """Rysuje wykres `build(*args)` (wykres Altair na już przyciętych/zagregowanych danych).
+
+    Specyfikacja Vega-Lite jest zapamiętana pod (`name`, `key`) - `key` to odcisk danych wejściowych,
+    np. dashboard.ids_key - więc ponowne uruchomienie strony nie buduje ani nie waliduje jej od nowa.
+    Rozmiar specyfikacji (z danymi) trafia do raportu payload_report().
+    """
+    spec, size = _chart_spec(name, key, build, args)
+    st.session_state.setdefault("chart_payload", {})[name] = size
+    st.vega_lite_chart(spec, use_container_width=True)
+
+
+def payload_report():
+    """Rozmiar wykresów narysowanych w tym przebiegu strony (widoczny z parametrem adresu ?perf=1)."""
+    payload = st.session_state.pop("chart_payload", {})
+    if not st.query_params.get("perf") or not payload:
+        return payload
+    with st.expander("Rozmiar wykresów"):
+        st.dataframe(pd.DataFrame({"Wykres": list(payload), "KB": [size / 1024 for size in payload.values()]}),
+                     column_config={"KB": st.column_config.NumberColumn(format="%.1f")}, hide_index=True)
+        st.caption(f"Razem: {sum(payload.values()) / 1024:.1f} KB")
+    return payload
@@ -0,0 +1,81 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils import frames
+
+# Liczba filmów na wykresie popularności
+TOP_N = 20
+# Przedziały histogramu ocen (skala TMDB 0-10) i próg "wysokiej" oceny
+RATING_EDGES = np.arange(0, 11)
+HIGH_RATING = 7.5
+# Kolumny potrzebne do analiz (reszta odpowiedzi TMDB nie trafia do ramki)
+COLUMNS = ["id", "title", "popularity", "vote_average", "vote_count", "genre_ids"]
+
+
+# Krótki klucz pamięci podręcznej z listy id (kolejność ma znaczenie) i parametrów
+def ids_key(ids, *extra):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(ids, dtype=np.int64).tobytes())
+    digest.update(repr(extra).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def movies_key(movies, *extra):
+    return ids_key([m["id"] for m in movies], *extra)
+
+
+def movies_frame(movies):
+    """Ramka z kolumnami COLUMNS na typach Arrow (brakujące pola jako puste, gatunki jako list<int32>)"""
+    return frames.movies_frame(movies, COLUMNS)
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def _summary(key, _movies, _genre_names, top_n):
+    df = movies_frame(_movies)
+
+    top_popular = df.nlargest(top_n, "popularity")[["title", "popularity"]]
+
+    ratings = df["vote_average"].dropna().to_numpy(dtype=np.float64)
+    counts, _ = np.histogram(ratings, bins=RATING_EDGES)
+    rating_bins = pd.DataFrame({"Od": RATING_EDGES[:-1], "Do": RATING_EDGES[1:], "Liczba filmów": counts})
+
+    # gatunki: spłaszczona lista id (bez obiektów Pythona na parę film-gatunek), zliczenie id, potem nazwy
+    ids = df["genre_ids"].list.flatten().value_counts()
+    genre_counts = (ids.groupby(ids.index.map(lambda g: _genre_names.get(g, "Inne"))).sum()
+                    .rename_axis("Gatunek").reset_index(name="Liczba filmów")
+                    .sort_values(["Liczba filmów", "Gatunek"], ascending=[False, True], ignore_index=True))
+
+    return {
+        "count": len(df),
+        "popularity_top": top_popular,
+        "popularity_mean": float(df["popularity"].mean()),
+        "most_popular": top_popular["title"].iloc[0] if len(top_popular) else None,
+        "rating_bins": rating_bins,
+        "rating_mean": float(ratings.mean()) if len(ratings) else float("nan"),
+        "rating_median": float(np.median(ratings)) if len(ratings) else float("nan"),
+        "rating_high": int((ratings > HIGH_RATING).sum()),
+        "genre_counts": genre_counts,
+    }
+
+
+def dashboard_summary(movies, genre_names, top_n=TOP_N):
+    """Wszystkie analizy listy filmów w jednym przebiegu (zapamiętane pod odciskiem listy id):
+    popularność (top N, średnia), rozkład ocen (histogram, średnia, mediana) i liczby filmów w gatunkach."""
+    return _summary(movies_key(movies, top_n, sorted(genre_names.items())), movies, genre_names, top_n)
+
+
+@st.cache_data(ttl=3600, max_entries=64)
+def _vote_comparison(key, _movies, movie_id):
+    df = movies_frame(_movies).drop_duplicates("id")
+    df["highlight"] = df["id"] == movie_id
+    return df[["id", "title", "vote_count", "vote_average", "highlight"]]
+
+
+def vote_comparison(movies, movie):
+    """Liczby głosów filmów z listy i wybranego filmu (dopisanego, jeśli go nie ma) z oznaczeniem wybranego"""
+    if all(m["id"] != movie["id"] for m in movies):
+        movies = [*movies, movie]
+    return _vote_comparison(movies_key(movies), movies, movie["id"])
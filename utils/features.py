@@ -0,0 +1,199 @@
+import argparse
+import os
+import shutil
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse as sp
+import streamlit as st
+
+from utils.catalog import (CATALOG_PATH, DATA_DIR, CatalogRecords, file_version, load_catalog_layout,
+                           stored_keywords)
+
+FEATURES_DIR = DATA_DIR / "features"
+# Plik z nazwą aktualnej wersji paczki (podmieniany atomowo przez os.replace)
+CURRENT_PATH = FEATURES_DIR / "CURRENT"
+# Ile ostatnich wersji zostawiamy na dysku (procesy mogą jeszcze czytać poprzednią)
+KEEP_VERSIONS = 2
+
+
+class FeatureBundle:
+    """Wersja paczki cech rekomendacji: katalog plików .npy otwieranych przez mmap (bez kopiowania).
+
+    Każdy proces Streamlit mapuje te same pliki - strony pamięci są współdzielone przez pamięć podręczną
+    systemu, a otwarcie paczki nie wymaga deserializacji.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version = path.name
+        self.arrays = {f.stem: np.load(f, mmap_mode="r") for f in sorted(path.glob("*.npy"))}
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __len__(self):
+        return len(self.arrays["ids"])
+
+    def csr(self, prefix, columns):
+        """Macierz CSR z tablic `<prefix>_data`, `<prefix>_indices`, `<prefix>_indptr` (bez kopii, o ile typy się zgadzają)."""
+        return sp.csr_matrix((self[f"{prefix}_data"], self[f"{prefix}_indices"], self[f"{prefix}_indptr"]),
+                             shape=(len(self), columns), copy=False)
+
+    def strings(self, prefix):
+        """Tablica napisów `<prefix>_bytes`, `<prefix>_offsets`, `<prefix>_order` (czytana wprost z mmap)."""
+        return StringTable(self[f"{prefix}_bytes"], self[f"{prefix}_offsets"], self[f"{prefix}_order"])
+
+    def matches(self, movies):
+        """Czy paczka opisuje dokładnie te filmy (w tej samej kolejności) co podany katalog."""
+        ids = self["ids"]
+        if "genre_names_bytes" not in self or len(ids) != len(movies):
+            return False
+        return np.array_equal(ids, np.fromiter((m['id'] for m in movies), dtype=np.int64, count=len(movies)))
+
+    def describes(self, catalog_path=CATALOG_PATH):
+        """Czy paczkę zbudowano z obecnej wersji pliku katalogu (porównanie czasu modyfikacji i rozmiaru,
+        bez czytania pliku) - wtedy rekordy można czytać przez records()."""
+        _, version = file_version(catalog_path)
+        return (version is not None and "catalog_version" in self and "genre_names_bytes" in self
+                and tuple(self["catalog_version"].tolist()) == version)
+
+    def records(self, catalog_path=CATALOG_PATH):
+        """Rekordy katalogu czytane na żądanie według przesunięć linii zapisanych w paczce."""
+        return CatalogRecords(catalog_path, self["record_offsets"])
+
+
+class StringTable:
+    """Napisy zapisane w paczce jako jeden blok UTF-8 z przesunięciami - czytane wprost z mmap.
+
+    Zastępuje tablicę nazw (`names[i]`, `names[indices]`) i słownik nazwa -> numer (`get(name)`,
+    wyszukiwanie binarne po kolejności posortowanej), więc otwarcie paczki nie tworzy obiektu
+    Pythona dla każdej nazwy.
+    """
+
+    def __init__(self, data, offsets, order):
+        self.data = data
+        self.offsets = offsets
+        self.order = order
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _bytes(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        if np.ndim(i):
+            return [self[j] for j in i]
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return self._bytes(i % len(self)).decode("utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def get(self, name, default=None):
+        key = name.encode("utf-8")
+        k = bisect_left(self.order, key, key=self._bytes)
+        if k < len(self.order) and self._bytes(self.order[k]) == key:
+            return int(self.order[k])
+        return default
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+
+# Tablice macierzy CSR pod nazwami `<prefix>_data`, `<prefix>_indices`, `<prefix>_indptr`
+def csr_arrays(prefix, matrix):
+    return {f"{prefix}_data": matrix.data, f"{prefix}_indices": matrix.indices, f"{prefix}_indptr": matrix.indptr}
+
+
+# Napisy jako blok UTF-8 z przesunięciami i kolejnością posortowaną (do StringTable)
+def string_arrays(prefix, names):
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return {f"{prefix}_bytes": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            f"{prefix}_offsets": offsets,
+            f"{prefix}_order": np.array(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64)}
+
+
+# Nazwa aktualnej wersji paczki (None, jeśli żadnej jeszcze nie zbudowano)
+def current_version():
+    try:
+        return CURRENT_PATH.read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+# Zapis nowej wersji paczki i atomowe przełączenie CURRENT; stare wersje (poza KEEP_VERSIONS) są usuwane
+def publish_bundle(arrays, features_dir=FEATURES_DIR):
+    features_dir.mkdir(parents=True, exist_ok=True)
+    # nazwy wersji rosną z czasem (sortowanie po nazwie = kolejność publikacji)
+    version = datetime.now().strftime("v%Y%m%d-%H%M%S-%f")
+    while (features_dir / version).exists():
+        version = datetime.now().strftime("v%Y%m%d-%H%M%S-%f")
+
+    # najpierw pełny katalog pod nazwą tymczasową, dopiero potem zmiana nazwy i wskaźnika
+    tmp = features_dir / f".{version}.tmp"
+    tmp.mkdir()
+    for name, array in arrays.items():
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(array))
+    os.replace(tmp, features_dir / version)
+
+    pointer = features_dir / "CURRENT.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, features_dir / "CURRENT")
+
+    # procesy, które mają otwartą starszą wersję, dalej ją czytają (mmap przeżywa usunięcie pliku)
+    versions = sorted(p for p in features_dir.iterdir()
+                      if p.is_dir() and p.name.startswith("v") and p.name != version)
+    for old in versions[:len(versions) - (KEEP_VERSIONS - 1)]:
+        shutil.rmtree(old, ignore_errors=True)
+    return version
+
+
+# Wszystkie tablice paczki dla katalogu: id, popularność i oceny oraz macierze cech obu modeli rekomendacji;
+# z `layout` (load_catalog_layout) także wersja pliku i przesunięcia linii - rekordy czytane na żądanie
+def build_bundle_arrays(movies, layout=None):
+    # import w funkcji: moduły modeli same wczytują paczkę przez ten moduł
+    from utils.person_graph import PersonGraph
+    from utils.sparse_scoring import SparseScorer
+
+    arrays = {
+        "ids": np.array([m['id'] for m in movies], dtype=np.int64),
+        "popularity": np.array([m.get('popularity') or 0 for m in movies], dtype=np.float32),
+        "vote_average": np.array([m.get('vote_average') or 0 for m in movies], dtype=np.float32),
+        "vote_count": np.array([m.get('vote_count') or 0 for m in movies], dtype=np.int32),
+    }
+    arrays.update(SparseScorer(movies, {m['id']: stored_keywords(m) for m in movies}).arrays())
+    arrays.update(PersonGraph(movies).arrays())
+    if layout is not None:
+        version, offsets = layout
+        arrays["catalog_version"] = np.array(version, dtype=np.int64)
+        arrays["record_offsets"] = np.array(offsets, dtype=np.int64)
+    return arrays
+
+
+# Otwarta wersja paczki - jedna na proces i wersję (po przełączeniu CURRENT otwierana jest nowa)
+@st.cache_resource(max_entries=KEEP_VERSIONS)
+def open_bundle(version):
+    return FeatureBundle(FEATURES_DIR / version)
+
+
+# Budowa paczki z linii poleceń: python -m utils.features
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budowa paczki cech rekomendacji (pliki .npy do mmap)")
+    parser.parse_args()
+
+    catalog, layout = load_catalog_layout()
+    started = time.perf_counter()
+    version = publish_bundle(build_bundle_arrays(catalog, layout))
+    size = sum(f.stat().st_size for f in (FEATURES_DIR / version).glob("*.npy"))
+    print(f"Zapisano wersję {version} ({len(catalog)} filmów, {size / 2**20:.1f} MB) "
+          f"w {time.perf_counter() - started:.1f} s do {FEATURES_DIR}")
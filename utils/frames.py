@@ -0,0 +1,56 @@
+import pandas as pd
+import pyarrow as pa
+
+# Typy pól filmu (TMDB / lokalny katalog) - do ramki trafiają tylko wybrane kolumny, reszta odpowiedzi
+# (opisy, ścieżki plakatów itp.) nie jest nawet konwertowana
+MOVIE_FIELDS = {
+    "id": pa.int64(),
+    "title": pa.string(),
+    "popularity": pa.float64(),
+    "vote_average": pa.float64(),
+    "vote_count": pa.int64(),
+    "release_date": pa.string(),
+    "genre_ids": pa.list_(pa.int32()),
+    "budget": pa.int64(),
+    "revenue": pa.int64(),
+}
+
+# Wiersze analizy biznesowej (pages/analysis.py)
+FINANCIAL_FIELDS = {
+    "id": pa.int64(),
+    "Tytuł": pa.string(),
+    "Budżet": pa.int64(),
+    "Przychody": pa.int64(),
+    "ROI": pa.float64(),
+    "Rok": pa.int16(),
+}
+
+
+def schema(fields, columns):
+    """Schemat Arrow z kolumnami `columns` (w tej kolejności) o typach z `fields`."""
+    return pa.schema([(c, fields[c]) for c in columns])
+
+
+def _types_mapper(arrow_type):
+    # kolumny słownikowe -> pandas Categorical (kody + słownik), pozostałe -> ArrowDtype
+    return None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+
+
+def arrow_frame(table):
+    """Ramka pandas na buforach tabeli Arrow (jak dtype_backend="pyarrow")."""
+    return table.to_pandas(types_mapper=_types_mapper)
+
+
+def records_frame(records, schema):
+    """Ramka z listy słowników wg schematu Arrow - brakujące pola jako puste, pozostałe pominięte."""
+    return arrow_frame(pa.Table.from_pylist(list(records), schema=schema))
+
+
+def movies_frame(movies, columns):
+    """Ramka filmów z kolumnami `columns` (nazwy z MOVIE_FIELDS)."""
+    return records_frame(movies, schema(MOVIE_FIELDS, columns))
+
+
+def financial_frame(records, columns=tuple(FINANCIAL_FIELDS)):
+    """Ramka wierszy analizy biznesowej z kolumnami `columns` (nazwy z FINANCIAL_FIELDS)."""
+    return records_frame(records, schema(FINANCIAL_FIELDS, columns))
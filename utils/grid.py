@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import streamlit as st
+
+PAGE_SIZES = (25, 50, 100, 250)
+
+
+# Numery wierszy po filtrze tytułu i sortowaniu - tylko ta strona trafia później do przeglądarki
+def visible_rows(df, query=None, query_column=None, sort_column=None, descending=True):
+    rows = np.arange(len(df))
+    if query and query_column:
+        matches = df[query_column].str.contains(query, case=False, regex=False, na=False).to_numpy()
+        rows = rows[matches]
+    if sort_column:
+        values = df[sort_column].to_numpy()[rows]
+        if not np.issubdtype(values.dtype, np.number):
+            # tekst -> numer w posortowanym słowniku wartości (rosnąco), żeby malejąco sortować jak liczby
+            values = np.unique(values.astype(str), return_inverse=True)[1]
+        # stabilne sortowanie także malejąco: przy remisie zostaje kolejność wejściowa (np. popularność)
+        rows = rows[np.argsort(-values if descending else values, kind="stable")]
+    return rows
+
+
+def _reset_page(key):
+    st.session_state[f"{key}_page"] = 1
+
+
+def data_grid(df, key, column_config=None, query_column=None, sort_columns=None, page_size=PAGE_SIZES[0]):
+    """Tabela stronicowana po stronie serwera: filtr i sortowanie w pandas/NumPy, do przeglądarki idzie
+    tylko bieżąca strona; formatowanie liczb przez column_config zamiast Styler."""
+    sort_columns = list(sort_columns or df.columns)
+    col_query, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+    query = col_query.text_input("🔍 Szukaj", key=f"{key}_query", placeholder=query_column,
+                                 on_change=_reset_page, args=(key,)) if query_column else None
+    sort_column = col_sort.selectbox("Sortuj według", sort_columns, key=f"{key}_sort",
+                                     on_change=_reset_page, args=(key,))
+    descending = col_order.selectbox("Kolejność", ["malejąco", "rosnąco"], key=f"{key}_order",
+                                     on_change=_reset_page, args=(key,)) == "malejąco"
+    size = col_size.selectbox("Wierszy", PAGE_SIZES, index=PAGE_SIZES.index(page_size) if page_size in PAGE_SIZES
+                              else 0, key=f"{key}_size", on_change=_reset_page, args=(key,))
+
+    rows = visible_rows(df, query, query_column, sort_column, descending)
+    pages = max(1, math.ceil(len(rows) / size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+
+    page = st.session_state.get(f"{key}_page", 1)
+    st.dataframe(df.iloc[rows[(page - 1) * size:page * size]], column_config=column_config,
+                 use_container_width=True, hide_index=True)
+
+    col_page, col_info = st.columns([1, 3])
+    col_page.number_input("Strona", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    col_info.caption(f"Strona {page} z {pages} · wierszy: {len(rows):,} z {len(df):,}")
+    return rows
@@ -0,0 +1,114 @@
+import zlib
+
+import numpy as np
+import streamlit as st
+
+from utils.catalog import file_version, shared_catalog, stored_keywords
+
+# Liczba funkcji haszujących = BANDS * ROWS (więcej pasm -> większa czułość, więcej kandydatów)
+BANDS = 42
+ROWS = 3
+PRIME = (1 << 31) - 1
+# Ile filmów z katalogu dokładamy do kandydatów rekomendacji
+NEIGHBOURS = 20
+
+
+# Stały (niezależny od PYTHONHASHSEED) hasz słowa kluczowego
+def keyword_hash(keyword):
+    return zlib.crc32(str(keyword).encode("utf-8"))
+
+
+class MinHashIndex:
+    """Sygnatury MinHash zbiorów słów kluczowych w indeksie LSH (pasma) - przybliżeni sąsiedzi wg Jaccarda.
+
+    Każde pasmo to posortowana tablica haszy wierszy sygnatury, przeszukiwana przez `searchsorted`.
+    """
+
+    def __init__(self, movies, keywords, bands=BANDS, rows=ROWS, seed=1):
+        self.movies = list(movies)
+        self.bands, self.rows = bands, rows
+        rnd = np.random.default_rng(seed)
+        self.a = rnd.integers(1, PRIME, size=bands * rows, dtype=np.uint64)
+        self.b = rnd.integers(0, PRIME, size=bands * rows, dtype=np.uint64)
+        self.mix = rnd.integers(1, 1 << 63, size=rows, dtype=np.uint64) | np.uint64(1)
+
+        # wszystkie słowa kluczowe w jednej tablicy, pogrupowane po filmach
+        hashes, lengths = [], []
+        for m in self.movies:
+            h = {keyword_hash(k) for k in keywords.get(m['id'], ())}
+            hashes.extend(h)
+            lengths.append(len(h))
+        hashes = np.array(hashes, dtype=np.uint64)
+        lengths = np.array(lengths, dtype=np.int64)
+        self.has_keywords = lengths > 0
+
+        self.signatures = np.full((len(self.movies), bands * rows), PRIME, dtype=np.uint32)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[self.has_keywords]
+        if len(hashes):
+            self.signatures[self.has_keywords] = self._min_hashes(hashes, starts)
+
+        # pasma: posortowane hasze + numery filmów (filmy bez słów kluczowych pomijamy)
+        positions = np.flatnonzero(self.has_keywords)
+        band_hashes = self._band_hashes(self.signatures[positions])
+        order = np.argsort(band_hashes, axis=0, kind="stable")
+        self.band_sorted = np.ascontiguousarray(np.take_along_axis(band_hashes, order, axis=0).T)
+        self.band_positions = np.ascontiguousarray(positions[order].T)
+
+    def __len__(self):
+        return len(self.movies)
+
+    def _min_hashes(self, hashes, starts, chunk=1 << 16):
+        # minimum (a*x + b) mod p w każdym filmie, liczone porcjami, żeby ograniczyć pamięć
+        values = np.empty((len(hashes), len(self.a)), dtype=np.uint32)
+        for i in range(0, len(hashes), chunk):
+            x = hashes[i:i + chunk, None]
+            values[i:i + chunk] = (x * self.a + self.b) % PRIME
+        return np.minimum.reduceat(values, starts, axis=0)
+
+    def _band_hashes(self, signatures):
+        # jeden 64-bitowy hasz na pasmo (przepełnienie mnożenia jest zamierzone)
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (bands * self.mix).sum(axis=2, dtype=np.uint64)
+
+    def signature(self, keywords):
+        hashes = np.fromiter({keyword_hash(k) for k in keywords}, dtype=np.uint64)
+        return self._min_hashes(hashes, np.array([0]))[0]
+
+    def query(self, keywords, k=NEIGHBOURS, exclude_id=None):
+        """Zwraca do `k` par (szacowany Jaccard, film) o największym podobieństwie słów kluczowych."""
+        if not keywords or not self.band_sorted.size:
+            return []
+        sig = self.signature(keywords)
+        keys = self._band_hashes(sig[None, :])[0]
+
+        found = []
+        for band, key in enumerate(keys):
+            column = self.band_sorted[band]
+            lo, hi = np.searchsorted(column, key, "left"), np.searchsorted(column, key, "right")
+            if hi > lo:
+                found.append(self.band_positions[band, lo:hi])
+        if not found:
+            return []
+
+        rows = np.unique(np.concatenate(found))
+        similarity = (self.signatures[rows] == sig).mean(axis=1)
+        order = np.argsort(-similarity, kind="stable")
+        result = []
+        for j in order:
+            movie = self.movies[rows[j]]
+            if movie['id'] != exclude_id:
+                result.append((float(similarity[j]), movie))
+            if len(result) >= k:
+                break
+        return result
+
+
+# Indeks nad lokalnym katalogiem (jeden na proces i wersję katalogu)
+def load_minhash_index():
+    return _load_minhash_index(*file_version())
+
+
+@st.cache_resource(max_entries=1)
+def _load_minhash_index(path, version):
+    catalog = shared_catalog(path)
+    return MinHashIndex(catalog, {m['id']: stored_keywords(m) for m in catalog})
@@ -0,0 +1,166 @@
+import argparse
+import math
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import svds
+import streamlit as st
+
+from utils.catalog import DATA_DIR, file_version, load_catalog, shared_catalog_by_id
+from utils.title_index import fold
+
+INDEX_PATH = DATA_DIR / "overview_index.npz"
+
+# Wymiar wektorów po redukcji SVD
+DIMENSIONS = 128
+# Słowo musi wystąpić w co najmniej MIN_DF opisach; słownik ograniczony do MAX_FEATURES słów
+MIN_DF = 2
+MAX_FEATURES = 50_000
+# Ile list odwróconych (IVF) przeszukujemy przy zapytaniu
+N_PROBE = 8
+KMEANS_ITERATIONS = 10
+# Ile filmów o podobnym opisie dokładamy do rekomendacji
+NEIGHBOURS = 20
+
+# Najczęstsze słowa bez znaczenia (po normalizacji fold)
+STOPWORDS = {
+    "the", "and", "for", "with", "his", "her", "their", "from", "that", "this", "who", "when", "into",
+    "after", "but", "are", "has", "have", "was", "they", "them", "she", "him", "its", "one", "all",
+    "oraz", "jest", "jego", "jej", "ich", "gdy", "kiedy", "ktory", "ktora", "ktore", "aby", "ale",
+    "sie", "tym", "tak", "jak", "dla", "przez", "przed", "jako", "nie", "czy", "juz", "tego", "jednak",
+}
+
+
+# Podział opisu na słowa (bez polskich znaków, bez krótkich i pustych słów)
+def tokenize(text):
+    return [t for t in fold(text).split() if len(t) > 2 and t not in STOPWORDS and not t.isdigit()]
+
+
+# Macierz TF-IDF (wiersze znormalizowane) dla listy tekstów
+def tfidf_matrix(texts):
+    docs = [Counter(tokenize(t)) for t in texts]
+    df = Counter(word for doc in docs for word in doc)
+    words = [w for w, n in df.most_common(MAX_FEATURES) if n >= MIN_DF]
+    vocab = {w: i for i, w in enumerate(words)}
+    idf = np.array([math.log((1 + len(docs)) / (1 + df[w])) + 1 for w in words], dtype=np.float32)
+
+    indptr, indices, values = [0], [], []
+    for doc in docs:
+        for word, tf in doc.items():
+            col = vocab.get(word)
+            if col is not None:
+                indices.append(col)
+                values.append(1 + math.log(tf))  # tf logarytmiczne
+        indptr.append(len(indices))
+    matrix = sp.csr_matrix((np.array(values, dtype=np.float32), indices, indptr), shape=(len(docs), len(vocab)))
+    matrix = matrix @ sp.diags(idf)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    return sp.diags(1 / np.maximum(norms, 1e-12)) @ matrix
+
+
+# Normalizacja wierszy do długości 1 (zerowe wiersze zostają zerowe)
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class OverviewIndex:
+    """Wektory opisów (TF-IDF + SVD) w indeksie IVF: centroidy k-means i listy filmów najbliższych każdemu."""
+
+    def __init__(self, ids, vectors, centroids, list_offsets, list_rows):
+        self.ids = ids
+        self.vectors = vectors
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_rows = list_rows
+        self.positions = {int(movie_id): i for i, movie_id in enumerate(ids)}
+        self.movies = {}  # id -> rekord z katalogu (uzupełniane przy wczytaniu)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, movies, dimensions=DIMENSIONS, seed=0):
+        texts = [f"{m.get('overview') or ''} {m.get('overview_original') or ''}" for m in movies]
+        ids = np.array([m['id'] for m in movies], dtype=np.int64)
+        matrix = tfidf_matrix(texts)
+        k = min(dimensions, min(matrix.shape) - 1)
+        if k < 1:
+            vectors = np.zeros((len(movies), 1), dtype=np.float32)
+        else:
+            u, s, _ = svds(matrix, k=k, random_state=seed)
+            vectors = normalize_rows(u * s)
+
+        # k-means sferyczny na wektorach jednostkowych: sqrt(n) list
+        rnd = np.random.default_rng(seed)
+        n_lists = max(1, int(math.sqrt(len(movies))))
+        centroids = vectors[rnd.choice(len(vectors), size=n_lists, replace=False)] if len(vectors) else vectors
+        for _ in range(KMEANS_ITERATIONS):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        assign = np.argmax(vectors @ centroids.T, axis=1) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+        list_rows = np.argsort(assign, kind="stable").astype(np.int64)
+        list_offsets = np.searchsorted(assign[list_rows], np.arange(len(centroids) + 1)).astype(np.int64)
+        return cls(ids, vectors, centroids, list_offsets, list_rows)
+
+    def save(self, path=INDEX_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, ids=self.ids, vectors=self.vectors, centroids=self.centroids,
+                 list_offsets=self.list_offsets, list_rows=self.list_rows)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        data = np.load(path)
+        return cls(data["ids"], data["vectors"], data["centroids"], data["list_offsets"], data["list_rows"])
+
+    def similar(self, movie_id, k=NEIGHBOURS, n_probe=N_PROBE):
+        """Zwraca do `k` par (podobieństwo cosinusowe, id filmu) o najbardziej podobnym opisie."""
+        row = self.positions.get(int(movie_id))
+        if row is None or not self.vectors[row].any():
+            return []
+        query = self.vectors[row]
+        lists = np.argsort(-(self.centroids @ query))[:n_probe]
+        rows = np.concatenate([self.list_rows[self.list_offsets[c]:self.list_offsets[c + 1]] for c in lists])
+        rows = rows[rows != row]
+        if not len(rows):
+            return []
+        scores = self.vectors[rows] @ query
+        top = np.argpartition(-scores, min(k, len(rows)) - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), int(self.ids[rows[i]])) for i in top if scores[i] > 0]
+
+    def similar_movies(self, movie_id, k=NEIGHBOURS):
+        """Jak `similar`, ale z rekordami filmów z katalogu."""
+        return [(score, self.movies[i]) for score, i in self.similar(movie_id, k) if i in self.movies]
+
+
+# Indeks wczytywany raz na proces i wersję pliku indeksu oraz katalogu (None, jeśli nie został jeszcze zbudowany)
+def load_overview_index():
+    return _load_overview_index(file_version(INDEX_PATH), file_version())
+
+
+@st.cache_resource(max_entries=1)
+def _load_overview_index(index_version, catalog_version):
+    if not INDEX_PATH.exists():
+        return None
+    index = OverviewIndex.load(INDEX_PATH)
+    index.movies = shared_catalog_by_id(catalog_version[0])
+    return index
+
+
+# Budowa indeksu z linii poleceń: python -m utils.overview_index
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budowa indeksu podobieństwa opisów filmów")
+    parser.add_argument("--dimensions", type=int, default=DIMENSIONS)
+    args = parser.parse_args()
+
+    catalog = load_catalog()
+    index = OverviewIndex.build(catalog, dimensions=args.dimensions)
+    index.save(INDEX_PATH)
+    print(f"Zapisano indeks opisów ({len(index)} filmów, {index.vectors.shape[1]} wymiarów) do {INDEX_PATH}")
@@ -0,0 +1,136 @@
+import numpy as np
+import scipy.sparse as sp
+import streamlit as st
+
+from utils.catalog import file_version, shared_catalog
+from utils.features import csr_arrays, current_version, open_bundle
+
+# Waga krawędzi film - osoba w zależności od funkcji
+ROLE_WEIGHTS = {"director": 3.0, "writer": 2.0, "composer": 1.0, "cast": 1.5}
+ROLE_LABELS = {"director": "Reżyseria", "writer": "Scenariusz", "composer": "Muzyka", "cast": "Obsada"}
+# Personalizowany PageRank: prawdopodobieństwo kontynuacji spaceru i liczba iteracji
+DAMPING = 0.5
+ITERATIONS = 4
+NEIGHBOURS = 10
+
+
+class PersonGraph:
+    """Graf dwudzielny film - osoba (macierz rzadka) z rekomendacjami przez personalizowany PageRank."""
+
+    def __init__(self, movies):
+        self.movies = list(movies)
+        person_index = {}
+        rows, cols, weights = [], [], []
+        for i, m in enumerate(self.movies):
+            for p in m.get("people", []):
+                j = person_index.setdefault(p["id"], len(person_index))
+                rows.append(i)
+                cols.append(j)
+                weights.append(ROLE_WEIGHTS.get(p["role"], 1.0))
+
+        # duplikaty (ta sama osoba w kilku funkcjach) są sumowane przy konwersji do CSR
+        adjacency = sp.coo_matrix((weights, (rows, cols)),
+                                  shape=(len(self.movies), len(person_index)), dtype=np.float32).tocsr()
+        # macierze przejść film -> osoby i osoba -> filmy, zapisane od razu jako transpozycje w CSR
+        # (mnożenie przez wektor rozkładu bez konwersji przy każdym kroku)
+        self.person_from_movie = self._row_normalize(adjacency).T.tocsr()
+        self.movie_from_person = self._row_normalize(adjacency.T.tocsr()).T.tocsr()
+        self.ids = np.array([m["id"] for m in self.movies], dtype=np.int64)
+        self.person_ids = np.fromiter(person_index, dtype=np.int64, count=len(person_index))
+        self.person_order = np.argsort(self.person_ids, kind="stable")
+
+    @classmethod
+    def from_bundle(cls, bundle, movies=None):
+        """Graf na macierzach z paczki cech (mmap) - bez budowania macierzy w procesie.
+
+        Bez `movies` rekordy są czytane z pliku katalogu na żądanie (paczka musi go opisywać, bundle.describes()).
+        """
+        graph = cls.__new__(cls)
+        graph.movies = bundle.records() if movies is None else list(movies)
+        graph.ids = bundle["ids"]
+        graph.person_ids = bundle["person_ids"]
+        graph.person_order = bundle["person_order"]
+        graph.movie_from_person = bundle.csr("movie_from_person", len(graph.person_ids))
+        # person_from_movie ma wiersze = osoby, więc składamy ją bez pomocy bundle.csr
+        graph.person_from_movie = sp.csr_matrix(
+            (bundle["person_from_movie_data"], bundle["person_from_movie_indices"],
+             bundle["person_from_movie_indptr"]), shape=(len(graph.person_ids), len(graph.ids)), copy=False)
+        return graph
+
+    def arrays(self):
+        """Tablice do zapisu w paczce cech (utils.features)."""
+        return {**csr_arrays("person_from_movie", self.person_from_movie),
+                **csr_arrays("movie_from_person", self.movie_from_person),
+                "person_ids": self.person_ids, "person_order": self.person_order}
+
+    def _person_column(self, person_id):
+        # kolumna osoby w macierzach (wyszukiwanie binarne w posortowanych id)
+        k = np.searchsorted(self.person_ids, person_id, sorter=self.person_order)
+        if k < len(self.person_order) and self.person_ids[self.person_order[k]] == person_id:
+            return int(self.person_order[k])
+        return None
+
+    @staticmethod
+    def _row_normalize(matrix):
+        sums = np.asarray(matrix.sum(axis=1)).ravel()
+        return (sp.diags((1 / np.maximum(sums, 1e-12)).astype(np.float32)) @ matrix).tocsr()
+
+    def __len__(self):
+        return len(self.movies)
+
+    def scores(self, people):
+        """Personalizowany PageRank z restartem w osobach filmu-wzorca; zwraca wynik każdego filmu."""
+        restart = np.zeros(len(self.person_ids), dtype=np.float32)
+        for p in people:
+            j = self._person_column(p["id"])
+            if j is not None:
+                restart[j] += ROLE_WEIGHTS.get(p["role"], 1.0)
+        if not restart.any():
+            return None
+        restart /= restart.sum()
+
+        # spacer osoba -> film -> osoba, po każdym kroku powrót do osób wzorca z prawd. 1 - DAMPING
+        person = restart
+        for _ in range(ITERATIONS):
+            movie = self.movie_from_person @ person
+            person = (1 - DAMPING) * restart + DAMPING * (self.person_from_movie @ movie)
+        return self.movie_from_person @ person
+
+    def recommend(self, movie_id, people, k=NEIGHBOURS):
+        """Zwraca do `k` trójek (wynik, film, wspólni twórcy [(funkcja, nazwisko)]) dla filmu-wzorca."""
+        scores = self.scores(people)
+        if scores is None:
+            return []
+        scores[self.ids == int(movie_id)] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if not len(candidates):
+            return []
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        top = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        seed_people = {p["id"] for p in people}
+        results = []
+        for i in top:
+            roles = {}  # (id, nazwisko) -> funkcje, w kolejności z rekordu filmu
+            for p in self.movies[i].get("people", []):
+                if p["id"] in seed_people:
+                    roles.setdefault((p["id"], p["name"]), set()).add(p["role"])
+            shared = [(role, name) for (_, name), person_roles in roles.items() for role in sorted(person_roles)]
+            results.append((float(scores[i]), self.movies[i], shared))
+        return results
+
+
+# Graf nad lokalnym katalogiem - z paczki cech, jeśli opisuje obecny plik katalogu (wtedy bez wczytywania
+# katalogu), inaczej budowany z katalogu; jeden na proces, wersję paczki i wersję katalogu
+def load_person_graph():
+    return _load_person_graph(current_version(), file_version())
+
+
+@st.cache_resource(max_entries=2)
+def _load_person_graph(version, catalog_version):
+    if version is not None:
+        bundle = open_bundle(version)
+        if bundle.describes():
+            return PersonGraph.from_bundle(bundle)
+    return PersonGraph(shared_catalog())
@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import streamlit as st
+
+from utils.catalog import CATALOG_PATH, DATA_DIR, file_version, load_catalog, shared_catalog_by_id, stored_keywords
+from utils.features import FEATURES_DIR, FeatureBundle, current_version
+from utils.sparse_scoring import BATCH_SIZE, SparseScorer, load_sparse_scorer
+
+TABLE_PATH = DATA_DIR / "similar_movies.npz"
+
+# Ile rekomendacji zapisujemy dla każdego filmu
+TOP_K = 51
+# Liczba filmów-wzorców w jednym zadaniu dla procesu roboczego
+SHARD_SIZE = 1024
+
+# Macierze katalogu w procesie roboczym (budowane raz na proces, przy fork dziedziczone z procesu głównego)
+_scorer = None
+
+
+# Odcisk danych wejściowych filmu - zmiana gatunków lub słów kluczowych wymaga ponownego liczenia
+def fingerprint(movie, keywords):
+    genres = sorted(g['name'] for g in movie.get('genres', []))
+    return zlib.crc32(json.dumps([genres, sorted(set(keywords))]).encode("utf-8"))
+
+
+# Wspólne cechy listy filmu o numerze `row`: liczby cech na pozycję i numery cech (fragment tablicy CSR)
+def _row_block(offsets, terms, row, k):
+    block = offsets[row * k:(row + 1) * k + 1]
+    return np.diff(block), terms[block[0]:block[-1]]
+
+
+# Złożenie bloków (liczby cech, numery cech) w tablice przesunięć i wartości jak w macierzy CSR
+def _offsets(counts, terms):
+    offsets = np.zeros(sum(len(c) for c in counts) + 1, dtype=np.int64)
+    if counts:
+        offsets[1:] = np.cumsum(np.concatenate(counts))
+    return offsets, np.concatenate(terms).astype(np.int32) if terms else np.zeros(0, dtype=np.int32)
+
+
+# Wspólne cechy filmu `seed` z każdym z filmów `top` (jedna macierz: wiersze `top` z kolumnami wzorca)
+def _shared(matrix, seed, top, k):
+    seed_mask = np.zeros(matrix.shape[1], dtype=bool)
+    seed_mask[matrix.indices[matrix.indptr[seed]:matrix.indptr[seed + 1]]] = True
+    rows = matrix[top]
+    keep = seed_mask[rows.indices]
+    kept = np.concatenate(([0], np.cumsum(keep)))
+    counts = np.zeros(k, dtype=np.int64)  # puste miejsca (mniej niż k kandydatów) mają 0 cech
+    counts[:len(top)] = np.diff(kept[rows.indptr])
+    return counts, rows.indices[keep]
+
+
+# Scorer dla katalogu - na macierzach z paczki cech (mmap, wspólne dla wszystkich procesów), jeśli pasuje
+def _catalog_scorer(catalog_path):
+    catalog = load_catalog(catalog_path)
+    version = current_version()
+    if version is not None:
+        bundle = FeatureBundle(FEATURES_DIR / version)
+        if bundle.matches(catalog):
+            return SparseScorer.from_bundle(bundle, catalog)
+    return SparseScorer(catalog, {m['id']: stored_keywords(m) for m in catalog})
+
+
+def _init_worker(catalog_path):
+    global _scorer
+    if _scorer is None:
+        _scorer = _catalog_scorer(catalog_path)
+
+
+def _score_shard(rows, k):
+    """Top-k dla filmów katalogu o numerach `rows`: id sąsiadów, wyniki i wspólne cechy (numery w słownikach)."""
+    scorer = _scorer
+    neighbours = np.full((len(rows), k), -1, dtype=np.int64)
+    scores = np.full((len(rows), k), -1, dtype=np.int16)
+    genre_counts, genre_terms, keyword_counts, keyword_terms = [], [], [], []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        matrix = scorer.score_matrix([(scorer.movies[i], scorer.movie_keywords(i)) for i in batch])
+        for j, seed in enumerate(batch):
+            column = matrix[:, j]
+            top = scorer.top_k(column, k)
+            neighbours[start + j, :len(top)] = scorer.ids[top]
+            scores[start + j, :len(top)] = column[top]
+            counts, terms = _shared(scorer.genres, seed, top, k)
+            genre_counts.append(counts)
+            genre_terms.append(terms)
+            counts, terms = _shared(scorer.keywords, seed, top, k)
+            keyword_counts.append(counts)
+            keyword_terms.append(terms)
+    return neighbours, scores, _offsets(genre_counts, genre_terms), _offsets(keyword_counts, keyword_terms)
+
+
+class SimilarTable:
+    """Tabela top-K rekomendacji dla każdego filmu z katalogu: id -> K id sąsiadów, wyniki, wspólne cechy.
+
+    Wspólne gatunki i słowa kluczowe są zapisane jak w macierzy CSR (przesunięcia + numery w słownikach),
+    jeden wpis na parę (film, pozycja na liście).
+    """
+
+    def __init__(self, ids, fingerprints, neighbours, scores, genre_offsets, genre_terms,
+                 keyword_offsets, keyword_terms, genre_names, keyword_names):
+        self.ids = ids
+        self.fingerprints = fingerprints
+        self.neighbours = neighbours
+        self.scores = scores
+        self.genre_offsets, self.genre_terms = genre_offsets, genre_terms
+        self.keyword_offsets, self.keyword_terms = keyword_offsets, keyword_terms
+        self.genre_names = genre_names
+        self.keyword_names = keyword_names
+        self.rows = {int(movie_id): i for i, movie_id in enumerate(ids)}
+        self.movies = {}  # id -> rekord z katalogu (uzupełniane przy wczytaniu)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def k(self):
+        return self.neighbours.shape[1]
+
+    def save(self, path=TABLE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp, ids=self.ids, fingerprints=self.fingerprints, neighbours=self.neighbours,
+                 scores=self.scores, genre_offsets=self.genre_offsets, genre_terms=self.genre_terms,
+                 keyword_offsets=self.keyword_offsets, keyword_terms=self.keyword_terms,
+                 genre_names=self.genre_names.astype(str), keyword_names=self.keyword_names.astype(str))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=TABLE_PATH):
+        data = np.load(path)
+        return cls(data["ids"], data["fingerprints"], data["neighbours"], data["scores"],
+                   data["genre_offsets"], data["genre_terms"], data["keyword_offsets"], data["keyword_terms"],
+                   data["genre_names"].astype(object), data["keyword_names"].astype(object))
+
+    def _terms(self, offsets, terms, names, entry):
+        return set(names[terms[offsets[entry]:offsets[entry + 1]]])
+
+    def get(self, movie_id, top_n=TOP_K):
+        """Lista (wynik, film, wspólne gatunki, wspólne słowa kluczowe) jak w custom_recommendations
+        albo None, jeśli filmu nie ma w tabeli."""
+        row = self.rows.get(int(movie_id))
+        if row is None:
+            return None
+        results = []
+        for j in range(min(top_n, self.k)):
+            neighbour = int(self.neighbours[row, j])
+            if neighbour < 0:
+                break
+            if neighbour not in self.movies:
+                continue
+            entry = row * self.k + j
+            results.append((int(self.scores[row, j]), self.movies[neighbour],
+                            self._terms(self.genre_offsets, self.genre_terms, self.genre_names, entry),
+                            self._terms(self.keyword_offsets, self.keyword_terms, self.keyword_names, entry)))
+        return results
+
+
+# Filmy, których listy mogą się zmienić po zmianie danych wejściowych filmów `changed` (numery w katalogu)
+def _affected_rows(scorer, previous, row_ids, changed, removed_ids):
+    dirty = np.zeros(len(scorer), dtype=bool)
+    dirty[changed] = True
+    stale = set(scorer.ids[changed].tolist()) | removed_ids
+
+    old_rows = np.array([previous.rows.get(int(i), -1) for i in row_ids], dtype=np.int64)
+    dirty |= old_rows < 0
+    known = np.flatnonzero(old_rows >= 0)
+    old_neighbours = previous.neighbours[old_rows[known]]
+    # (a) zmieniony lub usunięty film był na liście
+    if stale:
+        dirty[known[np.isin(old_neighbours, list(stale)).any(axis=1)]] = True
+
+    # (b) zmieniony film może teraz wejść na listę: punkty za wspólne cechy są symetryczne,
+    # więc wynik "film -> zmieniony" to kolumna mnożenia macierzy dla zmienionego filmu jako wzorca.
+    # Porównanie z ostatnim wynikiem na liście (-1, gdy lista niepełna) bez filtra gatunków
+    # obowiązkowych - może wskazać za dużo filmów, nigdy za mało.
+    kth = np.full(len(scorer), -1, dtype=np.int64)
+    kth[known] = previous.scores[old_rows[known], -1]
+    for start in range(0, len(changed), BATCH_SIZE):
+        batch = changed[start:start + BATCH_SIZE]
+        g_seed = scorer.genres[batch].T.toarray()
+        k_seed = scorer.keywords[batch].T.toarray()
+        best = scorer.raw_scores(g_seed, k_seed).max(axis=1)
+        dirty |= best >= kth
+    return np.flatnonzero(dirty), old_rows
+
+
+# Budowa tabeli (przyrostowo, jeśli podano poprzednią) - zwraca (tabela, liczba przeliczonych filmów)
+def build_table(catalog_path=CATALOG_PATH, k=TOP_K, workers=None, previous=None):
+    global _scorer
+    _scorer = scorer = _catalog_scorer(catalog_path)
+    n = len(scorer)
+    fingerprints = np.array([fingerprint(m, scorer.movie_keywords(i)) for i, m in enumerate(scorer.movies)],
+                            dtype=np.int64)
+
+    # przy remisie decyduje kolejność w katalogu - jeśli zmieniła się dla filmów z poprzedniej tabeli,
+    # liczymy wszystko od nowa
+    if previous is not None:
+        kept = set(previous.rows).intersection(scorer.ids.tolist())
+        if [i for i in previous.ids.tolist() if i in kept] != [i for i in scorer.ids.tolist() if i in kept]:
+            previous = None
+
+    if previous is not None and previous.k == k:
+        old_fp = {int(i): int(f) for i, f in zip(previous.ids, previous.fingerprints)}
+        changed = np.flatnonzero([old_fp.get(int(i)) != int(f) for i, f in zip(scorer.ids, fingerprints)])
+        removed = set(old_fp) - set(scorer.ids.tolist())
+        todo, old_rows = _affected_rows(scorer, previous, scorer.ids, changed, removed)
+    else:
+        previous = None
+        todo, old_rows = np.arange(n), None
+
+    neighbours = np.full((n, k), -1, dtype=np.int64)
+    scores = np.full((n, k), -1, dtype=np.int16)
+    genre_blocks, keyword_blocks = [None] * n, [None] * n
+
+    # filmy bez zmian: przepisanie list z poprzedniej tabeli (numery cech przez nazwy do nowych słowników)
+    if previous is not None:
+        genre_map = np.array([scorer.genre_vocab.get(name, -1) for name in previous.genre_names], dtype=np.int32)
+        keyword_map = np.array([scorer.keyword_vocab.get(name, -1) for name in previous.keyword_names],
+                               dtype=np.int32)
+        keep = np.ones(n, dtype=bool)
+        keep[todo] = False
+        keep = np.flatnonzero(keep)
+        neighbours[keep] = previous.neighbours[old_rows[keep]]
+        scores[keep] = previous.scores[old_rows[keep]]
+        for r in keep:
+            counts, terms = _row_block(previous.genre_offsets, previous.genre_terms, old_rows[r], k)
+            genre_blocks[r] = counts, genre_map[terms]
+            counts, terms = _row_block(previous.keyword_offsets, previous.keyword_terms, old_rows[r], k)
+            keyword_blocks[r] = counts, keyword_map[terms]
+
+    # przeliczenie pozostałych filmów w procesach roboczych, porcjami po SHARD_SIZE
+    workers = workers or os.cpu_count() or 1
+    shards = [todo[i:i + SHARD_SIZE] for i in range(0, len(todo), SHARD_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(catalog_path,)) as pool:
+        for rows, (nb, sc, (g_off, g_terms), (k_off, k_terms)) in zip(
+                shards, pool.map(_score_shard, shards, [k] * len(shards))):
+            neighbours[rows] = nb
+            scores[rows] = sc
+            for j, r in enumerate(rows):
+                genre_blocks[r] = _row_block(g_off, g_terms, j, k)
+                keyword_blocks[r] = _row_block(k_off, k_terms, j, k)
+
+    genre_offsets, genre_terms = _offsets(*zip(*genre_blocks)) if n else _offsets([], [])
+    keyword_offsets, keyword_terms = _offsets(*zip(*keyword_blocks)) if n else _offsets([], [])
+    table = SimilarTable(scorer.ids, fingerprints, neighbours, scores, genre_offsets, genre_terms,
+                         keyword_offsets, keyword_terms, np.array(list(scorer.genre_names), dtype=object),
+                         np.array(list(scorer.keyword_names), dtype=object))
+    return table, len(todo)
+
+
+# Tabela wczytywana raz na proces i wersję pliku tabeli oraz katalogu (None, jeśli nie została jeszcze zbudowana)
+def load_similar_table():
+    return _load_similar_table(file_version(TABLE_PATH), file_version())
+
+
+@st.cache_resource(max_entries=1)
+def _load_similar_table(table_version, catalog_version):
+    if not TABLE_PATH.exists():
+        return None
+    table = SimilarTable.load(TABLE_PATH)
+    table.movies = shared_catalog_by_id(catalog_version[0])
+    return table
+
+
+# Rekomendacje dla filmu z lokalnego katalogu: z tabeli top-K, a bez niej (lub dla filmu spoza tabeli)
+# z macierzy rzadkich całego katalogu; None, jeśli filmu nie ma w katalogu
+def catalog_recommendations(movie_id, top_n=TOP_K):
+    table = load_similar_table()
+    if table is not None:
+        recommendations = table.get(movie_id, top_n)
+        if recommendations is not None:
+            return recommendations
+    scorer = load_sparse_scorer()
+    rows = np.flatnonzero(scorer.ids == int(movie_id))
+    if not len(rows):
+        return None
+    # wzorzec z rekordu katalogu (gatunki i słowa kluczowe jak przy budowie tabeli)
+    i = int(rows[0])
+    return scorer.recommend(scorer.movies[i], scorer.movie_keywords(i), top_n)
+
+
+# Budowa tabeli z linii poleceń: python -m utils.precompute [--full]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Obliczenie tabeli top-K rekomendacji dla całego katalogu")
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--full", action="store_true", help="przelicz wszystkie filmy, bez poprzedniej tabeli")
+    args = parser.parse_args()
+
+    previous = None if args.full or not TABLE_PATH.exists() else SimilarTable.load(TABLE_PATH)
+    started = time.perf_counter()
+    table, scored = build_table(k=args.k, workers=args.workers, previous=previous)
+    elapsed = time.perf_counter() - started
+    table.save(TABLE_PATH)
+
+    rate = scored / elapsed if elapsed else 0.0
+    print(f"Przeliczono {scored} z {len(table)} filmów w {elapsed:.1f} s "
+          f"({rate:.0f} filmów/s, {rate / args.workers:.0f} filmów/s na rdzeń, {args.workers} procesów)")
+    print(f"Zapisano tabelę rekomendacji do {TABLE_PATH}")
@@ -0,0 +1,116 @@
+from collections import Counter
+
+import pandas as pd
+import requests
+import streamlit as st
+
+from utils.candidates import attach_keywords, candidate_tasks, gather_candidates
+from utils.catalog import API_KEY, stored_keywords
+from utils.minhash import load_minhash_index
+from utils.scoring import KeywordIndex, add_overview_bonus, expand_recommendations, recommendation_key
+
+# Rekomendacje dla filmu-wzorca wspólne dla stron filmu i rekomendacji: pula kandydatów, punktacja
+# i dane TMDB, z których korzystają (pamięć podręczna wspólna dla obu stron)
+
+
+# Funkcja pobierająca szczegóły filmu
+@st.cache_data(ttl=3600)
+def get_movie_details(movie_id):
+    r = requests.get(
+        f"https://api.themoviedb.org/3/movie/{movie_id}",
+        params={"api_key": API_KEY, "language": "pl-PL"}
+    )
+    return r.json()
+
+# Funkcja znajdująca słowa kluczowe dla filmu
+@st.cache_data(ttl=3600)
+def get_movie_keywords(movie_id):
+    r = requests.get(
+        f"https://api.themoviedb.org/3/movie/{movie_id}/keywords",
+        params={"api_key": API_KEY}
+    )
+    return r.json().get("keywords", [])
+
+# Funkcja pobierająca ID gatunków (nazwa -> id)
+@st.cache_data(ttl=3600)
+def get_genre_ids():
+    r = requests.get(
+        "https://api.themoviedb.org/3/genre/movie/list",
+        params={"api_key": API_KEY, "language": "pl-PL"}
+    )
+    genres = r.json().get("genres", [])
+    return {g['name']: g['id'] for g in genres}
+
+# Ścieżka plakatu rekomendacji (rekordy katalogu zbudowanego przed dodaniem pola - ze szczegółów filmu)
+def poster_path(rec):
+    if 'poster_path' in rec:
+        return rec['poster_path']
+    return get_movie_details(rec['id']).get('poster_path')
+
+# Pula kandydatów z kilku źródeł TMDB pobieranych równolegle (utils/candidates.py);
+# krótszy czas życia, bo wynik może być niepełny, gdy któreś źródło nie zdążyło
+@st.cache_data(ttl=600)
+def get_candidate_pool(movie_id, genre_ids, keyword_ids, language=None, n=51):
+    genre_names = {genre_id: name for name, genre_id in get_genre_ids().items()}
+    tasks = candidate_tasks(movie_id, genre_ids, keyword_ids, language, n)
+    candidates, origins, metrics = gather_candidates(movie_id, tasks, genre_names, n)
+    attach_keywords(candidates)
+    return candidates, origins, metrics
+
+# Słowa kluczowe kandydata: filmy z lokalnego katalogu mają je zapisane, dla pozostałych pytamy TMDB
+def candidate_keywords(m):
+    return stored_keywords(m) or [k['name'] for k in get_movie_keywords(m['id'])]
+
+# Kandydaci dla filmu-wzorca: pula TMDB, filmy z katalogu o podobnych słowach kluczowych (MinHash LSH)
+# i - z indeksem opisów - filmy o podobnym opisie fabuły.
+# Zwraca (kandydaci, źródło kandydatów z TMDB, metryki źródeł, podobieństwo opisów albo None)
+def recommendation_candidates(movie, genre_ids, keywords, n=51, overview_index=None):
+    language_code = movie.get('spoken_languages', [{}])[0].get('iso_639_1')
+    candidate_movies, origins, metrics = get_candidate_pool(
+        movie['id'], tuple(genre_ids), tuple(k['id'] for k in keywords), language_code, n=n)
+
+    seen = {m['id'] for m in candidate_movies}
+    candidate_movies = candidate_movies + [
+        m for _, m in load_minhash_index().query([k['name'] for k in keywords], exclude_id=movie['id'])
+        if m['id'] not in seen
+    ]
+
+    overview_scores = None
+    if overview_index is not None:
+        similar = overview_index.similar_movies(movie['id'])
+        overview_scores = {m['id']: sim for sim, m in similar}
+        seen = {m['id'] for m in candidate_movies}
+        candidate_movies = candidate_movies + [m for _, m in similar if m['id'] not in seen]
+    return candidate_movies, origins, metrics, overview_scores
+
+# Punktacja kandydatów - w pamięci podręcznej tylko pary (wynik, id) pod krótkim kluczem;
+# argumenty z "_" nie są haszowane przez Streamlit (rekordy filmów opisuje już klucz)
+@st.cache_data(ttl=3600)
+def ranked_recommendations(key, _movie, _candidate_movies, top_n=51, _overview_scores=None):
+    movie_keywords = [k['name'] for k in get_movie_keywords(_movie['id'])]
+
+    # Indeks słowo kluczowe -> kandydaci: punkty tylko dla filmów ze wspólnymi słowami,
+    # gatunki porównywane maskami bitowymi (wagi i gatunki obowiązkowe w utils/scoring.py)
+    index = KeywordIndex(_candidate_movies, {m['id']: candidate_keywords(m) for m in _candidate_movies})
+    if not _overview_scores:
+        recommendations = index.recommend(_movie, movie_keywords, top_n)
+    else:
+        # Dodatkowy sygnał: podobieństwo opisów fabuły (indeks TF-IDF + SVD)
+        recommendations = index.recommend(_movie, movie_keywords, len(_candidate_movies))
+        recommendations = add_overview_bonus(recommendations, _overview_scores, top_n)
+    return [(score, m['id']) for score, m, _, _ in recommendations]
+
+# Funkcja do tworzenia rekomendacji
+def custom_recommendations(movie, candidate_movies, top_n=51, overview_scores=None):
+    key = recommendation_key(movie['id'], [m['id'] for m in candidate_movies], "pl-PL", bool(overview_scores))
+    ranked = ranked_recommendations(key, movie, candidate_movies, top_n, overview_scores)
+    movie_keywords = [k['name'] for k in get_movie_keywords(movie['id'])]
+    return expand_recommendations(ranked, {g['name'] for g in movie.get('genres', [])}, movie_keywords,
+                                  candidate_movies, candidate_keywords)
+
+# Skąd pochodzą kandydaci i ilu z nich trafiło do wyników ("katalog" - MinHash i podobne opisy)
+def show_candidate_sources(recommendations, origins, metrics):
+    with st.expander("Źródła kandydatów"):
+        in_results = Counter(origins.get(rec['id'], "katalog") for _, rec, _, _ in recommendations)
+        st.dataframe(pd.DataFrame([{"źródło": name, **metric, "w wynikach": in_results[name]}
+                                   for name, metric in metrics.items()]).set_index("źródło"))
@@ -0,0 +1,45 @@
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+# Maksymalna liczba zapamiętanych etykiet (wszystkie sesje razem)
+REGISTRY_SIZE = 50_000
+
+
+class LabelRegistry:
+    """Wspólne dla wszystkich sesji, ograniczone (LRU) mapowanie id <-> etykieta wyników wyszukiwania."""
+
+    def __init__(self, maxsize=REGISTRY_SIZE):
+        self.maxsize = maxsize
+        self._labels = OrderedDict()  # (rodzaj, id) -> etykieta
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._labels)
+
+    def register(self, kind, items):
+        """Zapisuje pary (etykieta, id) i zwraca je bez zmian - do użycia w funkcjach wyszukiwania."""
+        with self._lock:
+            for label, item_id in items:
+                key = (kind, int(item_id))
+                self._labels[key] = label
+                self._labels.move_to_end(key)
+            while len(self._labels) > self.maxsize:
+                self._labels.popitem(last=False)
+        return items
+
+    def label(self, kind, item_id):
+        """Zwraca etykietę dla id (lub samo id, jeśli zostało już usunięte z pamięci)."""
+        key = (kind, int(item_id))
+        with self._lock:
+            label = self._labels.get(key)
+            if label is not None:
+                self._labels.move_to_end(key)
+        return label if label is not None else str(item_id)
+
+
+# Jeden rejestr na proces
+@st.cache_resource
+def load_label_registry():
+    return LabelRegistry()
@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.catalog import DATA_DIR, file_version, load_catalog, shared_catalog
+
+AGGREGATES_PATH = DATA_DIR / "roi_aggregates.npz"
+
+# Przedziały histogramów (logarytmiczne): kwoty 100 $ - 10 mld $ co 0,1 dekady,
+# stosunek przychodów do budżetu 0,001 - 1000 co 0,05 dekady; wartości spoza zakresu trafiają do skrajnych
+MONEY_EDGES = np.logspace(2, 10, 81)
+RATIO_EDGES = np.logspace(-3, 3, 121)
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+# Odcisk danych filmu używanych w agregatach - zmiana wymaga przeniesienia filmu między komórkami
+def fingerprint(movie):
+    return zlib.crc32(json.dumps([sorted(genre_ids(movie)), movie.get("release_date") or "",
+                                  movie.get("budget") or 0, movie.get("revenue") or 0]).encode("utf-8"))
+
+
+def genre_ids(movie):
+    return movie.get("genre_ids") or [g["id"] for g in movie.get("genres", [])]
+
+
+def release_year(movie):
+    date = movie.get("release_date") or ""
+    return int(date[:4]) if date[:4].isdigit() else 0
+
+
+def _bins(values, edges):
+    return np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+
+
+# Kwantyle z histogramów (ostatnia oś = przedziały), interpolacja w skali logarytmicznej wewnątrz przedziału
+def histogram_quantiles(hist, edges, q):
+    hist = np.asarray(hist, dtype=np.float64)
+    cum = np.cumsum(hist, axis=-1)
+    total = cum[..., -1:]
+    target = q * total
+    b = np.minimum((cum < target).sum(axis=-1, keepdims=True), hist.shape[-1] - 1)
+    in_bin = np.take_along_axis(hist, b, axis=-1)
+    before = np.take_along_axis(cum, b, axis=-1) - in_bin
+    frac = np.divide(target - before, in_bin, out=np.zeros_like(target), where=in_bin > 0)
+    log_edges = np.log10(edges)
+    value = 10 ** (log_edges[b] + frac * (log_edges[b + 1] - log_edges[b]))
+    return np.where(total > 0, value, np.nan)[..., 0]
+
+
+class RoiAggregates:
+    """Agregaty finansowe katalogu w komórkach (zestaw gatunków, rok premiery).
+
+    Komórka to dokładny zestaw gatunków filmu (maska bitowa) i rok, więc suma komórek dla dowolnego
+    wyboru gatunków i lat liczy każdy film raz. W komórce: liczba filmów, liczba dochodowych, sumy
+    budżetu, przychodów i ROI oraz histogramy (do kwantyli). Filmy bez budżetu lub przychodów
+    nie trafiają do komórek. Zmiana rekordu odejmuje jego poprzedni wkład i dodaje nowy.
+    """
+
+    def __init__(self):
+        self.genre_ids = []      # bit -> id gatunku TMDB
+        self.films = {}          # id filmu -> (odcisk, komórka lub -1, budżet, przychody)
+        self.cell_index = {}     # (maska, rok) -> komórka
+        self.masks = np.zeros(0, dtype=np.int64)
+        self.years = np.zeros(0, dtype=np.int16)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.profitable = np.zeros(0, dtype=np.int64)
+        self.budget_sum = np.zeros(0, dtype=np.float64)
+        self.revenue_sum = np.zeros(0, dtype=np.float64)
+        self.roi_sum = np.zeros(0, dtype=np.float64)
+        self.budget_hist = np.zeros((0, len(MONEY_EDGES) - 1), dtype=np.int64)
+        self.revenue_hist = np.zeros((0, len(MONEY_EDGES) - 1), dtype=np.int64)
+        self.ratio_hist = np.zeros((0, len(RATIO_EDGES) - 1), dtype=np.int64)
+        self._film_arrays = None
+
+    def __len__(self):
+        return int(self.count.sum())
+
+    def genre_mask(self, ids, add=False):
+        mask = 0
+        for g in ids:
+            if g not in self.genre_ids:
+                if not add:
+                    continue
+                self.genre_ids.append(g)
+            mask |= 1 << self.genre_ids.index(g)
+        return mask
+
+    def _cell(self, mask, year):
+        cell = self.cell_index.get((mask, year))
+        if cell is None:
+            cell = self.cell_index[(mask, year)] = len(self.cell_index)
+        return cell
+
+    def _grow(self):
+        # nowe komórki dopisane w _cell: wydłużenie tablic o zera
+        extra = len(self.cell_index) - len(self.count)
+        if extra <= 0:
+            return
+        keys = list(self.cell_index)[len(self.count):]
+        self.masks = np.concatenate([self.masks, np.array([k[0] for k in keys], dtype=np.int64)])
+        self.years = np.concatenate([self.years, np.array([k[1] for k in keys], dtype=np.int16)])
+        for name in ("count", "profitable", "budget_sum", "revenue_sum", "roi_sum"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(extra, dtype=array.dtype)]))
+        for name in ("budget_hist", "revenue_hist", "ratio_hist"):
+            array = getattr(self, name)
+            setattr(self, name, np.vstack([array, np.zeros((extra, array.shape[1]), dtype=array.dtype)]))
+
+    def _apply(self, cells, budgets, revenues, sign):
+        cells = np.asarray(cells, dtype=np.int64)
+        budgets = np.asarray(budgets, dtype=np.float64)
+        revenues = np.asarray(revenues, dtype=np.float64)
+        if not len(cells):
+            return
+        np.add.at(self.count, cells, sign)
+        np.add.at(self.profitable, cells, sign * (revenues > budgets))
+        np.add.at(self.budget_sum, cells, sign * budgets)
+        np.add.at(self.revenue_sum, cells, sign * revenues)
+        np.add.at(self.roi_sum, cells, sign * (revenues - budgets) / budgets)
+        np.add.at(self.budget_hist, (cells, _bins(budgets, MONEY_EDGES)), sign)
+        np.add.at(self.revenue_hist, (cells, _bins(revenues, MONEY_EDGES)), sign)
+        np.add.at(self.ratio_hist, (cells, _bins(revenues / budgets, RATIO_EDGES)), sign)
+
+    def update(self, movies, complete=True):
+        """Wprowadza zmienione i nowe rekordy; przy `complete` filmy spoza listy są usuwane.
+
+        Zwraca liczbę filmów, których wkład się zmienił.
+        """
+        old, new = [], []
+        seen, changed = set(), 0
+        for m in movies:
+            seen.add(m["id"])
+            fp = fingerprint(m)
+            previous = self.films.get(m["id"])
+            if previous is not None and previous[0] == fp:
+                continue
+            changed += 1
+            if previous is not None and previous[1] >= 0:
+                old.append(previous[1:])
+            budget, revenue = m.get("budget") or 0, m.get("revenue") or 0
+            cell = -1
+            if budget > 0 and revenue > 0:
+                cell = self._cell(self.genre_mask(genre_ids(m), add=True), release_year(m))
+                new.append((cell, budget, revenue))
+            self.films[m["id"]] = (fp, cell, budget, revenue)
+        if complete:
+            for movie_id in set(self.films) - seen:
+                changed += 1
+                _, cell, budget, revenue = self.films.pop(movie_id)
+                if cell >= 0:
+                    old.append((cell, budget, revenue))
+
+        self._grow()
+        for records, sign in ((old, -1), (new, 1)):
+            if records:
+                self._apply(*zip(*records), sign)
+        if changed:
+            self._film_arrays = None
+        return changed
+
+    def select(self, genres=(), years=None, match="any"):
+        """Maska komórek: filmy z którymkolwiek (`match="any"`) lub wszystkimi (`"all"`) gatunkami
+        z `genres` i rokiem premiery z przedziału `years` (włącznie)."""
+        selected = self.count > 0
+        if genres:
+            query = self.genre_mask(genres)
+            if match == "all":
+                # gatunek, którego nie ma żaden film z danymi - nic nie pasuje
+                if any(g not in self.genre_ids for g in genres):
+                    selected[:] = False
+                selected &= (self.masks & query) == query
+            else:
+                selected &= (self.masks & query) != 0
+        if years is not None:
+            selected &= (self.years >= years[0]) & (self.years <= years[1])
+        return selected
+
+    def summary(self, genres=(), years=None, match="any"):
+        """Liczby, średnie i kwantyle (QUANTILES) dla wybranych gatunków i lat."""
+        cells = np.flatnonzero(self.select(genres, years, match))
+        films = int(self.count[cells].sum())
+        mean = lambda total: total / films if films else np.nan
+
+        def quantiles(hist, edges):
+            total = hist[cells].sum(axis=0)
+            return [float(histogram_quantiles(total, edges, q)) for q in QUANTILES]
+
+        return {
+            "films": films,
+            "profitable": int(self.profitable[cells].sum()),
+            "budget_mean": mean(self.budget_sum[cells].sum()),
+            "revenue_mean": mean(self.revenue_sum[cells].sum()),
+            "roi_mean": mean(self.roi_sum[cells].sum()),
+            "budget_quantiles": quantiles(self.budget_hist, MONEY_EDGES),
+            "revenue_quantiles": quantiles(self.revenue_hist, MONEY_EDGES),
+            "roi_quantiles": [q - 1 for q in quantiles(self.ratio_hist, RATIO_EDGES)],
+        }
+
+    def _table(self, groups, labels, cells, label):
+        # zsumowanie wybranych komórek w grupy (macierz grupa x komórka) i tabela z miarami grup
+        weights = groups[:, cells].astype(np.int64)
+        films = weights @ self.count[cells]
+        share = lambda total: np.divide(total, films, out=np.full(len(films), np.nan), where=films > 0)
+        df = pd.DataFrame({
+            label: labels,
+            "Filmy": films,
+            "Średni budżet": share(weights @ self.budget_sum[cells]),
+            "Średnie przychody": share(weights @ self.revenue_sum[cells]),
+            "Mediana ROI": histogram_quantiles(weights @ self.ratio_hist[cells], RATIO_EDGES, 0.5) - 1,
+            "Dochodowe %": 100 * share(weights @ self.profitable[cells]),
+        })
+        return df[df["Filmy"] > 0].reset_index(drop=True)
+
+    def by_year(self, genres=(), years=None, match="any"):
+        """Miary w kolejnych latach premiery (bez filmów z nieznaną datą)."""
+        cells = np.flatnonzero(self.select(genres, years, match) & (self.years > 0))
+        labels = np.unique(self.years[cells])
+        groups = self.years[None, :] == labels[:, None]
+        return self._table(groups, labels, cells, "Rok")
+
+    def by_genre(self, genre_names, genres=(), years=None, match="any"):
+        """Miary dla każdego gatunku (film z kilkoma gatunkami liczy się w każdym z nich)."""
+        cells = np.flatnonzero(self.select(genres, years, match))
+        # przy "any" tylko wybrane gatunki, inaczej wszystkie gatunki filmów z wyboru
+        shown = [g for g in self.genre_ids if not genres or match == "all" or g in genres]
+        groups = np.array([(self.masks & (1 << self.genre_ids.index(g))) != 0 for g in shown],
+                          dtype=bool).reshape(len(shown), len(self.masks))
+        return self._table(groups, [genre_names.get(g, str(g)) for g in shown], cells, "Gatunek")
+
+    def year_range(self):
+        known = self.years[(self.count > 0) & (self.years > 0)]
+        return (int(known.min()), int(known.max())) if len(known) else None
+
+    def film_ids(self, genres=(), years=None, match="any"):
+        """Id filmów z danymi finansowymi z wybranych komórek (w kolejności dodania do agregatów)."""
+        if self._film_arrays is None:
+            records = [(movie_id, cell) for movie_id, (_, cell, _, _) in self.films.items() if cell >= 0]
+            self._film_arrays = (np.array([r[0] for r in records], dtype=np.int64),
+                                 np.array([r[1] for r in records], dtype=np.int64))
+        ids, cells = self._film_arrays
+        return ids[self.select(genres, years, match)[cells]]
+
+    def save(self, path=AGGREGATES_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        films = np.array([(movie_id, *record) for movie_id, record in self.films.items()],
+                         dtype=np.float64).reshape(-1, 5)
+        np.savez(tmp, genre_ids=np.array(self.genre_ids, dtype=np.int64), films=films,
+                 masks=self.masks, years=self.years, count=self.count, profitable=self.profitable,
+                 budget_sum=self.budget_sum, revenue_sum=self.revenue_sum, roi_sum=self.roi_sum,
+                 budget_hist=self.budget_hist, revenue_hist=self.revenue_hist, ratio_hist=self.ratio_hist)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=AGGREGATES_PATH):
+        data = np.load(path)
+        aggregates = cls()
+        aggregates.genre_ids = data["genre_ids"].tolist()
+        for name in ("masks", "years", "count", "profitable", "budget_sum", "revenue_sum", "roi_sum",
+                     "budget_hist", "revenue_hist", "ratio_hist"):
+            setattr(aggregates, name, data[name])
+        aggregates.cell_index = {(int(m), int(y)): i for i, (m, y) in enumerate(zip(data["masks"], data["years"]))}
+        aggregates.films = {int(movie_id): (int(fp), int(cell), budget, revenue)
+                            for movie_id, fp, cell, budget, revenue in data["films"]}
+        return aggregates
+
+
+# Agregaty katalogu wczytywane raz na proces i wersję katalogu; zmienione rekordy są nanoszone przyrostowo
+def load_roi_aggregates():
+    return _load_roi_aggregates(*file_version())
+
+
+@st.cache_resource(max_entries=1)
+def _load_roi_aggregates(path, version):
+    aggregates = RoiAggregates.load() if AGGREGATES_PATH.exists() else RoiAggregates()
+    if aggregates.update(shared_catalog(path)):
+        aggregates.save()
+    return aggregates
+
+
+# Aktualizacja agregatów z linii poleceń: python -m utils.roi [--full]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agregaty ROI katalogu (zestaw gatunków x rok premiery)")
+    parser.add_argument("--full", action="store_true", help="policz wszystko od nowa, bez poprzednich agregatów")
+    args = parser.parse_args()
+
+    aggregates = RoiAggregates() if args.full or not AGGREGATES_PATH.exists() else RoiAggregates.load()
+    started = time.perf_counter()
+    changed = aggregates.update(load_catalog())
+    aggregates.save()
+    print(f"Zmienione filmy: {changed}, filmy z danymi finansowymi: {len(aggregates)}, "
+          f"komórki: {len(aggregates.cell_index)} ({time.perf_counter() - started:.1f} s)")
+    print(f"Zapisano agregaty do {AGGREGATES_PATH}")
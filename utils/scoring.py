@@ -0,0 +1,214 @@
+import hashlib
+import heapq
+from collections import Counter, defaultdict
+
+# Słownik gatunków obowiązkowych, dla których rekomendacja musi zgadzać się z wyszukiwanym filmem
+MANDATORY_GENRES = {"Animation", "Horror", "Documentary", "Fantasy", "Western",
+                    "Document", "Historical", "Musical", "Sci-Fi", "War"}
+
+# Wagi rekomendacji
+GENRE_WEIGHT = 2            # za każdy wspólny gatunek
+GENRE_BONUS = 3             # gdy wspólne są co najmniej 2 gatunki
+GENRE_BONUS_MIN = 2
+KEYWORD_WEIGHT = 1          # za każde wspólne słowo kluczowe
+KEYWORD_BONUS = 4           # gdy wspólne są co najmniej 3 słowa kluczowe
+KEYWORD_BONUS_MIN = 3
+OVERVIEW_WEIGHT = 5         # maksymalna premia za podobny opis (podobieństwo 0..1)
+
+# Wersja reguł punktacji - podbić przy każdej zmianie wag lub filtrów (unieważnia zapamiętane wyniki)
+SCORING_VERSION = 1
+
+
+# Punkty za wspólne gatunki
+def genre_score(n):
+    return n * GENRE_WEIGHT + (GENRE_BONUS if n >= GENRE_BONUS_MIN else 0)
+
+
+# Punkty za wspólne słowa kluczowe
+def keyword_score(n):
+    return n * KEYWORD_WEIGHT + (KEYWORD_BONUS if n >= KEYWORD_BONUS_MIN else 0)
+
+
+# Premia za podobieństwo opisu (dodatkowy sygnał) i ponowne ułożenie listy rekomendacji
+def add_overview_bonus(recommendations, overview_scores, top_n=51):
+    rescored = [(score + round(OVERVIEW_WEIGHT * overview_scores.get(m['id'], 0), 1), m, genres, keywords)
+                for score, m, genres, keywords in recommendations]
+    rescored.sort(key=lambda x: x[0], reverse=True)
+    return rescored[:top_n]
+
+
+# Krótki klucz wyników rekomendacji: id wzorca, posortowane id kandydatów, wersja reguł, język i dodatki
+def recommendation_key(seed_id, candidate_ids, language, *extra):
+    parts = [str(SCORING_VERSION), language, str(seed_id), ",".join(map(str, sorted(candidate_ids)))]
+    parts.extend(map(str, extra))
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Odtworzenie pełnych wyników z par (wynik, id): rekordy filmów oraz wspólne gatunki i słowa kluczowe
+# (`keywords_of` zwraca słowa kluczowe rekordu kandydata)
+def expand_recommendations(ranked, seed_genres, seed_keywords, candidate_movies, keywords_of):
+    seed_keywords = set(seed_keywords)
+    by_id = {m['id']: m for m in candidate_movies}
+    return [(score, by_id[i], set(seed_genres).intersection(g['name'] for g in by_id[i].get('genres', [])),
+             seed_keywords.intersection(keywords_of(by_id[i])))
+            for score, i in ranked if i in by_id]
+
+
+# Pierwotna pętla z custom_recommendations - wzorzec do porównań z szybszymi wersjami
+def reference_recommendations(movie, movie_keywords, candidate_movies, candidate_keywords, top_n=51):
+    movie_genres = {g['name'] for g in movie.get('genres', [])}
+    movie_keywords = set(movie_keywords)
+    mandatory_in_movie = MANDATORY_GENRES.intersection(movie_genres)
+
+    scored_movies = []
+    for m in candidate_movies:
+        if m['id'] == movie['id']:
+            continue
+        m_genres = {g['name'] for g in m.get('genres', [])}
+
+        # Filtrowanie po gatunkach obowiązkowych
+        if mandatory_in_movie and not mandatory_in_movie.issubset(m_genres):
+            continue
+
+        common_genres = movie_genres.intersection(m_genres)
+        common_keywords = movie_keywords.intersection(candidate_keywords.get(m['id'], ()))
+        score = genre_score(len(common_genres)) + keyword_score(len(common_keywords))
+        scored_movies.append((score, m, common_genres, common_keywords))
+
+    scored_movies.sort(key=lambda x: x[0], reverse=True)
+    return scored_movies[:top_n]
+
+
+class KeywordIndex:
+    """Indeks odwrócony słowo kluczowe -> filmy z gatunkami zapisanymi jako maski bitowe.
+
+    `movies` to słowniki szczegółów filmu (z listą `genres`), `keywords` mapuje id filmu
+    na nazwy jego słów kluczowych.
+    """
+
+    def __init__(self, movies, keywords):
+        self.movies = list(movies)
+        self.genre_bits = {}                # nazwa gatunku -> bit
+        self.masks = []                     # film -> maska gatunków
+        self.keywords = []                  # film -> zbiór słów kluczowych
+        self.postings = defaultdict(list)   # słowo kluczowe -> numery filmów (rosnąco)
+        self.groups = defaultdict(list)     # maska gatunków -> numery filmów (rosnąco)
+        self.id_positions = defaultdict(list)  # id filmu -> numery filmów
+
+        for i, m in enumerate(self.movies):
+            mask = self.genre_mask(g['name'] for g in m.get('genres', []))
+            self.masks.append(mask)
+            self.groups[mask].append(i)
+            self.id_positions[m['id']].append(i)
+            movie_keywords = frozenset(keywords.get(m['id'], ()))
+            self.keywords.append(movie_keywords)
+            for k in movie_keywords:
+                self.postings[k].append(i)
+
+    def __len__(self):
+        return len(self.movies)
+
+    def genre_mask(self, names, add=True):
+        mask = 0
+        for name in names:
+            bit = self.genre_bits.get(name)
+            if bit is None:
+                if not add:
+                    continue
+                bit = self.genre_bits[name] = 1 << len(self.genre_bits)
+            mask |= bit
+        return mask
+
+    def genre_names(self, mask):
+        return {name for name, bit in self.genre_bits.items() if mask & bit}
+
+    def recommend(self, movie, movie_keywords, top_n=51):
+        """Zwraca listę (wynik, film, wspólne gatunki, wspólne słowa kluczowe), jak custom_recommendations."""
+        return self.recommend_blend([(movie, movie_keywords)], top_n)
+
+    def recommend_blend(self, seeds, top_n=51):
+        """Jedna lista rekomendacji dla kilku filmów-wzorców (par (film, słowa kluczowe)).
+
+        Gatunek lub słowo kluczowe liczy się proporcjonalnie do liczby wzorców, które je mają
+        (dla jednego wzorca - zwykła punktacja). Gatunki obowiązkowe muszą być wspólne dla wszystkich wzorców.
+        """
+        n_seeds = len(seeds)
+        if not n_seeds:
+            return []
+        genre_counts = Counter()    # gatunek -> liczba wzorców z tym gatunkiem
+        keyword_counts = Counter()  # słowo kluczowe -> liczba wzorców
+        mandatory_names = None
+        excluded = set()
+        for movie, movie_keywords in seeds:
+            names = {g['name'] for g in movie.get('genres', [])}
+            genre_counts.update(names)
+            keyword_counts.update(set(movie_keywords))
+            required = MANDATORY_GENRES.intersection(names)
+            mandatory_names = required if mandatory_names is None else mandatory_names & required
+            excluded.update(self.id_positions.get(movie['id'], ()))
+        mandatory = self.genre_mask(mandatory_names, add=False)
+        if len(mandatory_names) > bin(mandatory).count("1"):
+            return []  # wymagany gatunek, którego nie ma żaden kandydat
+
+        # przy jednym wzorcu liczby całkowite, przy kilku - średnia po wzorcach
+        def share(n):
+            return n if n_seeds == 1 else n / n_seeds
+
+        # Akumulacja po słowach kluczowych wzorców - dotyka tylko filmów z co najmniej jednym wspólnym słowem;
+        # słowa z tą samą liczbą wzorców zliczane razem
+        by_weight = defaultdict(Counter)
+        for k, w in keyword_counts.items():
+            postings = self.postings.get(k)
+            if postings:
+                by_weight[w].update(postings)
+        counts = Counter()
+        for w, hits in by_weight.items():
+            if w == 1:
+                counts.update(hits)
+            else:
+                for i, n in hits.items():
+                    counts[i] += w * n
+        for i in excluded:
+            counts.pop(i, None)
+
+        # Punkty za gatunki liczone raz dla każdej maski (grupy filmów)
+        bit_counts = [(self.genre_bits[name], n) for name, n in genre_counts.items() if name in self.genre_bits]
+        group_scores = {}
+        for mask in self.groups:
+            if mask & mandatory == mandatory:
+                group_scores[mask] = genre_score(share(sum(n for bit, n in bit_counts if mask & bit)))
+
+        kw_points = {}
+        masks = self.masks
+        scored = []
+        for i, n in counts.items():
+            if masks[i] in group_scores:
+                points = kw_points.get(n)
+                if points is None:
+                    points = kw_points[n] = keyword_score(share(n))
+                scored.append((-(group_scores[masks[i]] + points), i))
+
+        # Filmy bez wspólnych słów: z każdej grupy wystarczy pierwsze `top_n` (kolejność jak na liście kandydatów)
+        threshold = None
+        taken = 0
+        for mask, score in sorted(group_scores.items(), key=lambda x: x[1], reverse=True):
+            if threshold is not None and score < threshold:
+                break
+            n = 0
+            for i in self.groups[mask]:
+                if n >= top_n:
+                    break
+                if i in counts or i in excluded:
+                    continue
+                scored.append((-score, i))
+                n += 1
+            taken += n
+            if taken >= top_n and threshold is None:
+                threshold = score
+
+        # Kolejność jak w oryginalnej pętli (sortowanie stabilne): wynik malejąco, potem pozycja kandydata
+        top = heapq.nsmallest(top_n, scored)
+        seed_genres, seed_keywords = set(genre_counts), set(keyword_counts)
+        return [(-neg, self.movies[i], seed_genres & self.genre_names(masks[i]), seed_keywords & self.keywords[i])
+                for neg, i in top]
+
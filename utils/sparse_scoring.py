@@ -0,0 +1,167 @@
+import numpy as np
+import scipy.sparse as sp
+import streamlit as st
+
+from utils.catalog import file_version, shared_catalog, stored_keywords
+from utils.features import csr_arrays, current_version, open_bundle, string_arrays
+from utils.scoring import (GENRE_BONUS, GENRE_BONUS_MIN, GENRE_WEIGHT, KEYWORD_BONUS,
+                           KEYWORD_BONUS_MIN, KEYWORD_WEIGHT, MANDATORY_GENRES)
+
+# Liczba filmów-wzorców liczonych jednym mnożeniem macierzy (ogranicza pamięć na wyniki)
+BATCH_SIZE = 256
+
+
+# Funkcja budująca macierz rzadką film x cecha (wartości 1) oraz słownik cecha -> kolumna
+def incidence_matrix(rows, vocab=None):
+    vocab = {} if vocab is None else vocab
+    indptr, indices = [0], []
+    for features in rows:
+        cols = {vocab.setdefault(f, len(vocab)) for f in features}
+        indices.extend(sorted(cols))
+        indptr.append(len(indices))
+    data = np.ones(len(indices), dtype=np.int32)
+    matrix = sp.csr_matrix((data, np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+                           shape=(len(indptr) - 1, len(vocab)))
+    return matrix, vocab
+
+
+class SparseScorer:
+    """Wektorowa punktacja rekomendacji na macierzach rzadkich film x gatunek i film x słowo kluczowe.
+
+    Daje te same wyniki (także kolejność przy remisach) co pętla z custom_recommendations.
+    """
+
+    def __init__(self, movies, keywords):
+        self.movies = list(movies)
+        self.ids = np.array([m['id'] for m in self.movies], dtype=np.int64)
+        self.genres, self.genre_vocab = incidence_matrix(
+            [g['name'] for g in m.get('genres', [])] for m in self.movies)
+        self.keywords, self.keyword_vocab = incidence_matrix(
+            keywords.get(m['id'], ()) for m in self.movies)
+        self.genre_names = np.array(list(self.genre_vocab), dtype=object)
+        self.keyword_names = np.array(list(self.keyword_vocab), dtype=object)
+
+    @classmethod
+    def from_bundle(cls, bundle, movies=None):
+        """Scorer na tablicach z paczki cech (mmap) - bez budowania macierzy, słowników i list nazw w procesie.
+
+        Bez `movies` rekordy są czytane z pliku katalogu na żądanie (paczka musi go opisywać, bundle.describes()).
+        """
+        scorer = cls.__new__(cls)
+        scorer.movies = bundle.records() if movies is None else list(movies)
+        scorer.ids = bundle["ids"]
+        # jedna tablica napisów służy jako lista nazw (numer -> nazwa) i słownik (get: nazwa -> numer)
+        scorer.genre_names = scorer.genre_vocab = bundle.strings("genre_names")
+        scorer.keyword_names = scorer.keyword_vocab = bundle.strings("keyword_names")
+        scorer.genres = bundle.csr("genre", len(scorer.genre_names))
+        scorer.keywords = bundle.csr("keyword", len(scorer.keyword_names))
+        return scorer
+
+    def arrays(self):
+        """Tablice do zapisu w paczce cech (utils.features)."""
+        return {**csr_arrays("genre", self.genres), **csr_arrays("keyword", self.keywords),
+                **string_arrays("genre_names", self.genre_names), **string_arrays("keyword_names", self.keyword_names)}
+
+    def __len__(self):
+        return len(self.movies)
+
+    def _seed_vectors(self, seeds):
+        # wektory wzorców: gatunki, słowa kluczowe i gatunki obowiązkowe (kolumny = wzorce)
+        n = len(seeds)
+        g_seed = np.zeros((len(self.genre_vocab), n), dtype=np.int32)
+        k_seed = np.zeros((len(self.keyword_vocab), n), dtype=np.int32)
+        mandatory = np.zeros((len(self.genre_vocab), n), dtype=np.int32)
+        mandatory_count = np.zeros(n, dtype=np.int32)
+        for j, (movie, movie_keywords) in enumerate(seeds):
+            names = {g['name'] for g in movie.get('genres', [])}
+            # słownik albo tablica napisów z paczki - obie mają get(nazwa)
+            genre_cols = {name: self.genre_vocab.get(name) for name in names}
+            for col in genre_cols.values():
+                if col is not None:
+                    g_seed[col, j] = 1
+            for k in set(movie_keywords):
+                col = self.keyword_vocab.get(k)
+                if col is not None:
+                    k_seed[col, j] = 1
+            required = MANDATORY_GENRES.intersection(names)
+            mandatory_count[j] = len(required)
+            for name in required:
+                if genre_cols[name] is not None:
+                    mandatory[genre_cols[name], j] = 1
+        return g_seed, k_seed, mandatory, mandatory_count
+
+    def raw_scores(self, g_seed, k_seed):
+        """Punkty za wspólne gatunki i słowa kluczowe, bez filtrów (symetryczne względem pary filmów)."""
+        common_genres = self.genres @ g_seed
+        common_keywords = self.keywords @ k_seed
+        return (GENRE_WEIGHT * common_genres + GENRE_BONUS * (common_genres >= GENRE_BONUS_MIN)
+                + KEYWORD_WEIGHT * common_keywords + KEYWORD_BONUS * (common_keywords >= KEYWORD_BONUS_MIN))
+
+    def score_matrix(self, seeds):
+        """Wyniki dla wszystkich filmów (wiersze) i wzorców (kolumny); odrzucone filmy mają -1."""
+        g_seed, k_seed, mandatory, mandatory_count = self._seed_vectors(seeds)
+        scores = self.raw_scores(g_seed, k_seed)
+
+        # film musi mieć wszystkie gatunki obowiązkowe wzorca i nie może być samym wzorcem
+        rejected = (self.genres @ mandatory) < mandatory_count
+        seed_ids = np.array([movie['id'] for movie, _ in seeds], dtype=np.int64)
+        rejected |= self.ids[:, None] == seed_ids[None, :]
+        scores[rejected] = -1
+        return scores
+
+    def top_k(self, scores, top_n):
+        """Numery filmów z najlepszym wynikiem; remisy według kolejności kandydatów."""
+        n = len(self.movies)
+        # klucz jednoznaczny: wynik, a przy remisie wcześniejsza pozycja wygrywa
+        key = scores.astype(np.int64) * (n + 1) + (n - np.arange(n, dtype=np.int64))
+        valid = int((scores >= 0).sum())
+        k = min(top_n, valid)
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-key, k - 1)[:k] if k < n else np.arange(n)
+        top = top[np.argsort(-key[top])]
+        return top[:k]
+
+    def movie_keywords(self, i):
+        """Słowa kluczowe filmu o numerze `i` (z macierzy)."""
+        return list(self.keyword_names[self.keywords.indices[self.keywords.indptr[i]:self.keywords.indptr[i + 1]]])
+
+    def recommend_many(self, seeds, top_n=51):
+        """Rekomendacje dla listy par (film, słowa kluczowe) - jedna lista wyników na wzorzec."""
+        results = []
+        for start in range(0, len(seeds), BATCH_SIZE):
+            batch = seeds[start:start + BATCH_SIZE]
+            scores = self.score_matrix(batch)
+            for j, (movie, movie_keywords) in enumerate(batch):
+                column = scores[:, j]
+                movie_genres = {g['name'] for g in movie.get('genres', [])}
+                movie_keywords = set(movie_keywords)
+                recs = []
+                for i in self.top_k(column, top_n):
+                    g_row = self.genres.indices[self.genres.indptr[i]:self.genres.indptr[i + 1]]
+                    k_row = self.keywords.indices[self.keywords.indptr[i]:self.keywords.indptr[i + 1]]
+                    recs.append((int(column[i]), self.movies[i],
+                                 movie_genres.intersection(self.genre_names[g_row]),
+                                 movie_keywords.intersection(self.keyword_names[k_row])))
+                results.append(recs)
+        return results
+
+    def recommend(self, movie, movie_keywords, top_n=51):
+        """Rekomendacje dla jednego filmu - ten sam format co custom_recommendations."""
+        return self.recommend_many([(movie, movie_keywords)], top_n)[0]
+
+
+# Macierze nad całym lokalnym katalogiem - z paczki cech, jeśli opisuje obecny plik katalogu (wtedy bez
+# wczytywania katalogu), inaczej budowane z katalogu; jedne na proces, wersję paczki i wersję katalogu
+def load_sparse_scorer():
+    return _load_sparse_scorer(current_version(), file_version())
+
+
+@st.cache_resource(max_entries=2)
+def _load_sparse_scorer(version, catalog_version):
+    if version is not None:
+        bundle = open_bundle(version)
+        if bundle.describes():
+            return SparseScorer.from_bundle(bundle)
+    catalog = shared_catalog()
+    return SparseScorer(catalog, {m['id']: stored_keywords(m) for m in catalog})
@@ -0,0 +1,137 @@
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+import streamlit as st
+
+from utils.catalog import file_version, shared_catalog
+
+# Litery, które nie rozkładają się przez NFKD na literę bazową + znak diakrytyczny
+SPECIAL_FOLDS = str.maketrans({
+    "ł": "l", "Ł": "l", "ø": "o", "Ø": "o", "đ": "d", "Đ": "d",
+    "ß": "ss", "æ": "ae", "Æ": "ae", "œ": "oe", "Œ": "oe", "ı": "i"
+})
+
+NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Minimalny odsetek trigramów zapytania, które muszą wystąpić w tytule
+MIN_COVERAGE = 0.5
+# Waga popularności w końcowym wyniku (0 = tylko podobieństwo tekstu)
+POPULARITY_WEIGHT = 0.25
+# Premia za tytuł zaczynający się od wpisanego tekstu
+PREFIX_BONUS = 0.3
+
+
+# Funkcja sprowadzająca tekst do małych liter bez znaków diakrytycznych ("Żółw" -> "zolw")
+def fold(text):
+    text = (text or "").translate(SPECIAL_FOLDS)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+# Funkcja dzieląca tekst na trigramy (z dopełnieniem spacjami jak w pg_trgm)
+def trigrams(folded):
+    grams = set()
+    for word in folded.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# Funkcja tworząca etykietę filmu "Tytuł (rok)"
+def movie_label(movie):
+    year = (movie.get("release_date") or "")[:4]
+    return f"{movie['title']} ({year})" if year else movie["title"]
+
+
+class TitleIndex:
+    """Indeks trigramowy tytułów (polskich i oryginalnych) odporny na literówki i brak polskich znaków."""
+
+    def __init__(self, movies):
+        self.movies = list(movies)
+        self.postings = {}        # trigram -> numery wpisów (tablica int32)
+        self.entry_movie = []     # wpis -> numer filmu
+        self.entry_size = []      # wpis -> liczba trigramów
+        self.entry_name = []      # wpis -> znormalizowany tytuł
+
+        for i, m in enumerate(self.movies):
+            names = {fold(m.get("title")), fold(m.get("original_title"))}
+            for name in names:
+                if not name:
+                    continue
+                grams = trigrams(name)
+                entry = len(self.entry_movie)
+                self.entry_movie.append(i)
+                self.entry_size.append(len(grams))
+                self.entry_name.append(name)
+                for g in grams:
+                    self.postings.setdefault(g, []).append(entry)
+
+        max_popularity = max((m.get("popularity") or 0 for m in self.movies), default=0)
+        norm = math.log1p(max_popularity) or 1.0
+        self.popularity = np.array([math.log1p(m.get("popularity") or 0) / norm for m in self.movies])
+
+        # tablice do liczenia wyników wektorowo
+        self.postings = {g: np.array(entries, dtype=np.int32) for g, entries in self.postings.items()}
+        self.entry_movie = np.array(self.entry_movie, dtype=np.int64)
+        self.entry_size = np.array(self.entry_size, dtype=np.float64)
+        # tytuły zaczynające się od zapytania leżą obok siebie w kolejności alfabetycznej:
+        # przedział znajdujemy wyszukiwaniem binarnym, a wpis sprawdzamy przez jego miejsce w tej kolejności
+        order = sorted(range(len(self.entry_name)), key=self.entry_name.__getitem__)
+        self.sorted_names = [self.entry_name[e] for e in order]
+        self.name_rank = np.empty(len(order), dtype=np.int64)
+        self.name_rank[order] = np.arange(len(order))
+
+    def __len__(self):
+        return len(self.movies)
+
+    def search(self, query, k=20):
+        """Zwraca do `k` filmów najlepiej pasujących do zapytania, od najlepszego."""
+        q = fold(query)
+        q_grams = trigrams(q)
+        if not q_grams:
+            return []
+
+        # zliczanie wspólnych trigramów jednym bincount po połączonych listach wpisów
+        postings = [self.postings[g] for g in q_grams if g in self.postings]
+        if not postings:
+            return []
+        hits = np.bincount(np.concatenate(postings))
+
+        # od razu odrzucamy wpisy z za małym pokryciem - dalej liczymy tylko pozostałe
+        entries = np.flatnonzero(hits >= math.ceil(MIN_COVERAGE * len(q_grams)))
+        if not len(entries):
+            return []
+        n = hits[entries]
+        # pokrycie zapytania z karą za dużo dłuższe tytuły
+        scores = n / len(q_grams) - 0.1 * (1 - n / self.entry_size[entries])
+        lo = bisect_left(self.sorted_names, q)
+        hi = bisect_left(self.sorted_names, q + "\uffff", lo)
+        rank = self.name_rank[entries]
+        scores += PREFIX_BONUS * ((rank >= lo) & (rank < hi))
+        movies = self.entry_movie[entries]
+        scores += POPULARITY_WEIGHT * self.popularity[movies]
+
+        # film ma najwyżej dwa wpisy (tytuł polski i oryginalny), więc k najlepszych filmów
+        # jest wśród 2k najlepszych wpisów
+        if len(scores) > 2 * k:
+            keep = np.argpartition(-scores, 2 * k - 1)[:2 * k]
+            scores, movies = scores[keep], movies[keep]
+        order = np.lexsort((movies, -scores))
+        # pierwsze wystąpienie filmu w kolejności wyników = jego lepszy wpis
+        _, first = np.unique(movies[order], return_index=True)
+        top = movies[order[np.sort(first)[:k]]]
+        return [self.movies[i] for i in top]
+
+
+# Indeks budowany raz na proces i wersję katalogu, współdzielony przez wszystkie sesje
+def load_title_index():
+    return _load_title_index(*file_version())
+
+
+@st.cache_resource(max_entries=1)
+def _load_title_index(path, version):
+    return TitleIndex(shared_catalog(path))